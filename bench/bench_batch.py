@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Batch extraction throughput benchmark.
+
+Sequential, pipelined (threads) and multi-process (jobs) modes.
+
+Usage: bench_batch.py [NUM_FILES] [JOBS]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import common
+
+from xsnap import batch, main as xmain, pipeline   # pylint: disable=wrong-import-order
+
+
+def run(files: list[Path], outdir: Path, jobs: int, threads: int) -> tuple[float, int]:
+    """Process files, return elapsed time and number of failures."""
+    start = time.perf_counter()
+    if threads:
+        results = pipeline.run_pipelined(xmain.load_images, files, outdir, threads)
+    elif jobs == 1:
+        results = batch.run_sequential(xmain.extract_images, files, outdir)
+    else:
+        results = batch.run_parallel(xmain.extract_images, files, outdir, jobs)
+    failed = sum(not _.ok for _ in results)
+    return time.perf_counter() - start, failed
+
+
+def main() -> None:
+    """Main."""
+    num_files = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    jobs = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        indir = Path(tmpdir) / 'in'
+        outdir = Path(tmpdir) / 'out'
+        indir.mkdir()
+        outdir.mkdir()
+
+        files = []
+        for num in range(num_files):
+            file = indir / f'snap{num:05}.vsf'
+            data = common.snapshot(num, filler=1024 * (num % 64))
+            if num % 100 == 99:
+                data = data[:len(data) // 3]        # Truncated snapshot.
+            file.write_bytes(data)
+            files.append(file)
+
+        print(f'{num_files} snapshots')
+        modes = [(1, 0), (1, 2)] + [(jobs, 0)] * (jobs > 1)
+        for num_jobs, threads in modes:
+            devnull = open(os.devnull, 'w', encoding='utf-8')   # pylint: disable=R1732
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                elapsed, failed = run(files, outdir, num_jobs, threads)
+            finally:
+                sys.stdout = stdout
+                devnull.close()
+            print(f'  jobs={num_jobs:<3} threads={threads:<3} {elapsed:7.2f}s'
+                  f'  {num_files / elapsed:8.1f} files/s  ({failed} failed)')
+
+
+if __name__ == '__main__':
+    main()
+
+# vim: set sts=4 et sw=4:
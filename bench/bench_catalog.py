@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Catalog query benchmark.
+
+Fills a catalog with synthetic snapshot records and measures query time.
+
+Usage: bench_catalog.py [NUM_RECORDS]
+"""
+
+import contextlib
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import common
+
+from xsnap import catalog   # pylint: disable=wrong-import-order
+
+
+def record(rnd: random.Random, num: int) -> catalog.Record:
+    """Return synthetic snapshot record."""
+    sprites = rnd.choice((0, 0, 0, rnd.randrange(256)))
+    modules = [('MAINCPU', '1.1', 62), ('C64MEM', '0.1', 65562), ('CIA2', '2.2', 54),
+               ('VIC-II', '1.3', 1205)]
+    if rnd.random() < 0.05:
+        modules.append(('C64ROM', '1.0', 20503))
+    return {
+        'path': f'/archive/{num % 997:03}/snapshot{num:06}.vsf.gz',
+        'size': rnd.randrange(20000, 70000),
+        'mtime_ns': rnd.randrange(1 << 60),
+        'hash': rnd.randbytes(32).hex(),
+        'vsf_version': '2.0',
+        'machine': 'C64',
+        'vice_version': rnd.choice(('3.5.0.0', '3.6.1.0', '3.7.1.0', '3.8.0.0', '0.0.0.0')),
+        'mode': rnd.choice(catalog.MODES[:5]),
+        'bank': rnd.choice((0x0000, 0x4000, 0x8000, 0xc000)),
+        'bitmap_addr': 0x2000,
+        'screen_addr': 0x0400,
+        'font_addr': 0x1000,
+        'sprites': sprites,
+        'active_sprites': bin(sprites).count('1'),
+        'screen_hash': rnd.randbytes(20).hex(),
+        'error': None,
+        'modules': modules
+    }
+
+
+def main() -> None:
+    """Main."""
+    num_records = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rnd = random.Random(20)
+
+    with tempfile.TemporaryDirectory() as tmpdir, \
+            contextlib.closing(catalog.connect(Path(tmpdir) / 'catalog.db')) as conn:
+        start = time.perf_counter()
+        with conn:
+            for num in range(num_records):
+                catalog.store(conn, record(rnd, num))
+        print(f'{num_records} records stored in {time.perf_counter() - start:.2f}s')
+        screen_hash = conn.execute('SELECT screen_hash FROM snapshots LIMIT 1').fetchone()[0]
+
+        filters = {
+            'multicolor': catalog.Filter(mode='multicolor'),
+            'multicolor, sprites, 3.7': catalog.Filter(mode='multicolor', sprites=True,
+                                                       vice_version='3.7'),
+            'module C64ROM': catalog.Filter(module='C64ROM'),
+            'screen hash': catalog.Filter(screen_hash=screen_hash),
+        }
+        print()
+        print(f'{"filter":26}  {"rows":>6}  {"count":>9}  {"query":>9}')
+        for name, filt in filters.items():
+            rows = len(catalog.query(conn, filt))
+            counted = common.timeit(lambda: catalog.count(conn, filt))  # pylint: disable=W0640
+            queried = common.timeit(lambda: catalog.query(conn, filt))  # pylint: disable=W0640
+            print(f'{name:26}  {rows:6}  {counted * 1e3:7.2f}ms  {queried * 1e3:7.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
+
+# vim: set sts=4 et sw=4:
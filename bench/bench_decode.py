@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Image decoders benchmark.
+
+Measures decode throughput of every image format and compares the bulk RLE
+decoders with a per-byte reference implementation (kept here) on typical,
+random and blank screens.
+"""
+
+import random
+
+import common
+
+# pylint: disable=wrong-import-order
+from bench_rle import typical
+from xsnap.imageformats.c64.formats import hires, multicolor, text
+from xsnap.imageformats.c64.scrtypes import HiresScreen, MultiColorScreen, TextScreen
+
+
+def bytewise_esc(data: bytes, esc: int, size: int, zero: int = 256) -> bytes:
+    """Per-byte escape decoder (esc, count, value runs)."""
+    out = bytearray()
+    pos = 0
+    while len(out) < size:
+        val = data[pos]
+        if val == esc:
+            out.extend([data[pos + 2]] * (data[pos + 1] or zero))
+            pos += 3
+        else:
+            out.append(val)
+            pos += 1
+    return bytes(out[:size])
+
+
+def bytewise_pairs(data: bytes, size: int) -> bytes:
+    """Per-byte (count, value) pairs decoder."""
+    out = bytearray()
+    pos = 0
+    while len(out) < size:
+        out.extend([data[pos + 1]] * data[pos])
+        pos += 2
+    return bytes(out[:size])
+
+
+REFERENCE = {
+    'ami': lambda _: bytewise_esc(_[2:], multicolor.ami.ESC, multicolor.ami.BUFSIZE, 0),
+    'drp': lambda _: bytewise_esc(_[16:], _[15], multicolor.drp.BUFSIZE),
+    'gas': lambda _: bytewise_pairs(_[3:], multicolor.gas.BUFSIZE),
+    'zom': lambda _: bytewise_esc(_[2:][::-1][1:], _[-1], multicolor.zom.BUFSIZE)[::-1],
+}
+
+BUFFERS = {
+    'ami': lambda _: multicolor.ami.unpackbuf(_[2:]),
+    'drp': lambda _: multicolor.drp.unpackbuf(_[16:], _[15]),
+    'gas': lambda _: multicolor.gas.unpackbuf(_[3:]),
+    'zom': lambda _: multicolor.zom.unpackbuf(_[2:]),
+}
+
+
+def screens(kind: str, rnd: random.Random) -> tuple[MultiColorScreen, HiresScreen, TextScreen]:
+    """Return multicolor, hires and text screens of given kind."""
+    if kind == 'random':
+        data = rnd.randbytes(10_000)
+    elif kind == 'blank':
+        data = bytes(10_000)
+    else:
+        data = typical(10_000, rnd)
+    bitmap, screen, colors = data[:8000], data[8000:9000], data[9000:]
+    return (MultiColorScreen(bitmap, screen, colors, b'\x06', b'\x0e'),
+            HiresScreen(bitmap, screen, b'\x0e'),
+            TextScreen(screen, colors, b'\x06', b'\x0e', b'\x14'))
+
+
+def main() -> None:
+    """Main."""
+    rnd = random.Random(64)
+    print(f'{"format":6}  {"image":8}  {"size":>6}  {"decode":>9}  {"images/s":>9}'
+          f'  {"MB/s":>7}  {"bytewise":>9}  {"speedup":>7}')
+    for kind in ('typical', 'random', 'blank'):
+        multi, hi, txt = screens(kind, rnd)
+        for formats, image in ((multicolor.FORMATS, multi), (hires.FORMATS, hi),
+                               (text.FORMATS, txt)):
+            for ext, mod in formats.items():
+                data = mod.pack(image)
+                best = common.timeit(lambda: mod.unpack(data), 50)     # pylint: disable=W0640
+                line = (f'{ext:6}  {kind:8}  {len(data):6}  {best * 1e6:7.1f}us'
+                        f'  {1 / best:9.0f}  {len(data) / best / 1e6:7.1f}')
+                if ext in REFERENCE:
+                    ref, buf = REFERENCE[ext], BUFFERS[ext]
+                    assert ref(data) == buf(data), f'{ext} output differs ({kind})'
+                    old = common.timeit(lambda: ref(data), 10)         # pylint: disable=W0640
+                    new = common.timeit(lambda: buf(data), 50)         # pylint: disable=W0640
+                    line += f'  {old * 1e6:7.1f}us  {old / new:6.1f}x'
+                print(line)
+
+
+if __name__ == '__main__':
+    main()
+
+# vim: set sts=4 et sw=4:
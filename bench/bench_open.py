@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Compressed snapshot open/parse benchmark.
+
+Counts how many times each compressed stream is decompressed from the start
+(passes) with the previous trial-and-seek open strategy and with the current
+magic-byte sniffing one.
+"""
+
+import _compression
+import bz2
+import contextlib
+import gzip
+import io
+import lzma
+import tempfile
+from pathlib import Path
+from struct import unpack
+
+import common
+
+from xsnap.utils import fileutils       # pylint: disable=wrong-import-order
+from xsnap.vice import vsf              # pylint: disable=wrong-import-order
+
+REWINDS = [0]
+
+
+def _counting_rewind(orig):
+    """Wrap stream rewind (restart of decompression) with a counter."""
+    def rewind(self):
+        REWINDS[0] += 1
+        orig(self)
+    return rewind
+
+
+_compression.DecompressReader._rewind = _counting_rewind(       # type: ignore
+    _compression.DecompressReader._rewind)
+
+
+def legacy_open_and_parse(path: Path) -> None:
+    """Previous open_file() and ViceSnapshotFile() stream access pattern.
+
+    Trial decompression, header-only module scan and payloads read on demand
+    by seeking back to them.
+    """
+    fobj = None
+    for opener, error in ((gzip.open, gzip.BadGzipFile), (bz2.open, OSError),
+                          (lzma.open, lzma.LZMAError)):
+        try:
+            fobj = opener(path)
+            fobj.read(1)
+            fobj.seek(0)
+            break
+        except error:
+            fobj = None
+    assert fobj is not None
+    fobj.seek(0)
+    fobj.read(len(vsf.VSF_MAGIC))               # is_vice_snapshot()
+    fobj.seek(0)
+    fobj.read(len(vsf.VSF_MAGIC) + 18 + 21)     # VSF header.
+    payloads = []
+    while True:
+        pos = fobj.tell()
+        if fobj.read(1) == b'':
+            break
+        fobj.seek(pos)
+        magic, _, _, size = unpack('<16sBBL', fobj.read(22))
+        if magic.rstrip(b'\x00') in (b'C64MEM', b'CIA2', b'VIC-II'):
+            payloads.append((pos + 22, size - 22))
+        fobj.seek(size - 22, 1)
+    for pos, size in payloads:
+        fobj.seek(pos)
+        fobj.read(size)
+
+
+def open_and_parse(path: Path) -> None:
+    """Current open_file() and ViceSnapshotFile()."""
+    with fileutils.open_file(path) as fobj, contextlib.redirect_stdout(io.StringIO()):
+        snap = vsf.ViceSnapshotFile(fobj)
+        snap.c64mem()
+        snap.cia2()
+        snap.vic2()
+
+
+def main() -> None:
+    """Main."""
+    data = common.snapshot()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        print(f'{"input":10}  {"impl":7}  {"passes":>6}  {"time":>9}')
+        for ext, compress in (('gz', gzip.compress), ('bz2', bz2.compress),
+                              ('xz', lzma.compress)):
+            path = Path(tmpdir) / f'snapshot.vsf.{ext}'
+            path.write_bytes(compress(data))
+            for name, func in (('legacy', legacy_open_and_parse),
+                               ('current', open_and_parse)):
+                REWINDS[0] = 0
+                func(path)
+                passes = REWINDS[0] + 1
+                elapsed = common.timeit(lambda: func(path))     # pylint: disable=cell-var-from-loop
+                print(f'.vsf.{ext:5}  {name:7}  {passes:6}  {elapsed * 1000:7.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
+
+# vim: set sts=4 et sw=4:
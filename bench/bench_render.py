@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Screen rendering benchmark.
+
+Measures per-screen render time of hires, multicolor and text screens,
+compositing time of 8 sprites and PNG / PPM encoding time for the rendered
+frames.
+"""
+
+import random
+
+import common
+
+# pylint: disable=wrong-import-order
+from xsnap.imageformats import raster
+from xsnap.imageformats.c64 import render
+from xsnap.imageformats.c64.palettes import PEPTO
+from xsnap.imageformats.c64.scrtypes import (EcmTextScreen, HiresScreen, MultiColorScreen,
+                                             MultiTextScreen, TextScreen)
+
+
+def main() -> None:
+    """Main."""
+    rnd = random.Random(64)
+    bitmap, screen, colors = rnd.randbytes(8000), rnd.randbytes(1000), rnd.randbytes(1000)
+    # Note: same character set in every text screen (glyphs are cached).
+    charset = rnd.randbytes(2048)
+    renderers = {
+        'hires': lambda border: render.hires(HiresScreen(bitmap, screen, b'\x0e'), border),
+        'multicolor': lambda border: render.multicolor(
+            MultiColorScreen(bitmap, screen, colors, b'\x06', b'\x0e'), border),
+        'text': lambda border: render.text(
+            TextScreen(screen, colors, b'\x06', b'\x0e', b'\x14', charset), border),
+        'multitext': lambda border: render.multitext(
+            MultiTextScreen(screen, colors, b'\x06', b'\x02', b'\x07', b'\x0e', b'\x14', charset),
+            border),
+        'ecmtext': lambda border: render.ecmtext(
+            EcmTextScreen(screen, colors, b'\x06', b'\x02', b'\x07', b'\x0b', b'\x0e', b'\x14',
+                          charset), border),
+    }
+
+    print(f'{"screen":10}  {"border":6}  {"render":>9}  {"screens/s":>9}')
+    for name, func in renderers.items():
+        for border in (False, True):
+            best = common.timeit(lambda: func(border), 50)      # pylint: disable=W0640
+            print(f'{name:10}  {str(border):6}  {best * 1e3:7.3f}ms  {1 / best:9.0f}')
+
+    print()
+    print(f'{"sprites":10}  {"expanded":8}  {"composite":>9}')
+    pixels = renderers['multicolor'](False).pixels
+    for expanded in (False, True):
+        sprites = [render.Sprite(rnd.randbytes(63), rnd.randrange(0, 344), rnd.randrange(30, 250),
+                                 rnd.randrange(16), multicolor=bool(_ & 1), color01=1, color11=2,
+                                 xexp=expanded, yexp=expanded, behind=bool(_ & 2))
+                   for _ in range(8)]
+        best = common.timeit(
+            lambda: render.composite(pixels, pixels, sprites), 50)     # pylint: disable=W0640
+        print(f'{8:10}  {str(expanded):8}  {best * 1e3:7.3f}ms')
+
+    print()
+    print(f'{"encoder":10}  {"scale":>5}  {"size":>7}  {"encode":>9}')
+    frame = renderers['multicolor'](True)
+    encoders = {
+        'png -0': lambda scale: raster.png(frame, PEPTO, 0, scale),
+        'png -1': lambda scale: raster.png(frame, PEPTO, 1, scale),
+        'png -6': lambda scale: raster.png(frame, PEPTO, 6, scale),
+        'png -9': lambda scale: raster.png(frame, PEPTO, 9, scale),
+        'ppm': lambda scale: raster.ppm(frame, PEPTO, scale),
+    }
+    for name, func in encoders.items():
+        for scale in (1, 2):
+            size = len(func(scale))
+            best = common.timeit(lambda: func(scale), 10)       # pylint: disable=W0640
+            print(f'{name:10}  {scale:5}  {size:7}  {best * 1e3:7.3f}ms')
+
+
+if __name__ == '__main__':
+    main()
+
+# vim: set sts=4 et sw=4:
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""RLE packers benchmark.
+
+Compares the run-length encoders of the RLE image formats with the previous
+per-byte implementation (kept here as reference) and checks the output is
+byte-identical.
+"""
+
+import random
+
+import common
+
+# pylint: disable=wrong-import-order
+from xsnap.imageformats.c64.formats import rle
+from xsnap.imageformats.c64.formats.multicolor import ami, drp, gas, zom
+
+
+def legacy_ami(buf: bytes) -> bytes:
+    """Previous Amica Paint packer."""
+    result = [ami.LDADDR]
+    for val, count in rle.rleiter(buf, ami.MAX_REPEAT):
+        if count > 1:
+            result.append(bytes([ami.ESC, count, val]))
+        elif val != ami.ESC:
+            result.append(bytes([val]))
+        else:
+            result.append(bytes([ami.ESC, 0x01, val]))
+    result.append(b'\xc2\x00')
+    return b''.join(result)
+
+
+def legacy_drp(buf: bytes) -> bytes:
+    """Previous Draz Paint packer."""
+    esc = rle.find_esc_byte(buf)
+    result = [drp.LDADDR, drp.MAGIC, int.to_bytes(esc)]
+    for val, count in rle.rleiter(buf, drp.MAX_REPEAT):
+        if count > 1:
+            result.append(bytes([esc, count, val]))
+        elif val != esc:
+            result.append(bytes([val]))
+        else:
+            result.append(bytes([esc, 0x01, val]))
+    return b''.join(result)
+
+
+def legacy_zom(buf: bytes) -> bytes:
+    """Previous Zoomatic packer."""
+    esc = rle.find_esc_byte(buf)
+    result = [zom.LDADDR]
+    for val, count in rle.rleiter(buf, zom.MAX_REPEAT):
+        if count > 1:
+            result.append(bytes([val, count & 0xff, esc]))
+        elif val != esc:
+            result.append(bytes([val]))
+        else:
+            result.append(bytes([val, 0x01, esc]))
+    result.append(bytes([esc]))
+    return b''.join(result)
+
+
+def legacy_gas(buf: bytes) -> bytes:
+    """Previous Graphic Assault System packer."""
+    result = [gas.LDADDR, int.to_bytes(gas.MAGIC)]
+    for val, count in rle.rleiter(buf, gas.REPEAT):
+        result.append(bytes([count, val]))
+    result.append(b'\x00\x00')
+    result.append(gas.FOOTER)
+    return b''.join(result)
+
+
+def typical(size: int, rnd: random.Random) -> bytes:
+    """Game-like screen data: long blank areas, repeated tiles and details."""
+    buf = bytearray(size)
+    pos = 0
+    while pos < size:
+        kind = rnd.random()
+        length = rnd.randrange(1, 600)
+        if kind < 0.4:
+            chunk = bytes([rnd.choice((0x00, 0xff, 0x55, 0xaa))]) * length
+        elif kind < 0.7:
+            chunk = (rnd.randbytes(8) * (length // 8 + 1))[:length]
+        else:
+            chunk = rnd.randbytes(min(length, 64))
+        buf[pos:pos + len(chunk)] = chunk[:size - pos]
+        pos += len(chunk)
+    return bytes(buf)
+
+
+def main() -> None:
+    """Main."""
+    rnd = random.Random(64)
+    # Note: Draz Paint buffer is larger, other formats use 10 001 bytes.
+    size = drp.BUFSIZE
+    images = {
+        'random': rnd.randbytes(size),
+        'blank': bytes(size),
+        'escapes': bytes([0xc2]) * 300 + bytes([0xc2, 0x00] * 2000) + bytes(size - 4300),
+        'typical': typical(size, rnd),
+    }
+    formats = (
+        ('ami', legacy_ami, ami.packbuf),
+        ('drp', legacy_drp, lambda _: drp.packbuf(_, rle.find_esc_byte(_))),
+        ('zom', legacy_zom, lambda _: zom.packbuf(_, rle.find_esc_byte(_))),
+        ('gas', legacy_gas, gas.packbuf),
+    )
+
+    print(f'{"format":6}  {"image":8}  {"legacy":>9}  {"current":>9}  {"speedup":>7}')
+    for fmt, legacy, current in formats:
+        for name, image in images.items():
+            buf = image if fmt == 'drp' else image[:ami.BUFSIZE]
+            assert legacy(buf) == current(buf), f'{fmt} output differs ({name})'
+            old = common.timeit(lambda: legacy(buf), 20)       # pylint: disable=W0640
+            new = common.timeit(lambda: current(buf), 20)      # pylint: disable=W0640
+            print(f'{fmt:6}  {name:8}  {old * 1e3:7.3f}ms  {new * 1e3:7.3f}ms  {old / new:6.1f}x')
+
+
+if __name__ == '__main__':
+    main()
+
+# vim: set sts=4 et sw=4:
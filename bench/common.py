@@ -0,0 +1,69 @@
+"""Benchmark helpers."""
+
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+
+sys.path.insert(0, str(ROOT / 'src'))
+
+# VIC-II $d011, $d016 and $d018 of graphics modes (bitmap $2000, font $2000,
+# screen $0400).
+MODES = {
+    'multicolor': (0x3b, 0x18, 0x18),
+    'hires': (0x3b, 0x08, 0x18),
+    'text': (0x1b, 0x08, 0x18),
+}
+
+
+def snapshot(seed: int = 0, filler: int = 65536, mode: str = 'multicolor') -> bytes:
+    """Return synthetic C64 snapshot (multicolor bitmap by default)."""
+    from xsnap.vice.vsf import writer   # pylint: disable=import-outside-toplevel
+    rnd = random.Random(seed)
+    regs = bytearray(64)
+    regs[0x11], regs[0x16], regs[0x18] = MODES[mode]
+    return writer.pack_snapshot([
+        writer.pack_module(b'MAINCPU', bytes(40)),
+        writer.c64mem_module(rnd.randbytes(65536)),
+        writer.cia2_module(0x0000),
+        writer.vic2_module(bytes(regs), rnd.randbytes(1000)),
+        writer.pack_module(b'DRIVE8', rnd.randbytes(filler)),
+    ])
+
+
+def measure(func: Callable[[], Any], repeat: int = 5, min_time: float = 0.005) -> list[float]:
+    """Return per-call wall times of repeat runs (seconds).
+
+    Fast functions are called in loops of at least min_time.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+    times = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - start) / number)
+    return times
+
+
+def timeit(func: Callable[[], Any], repeat: int = 5) -> float:
+    """Return best wall time of repeat runs (seconds)."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+# vim: set sts=4 et sw=4:
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""Benchmark suite.
+
+Times image format packers (hires, multicolor and text formats on random,
+blank and typical game screens), RLE helpers, snapshot parsing (plain, gz,
+bz2 and xz) and end-to-end extraction of a synthetic snapshot corpus.
+Results are written to a JSON file, compare flags slowdowns against a saved
+baseline.
+
+Note: packers run on the same screen repeatedly, screen histograms are
+cached after the first call (as when a screen is encoded in many formats).
+
+Usage: suite.py run [-o RESULTS.json] [-k PATTERN] [--quick]
+       suite.py compare BASELINE.json RESULTS.json [--threshold PCT]
+"""
+
+import argparse
+import bz2
+import contextlib
+import fnmatch
+import gzip
+import json
+import lzma
+import platform
+import random
+import statistics
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import common
+
+# pylint: disable=wrong-import-order
+from bench_rle import typical
+from xsnap import batch, main as xmain
+from xsnap.imageformats.c64 import hires, multicolor, text
+from xsnap.imageformats.c64.formats import rle
+from xsnap.utils import fileutils
+from xsnap.vice import vsf
+from xsnap.vice.x64 import X64
+
+RESULTS_VERSION = 1
+
+# Case name, function, bytes processed per call (0 = not applicable).
+Case = tuple[str, Callable[[], Any], int]
+
+
+def images(kind: str) -> tuple[Any, Any, Any]:
+    """Return hires, multicolor and text images of given kind."""
+    if kind == 'blank':
+        return hires.BlackHiresC64(), multicolor.BlackMultiC64(), text.BlackTextC64()
+    if kind == 'random':
+        rnd = random.Random(64)
+        return hires.RandomHiresC64(rnd), multicolor.RandomMultiC64(rnd), text.RandomTextC64(rnd)
+    data = typical(10_000, random.Random(64))
+    bitmap, screen, colors = data[:8000], data[8000:9000], bytes(_ & 0x0f for _ in data[9000:])
+    return (hires.HiresImage(bitmap, screen, b'\x0e'),
+            multicolor.MultiColorImage(bitmap, screen, colors, b'\x06', b'\x0e'),
+            text.TextImage(screen, colors, b'\x06', b'\x0e'))
+
+
+def pack_cases() -> Iterator[Case]:
+    """Image format packers."""
+    for kind in ('typical', 'random', 'blank'):
+        for screen, img in zip(('hires', 'multicolor', 'text'), images(kind)):
+            for ext in img.FORMATS:
+                size = len(img.encode(ext))
+                yield f'pack/{screen}/{ext}/{kind}', lambda i=img, e=ext: i.encode(e), size
+
+
+def rle_cases() -> Iterator[Case]:
+    """RLE helpers."""
+    rnd = random.Random(64)
+    buffers = {'typical': typical(10_001, rnd), 'random': rnd.randbytes(10_001),
+               'blank': bytes(10_001)}
+    for kind, buf in buffers.items():
+        yield (f'rle/rleiter/{kind}', lambda b=buf: sum(1 for _ in rle.rleiter(b, 255)),
+               len(buf))
+        yield f'rle/find_esc_byte/{kind}', lambda b=buf: rle.find_esc_byte(b), len(buf)
+
+
+def open_and_parse(path: Path) -> None:
+    """Open snapshot and read modules needed for extraction."""
+    with fileutils.open_file(path) as fobj:
+        snap = vsf.ViceSnapshotFile(fobj, modules=X64.MODULES)
+        snap.c64mem()
+        snap.cia2()
+        snap.vic2()
+
+
+def parse_cases(tmpdir: Path) -> Iterator[Case]:
+    """Snapshot parsing."""
+    data = common.snapshot()
+    for ext, compress in (('vsf', bytes), ('vsf.gz', gzip.compress), ('vsf.bz2', bz2.compress),
+                          ('vsf.xz', lzma.compress)):
+        path = tmpdir / f'parse.{ext}'
+        path.write_bytes(compress(data))
+        yield f'parse/{ext}', lambda p=path: open_and_parse(p), len(data)
+
+
+def corpus(tmpdir: Path, size: int) -> list[Path]:
+    """Write synthetic snapshot corpus (graphics modes and compressions mixed)."""
+    indir = tmpdir / 'corpus'
+    indir.mkdir()
+    files = []
+    compressors = (('vsf', bytes), ('vsf.gz', gzip.compress), ('vsf.bz2', bz2.compress),
+                   ('vsf.xz', lzma.compress))
+    modes = tuple(common.MODES)
+    for num in range(size):
+        ext, compress = compressors[num % len(compressors)]
+        data = common.snapshot(num, filler=1024 * (num % 16), mode=modes[num % len(modes)])
+        path = indir / f'snap{num:04}.{ext}'
+        path.write_bytes(compress(data))
+        files.append(path)
+    return files
+
+
+def extract_cases(tmpdir: Path, size: int) -> Iterator[Case]:
+    """End-to-end extraction."""
+    files = corpus(tmpdir, size)
+    outdir = tmpdir / 'out'
+    outdir.mkdir()
+    nbytes = sum(_.stat().st_size for _ in files)
+
+    def extract() -> None:
+        for result in batch.run_sequential(xmain.extract_images, files, outdir):
+            assert result.ok, result.error
+    yield f'extract/corpus{size}', extract, nbytes
+
+
+def run(args: argparse.Namespace) -> None:
+    """Run benchmarks, write results."""
+    repeat = 3 if args.quick else 7
+    results: dict[str, dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cases = [pack_cases(), rle_cases(), parse_cases(Path(tmpdir)),
+                 extract_cases(Path(tmpdir), 12 if args.quick else 48)]
+        print(f'{"benchmark":36}  {"best":>10}  {"median":>10}  {"MB/s":>8}')
+        for name, func, nbytes in (_ for cases_ in cases for _ in cases_):
+            if args.filter and not any(fnmatch.fnmatch(name, _) for _ in args.filter):
+                continue
+            times = common.measure(func, repeat)
+            best, median = min(times), statistics.median(times)
+            results[name] = {'best': best, 'median': median, 'bytes': nbytes}
+            rate = f'{nbytes / best / 1e6:8.1f}' if nbytes else f'{"-":>8}'
+            print(f'{name:36}  {best * 1e3:8.3f}ms  {median * 1e3:8.3f}ms  {rate}', flush=True)
+
+    output = {
+        'version': RESULTS_VERSION,
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results
+    }
+    args.output.write_text(json.dumps(output, indent=1) + '\n', encoding='utf-8')
+    print(f'Results written to {args.output}')
+
+
+def load(path: Path) -> dict[str, dict[str, Any]]:
+    """Load results file."""
+    data = json.loads(path.read_text(encoding='utf-8'))
+    if data.get('version') != RESULTS_VERSION:
+        raise SystemExit(f'{path}: unsupported results version {data.get("version")}')
+    return data['results']
+
+
+def compare(args: argparse.Namespace) -> None:
+    """Compare results with baseline, exit with status 1 on slowdowns."""
+    baseline, current = load(args.baseline), load(args.results)
+    limit = 1 + args.threshold / 100
+    slower = 0
+    print(f'{"benchmark":36}  {"baseline":>10}  {"current":>10}  {"change":>7}')
+    for name in sorted(baseline.keys() & current.keys()):
+        old, new = baseline[name]['best'], current[name]['best']
+        ratio = new / old if old else 1.0
+        flag = ''
+        if ratio > limit:
+            flag = '  SLOWER'
+            slower += 1
+        elif ratio < 1 / limit:
+            flag = '  faster'
+        print(f'{name:36}  {old * 1e3:8.3f}ms  {new * 1e3:8.3f}ms'
+              f'  {(ratio - 1) * 100:+6.1f}%{flag}')
+    missing = len(baseline.keys() - current.keys())
+    if missing:
+        print(f'{missing} baseline benchmark(s) not in results')
+    for name in sorted(current.keys() - baseline.keys()):
+        print(f'{name:36}  new')
+    if slower:
+        print(f'{slower} benchmark(s) slower by more than {args.threshold:g}%')
+        sys.exit(1)
+
+
+def main() -> None:
+    """Main."""
+    parser = argparse.ArgumentParser(description='xsnap benchmark suite')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='run benchmarks')
+    run_parser.add_argument('-o', '--output', type=Path, default=Path('bench-results.json'),
+                            help='results file (default: bench-results.json)')
+    run_parser.add_argument('-k', dest='filter', action='append', metavar='PATTERN',
+                            help='run benchmarks matching glob pattern (e.g. "pack/*/drp/*")')
+    run_parser.add_argument('--quick', action='store_true',
+                            help='fewer runs and a smaller corpus')
+    compare_parser = commands.add_parser('compare', help='compare results with a baseline')
+    compare_parser.add_argument('baseline', type=Path)
+    compare_parser.add_argument('results', type=Path)
+    compare_parser.add_argument('--threshold', type=float, default=10, metavar='PCT',
+                                help='flag benchmarks slower by more than PCT%% (default: 10)')
+    args = parser.parse_args()
+
+    with contextlib.suppress(BrokenPipeError):
+        if args.command == 'run':
+            run(args)
+        else:
+            compare(args)
+
+
+if __name__ == '__main__':
+    main()
+
+# vim: set sts=4 et sw=4:
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Batch processing of snapshot files."""
+
+import contextlib
+import io
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+from . import instrument
+from .report import Report
+
+# Function returns paths of written files or a report.
+ExtractFunc = Callable[[Path, Optional[Path]], Union[list[Path], Report]]
+
+
+@dataclass
+class BatchResult:
+    """Result of processing a single snapshot file."""
+    file: Path
+    ok: bool = True
+    output: str = ''                # Captured standard output.
+    error: Optional[str] = None
+    outputs: list[Path] = field(default_factory=list)   # Written images.
+    report: Optional[Report] = None
+    samples: list[instrument.Sample] = field(default_factory=list)  # Stage timings.
+
+
+def file_size(file: Path) -> int:
+    """Return file size (0 if the file cannot be accessed)."""
+    try:
+        return file.stat().st_size
+    except OSError:
+        return 0
+
+
+def largest_first(files: list[Path]) -> list[int]:
+    """Return indices of files ordered by file size (largest first)."""
+    sizes = [file_size(_) for _ in files]
+    return sorted(range(len(files)), key=lambda _: sizes[_], reverse=True)
+
+
+def run_isolated(func: ExtractFunc, file: Path, outdir: Optional[Path],
+                 capture: bool = True) -> BatchResult:
+    """Process single file, any error is returned in the result."""
+    buf = io.StringIO()
+    redirect = contextlib.redirect_stdout(buf) if capture else contextlib.nullcontext()
+    try:
+        with redirect:
+            outputs = func(file, outdir)
+    except Exception as err:        # pylint: disable=broad-exception-caught
+        return BatchResult(file, False, buf.getvalue(), f'{type(err).__name__}: {err}',
+                           samples=instrument.take())
+    if isinstance(outputs, Report):
+        return BatchResult(file, True, buf.getvalue(), outputs=outputs.paths(), report=outputs,
+                           samples=instrument.take())
+    return BatchResult(file, True, buf.getvalue(), outputs=outputs, samples=instrument.take())
+
+
+def run_sequential(func: ExtractFunc, files: Iterable[Path],
+                   outdir: Optional[Path]) -> Iterator[BatchResult]:
+    """Process files one by one in the current process."""
+    for file in files:
+        yield run_isolated(func, file, outdir, capture=False)
+
+
+def run_parallel(func: ExtractFunc, files: list[Path], outdir: Optional[Path],
+                 jobs: int = 0, window: int = 0) -> Iterator[BatchResult]:
+    """Process files in a pool of worker processes.
+
+    Largest files are scheduled first, results are returned in input order
+    (finished results wait for the earlier ones). At most window files (4 per
+    worker by default) are in progress. A failing snapshot is reported in its
+    result and does not affect other files. Function must be picklable (a
+    module-level function).
+    """
+    order = largest_first(files)
+    done: dict[int, BatchResult] = {}
+    index = 0
+    for num, result in zip(order, run_streamed(func, (files[_] for _ in order), outdir,
+                                               jobs, window)):
+        done[num] = result
+        while index in done:
+            yield done.pop(index)
+            index += 1
+
+
+def run_streamed(func: ExtractFunc, files: Iterable[Path], outdir: Optional[Path],
+                 jobs: int = 0, window: int = 0) -> Iterator[BatchResult]:
+    """Process a stream of files in a pool of worker processes.
+
+    Files are submitted as they come, at most window files (4 per worker by
+    default) are in progress, so memory use does not depend on the number of
+    files. Results are returned in input order. When a worker process dies,
+    files in progress are reported as failed and a new pool processes the rest.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    window = window or 4 * jobs
+    pool = _pool(jobs)
+    try:
+        pending: deque[tuple[Path, Future[BatchResult]]] = deque()
+        for file in files:
+            try:
+                future = pool.submit(run_isolated, func, file, outdir)
+            except BrokenProcessPool:
+                while pending:
+                    yield _result(*pending.popleft())
+                pool.shutdown()
+                pool = _pool(jobs)
+                future = pool.submit(run_isolated, func, file, outdir)
+            pending.append((file, future))
+            if len(pending) >= window:
+                yield _result(*pending.popleft())
+        while pending:
+            yield _result(*pending.popleft())
+    finally:
+        pool.shutdown()
+
+
+def _pool(jobs: int) -> ProcessPoolExecutor:
+    """Return pool of worker processes."""
+    return ProcessPoolExecutor(max_workers=jobs, initializer=instrument.init_worker,
+                               initargs=instrument.state())
+
+
+def _result(file: Path, future: Future[BatchResult]) -> BatchResult:
+    """Return result of a worker process (its samples are passed to the hooks)."""
+    try:
+        result = future.result()
+    except BrokenProcessPool as err:
+        return BatchResult(file, False, '', f'worker process failed: {err}')
+    instrument.replay(result.samples)
+    return result
+
+
+# vim: set sts=4 et sw=4:
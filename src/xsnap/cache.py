@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Incremental rebuild cache.
+
+A manifest in the output directory records, for every processed snapshot,
+its size, modification time and content hash, and the images written from
+it. A snapshot is up to date when it has not changed and all its images
+still exist with the recorded sizes. Unchanged size and mtime are trusted
+without hashing, the content hash is computed only when the mtime differs
+(e.g. file copied or touched), so a no-op run costs a few stat() calls per
+snapshot. Entries also record the export options (tag), a snapshot
+processed with different options is not up to date.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Optional
+
+MANIFEST_NAME = '.xsnap-manifest.json'
+
+MANIFEST_VERSION = 1
+
+
+def file_hash(path: Path) -> str:
+    """Return file content hash."""
+    digest = hashlib.blake2b()
+    with open(path, 'rb') as fobj:
+        while chunk := fobj.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """Output directory manifest."""
+
+    def __init__(self, outdir: Path, tag: str = '') -> None:
+        self.path = outdir / MANIFEST_NAME
+        self.outdir = outdir
+        self.tag = tag
+        self.entries: dict[str, dict[str, Any]] = {}
+        self.modified = False
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+            if data.get('version') == MANIFEST_VERSION:
+                self.entries = data['files']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def is_current(self, file: Path) -> bool:
+        """Return True if snapshot file and its images are up to date."""
+        entry = self.entries.get(os.path.abspath(file))
+        if entry is None or entry.get('tag', '') != self.tag:
+            return False
+        try:
+            stat = file.stat()
+            if stat.st_size != entry['size']:
+                return False
+            for name, size in entry['outputs'].items():
+                if os.stat(self.outdir / name).st_size != size:
+                    return False
+            if stat.st_mtime_ns != entry['mtime_ns']:
+                if file_hash(file) != entry['hash']:
+                    return False
+                entry['mtime_ns'] = stat.st_mtime_ns
+                self.modified = True
+        except OSError:
+            return False
+        return True
+
+    def update(self, file: Path, outputs: list[Path]) -> None:
+        """Record processed snapshot file and its images."""
+        try:
+            stat = file.stat()
+            self.entries[os.path.abspath(file)] = {
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'hash': file_hash(file),
+                'outputs': {_.name: _.stat().st_size for _ in outputs},
+                'tag': self.tag
+            }
+        except OSError:
+            return
+        self.modified = True
+
+    def save(self) -> None:
+        """Write manifest (if modified)."""
+        if not self.modified:
+            return
+        tmppath = self.path.with_name(self.path.name + '.tmp')
+        tmppath.write_text(json.dumps({
+            'version': MANIFEST_VERSION,
+            'files': self.entries
+        }, separators=(',', ':')), encoding='utf-8')
+        os.replace(tmppath, self.path)
+        self.modified = False
+
+
+class ManifestSet:
+    """Manifests of all output directories used in a run."""
+
+    def __init__(self, outdir: Optional[Path] = None, tag: str = '') -> None:
+        self.outdir = outdir
+        self.tag = tag
+        self._manifests: dict[Path, Manifest] = {}
+
+    def manifest(self, file: Path) -> Manifest:
+        """Return manifest of the output directory of a snapshot file."""
+        outdir = self.outdir if self.outdir is not None else file.parent
+        manifest = self._manifests.get(outdir)
+        if manifest is None:
+            manifest = self._manifests[outdir] = Manifest(outdir, self.tag)
+        return manifest
+
+    def is_current(self, file: Path) -> bool:
+        """Return True if snapshot file and its images are up to date."""
+        return self.manifest(file).is_current(file)
+
+    def update(self, file: Path, outputs: list[Path]) -> None:
+        """Record processed snapshot file and its images."""
+        self.manifest(file).update(file, outputs)
+
+    def save(self) -> None:
+        """Write modified manifests."""
+        for manifest in self._manifests.values():
+            manifest.save()
+
+
+# vim: set sts=4 et sw=4:
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""Snapshot catalog.
+
+Snapshot metadata (VSF and VICE versions, modules, graphics mode, VIC-II
+addresses, sprites and content hashes) is recorded in an SQLite database.
+Indexing is incremental: a snapshot with unchanged size and mtime is not
+opened, a changed mtime with the same content hash only updates the mtime
+(same rules as the rebuild cache). Queried columns are indexed.
+"""
+
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional, Sequence
+
+from . import vice
+from .cache import file_hash
+from .utils import fileutils
+from .vice import vsf
+from .vice.vsf.vic2 import GraphicsMode
+from .vice.x64 import X64
+
+DEFAULT_DB = Path('xsnap-catalog.db')
+
+SCHEMA_VERSION = 1
+
+SCHEMA = '''
+CREATE TABLE snapshots (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT NOT NULL,             -- File content hash.
+    vsf_version TEXT,
+    machine TEXT,
+    vice_version TEXT,
+    mode TEXT,                      -- Graphics mode (GraphicsMode name, lower case).
+    bank INTEGER,
+    bitmap_addr INTEGER,
+    screen_addr INTEGER,
+    font_addr INTEGER,
+    sprites INTEGER,                -- Sprite enable mask ($d015).
+    active_sprites INTEGER,
+    screen_hash TEXT,               -- Screen content hash (same screens, same hash).
+    error TEXT
+) WITHOUT ROWID;
+CREATE TABLE modules (
+    path TEXT NOT NULL REFERENCES snapshots(path) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    version TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (path, name)
+) WITHOUT ROWID;
+CREATE INDEX snapshots_mode ON snapshots(mode, active_sprites);
+CREATE INDEX snapshots_machine ON snapshots(machine);
+CREATE INDEX snapshots_vice_version ON snapshots(vice_version);
+CREATE INDEX snapshots_active_sprites ON snapshots(active_sprites);
+CREATE INDEX snapshots_hash ON snapshots(hash);
+CREATE INDEX snapshots_screen_hash ON snapshots(screen_hash);
+CREATE INDEX modules_name ON modules(name, version);
+'''
+
+# Snapshot columns (in table order, path first).
+COLUMNS = ('path', 'size', 'mtime_ns', 'hash', 'vsf_version', 'machine', 'vice_version',
+           'mode', 'bank', 'bitmap_addr', 'screen_addr', 'font_addr', 'sprites',
+           'active_sprites', 'screen_hash', 'error')
+
+# Graphics mode names (query filter values).
+MODES = tuple(_.name.lower() for _ in GraphicsMode)
+
+# Snapshot file name suffixes.
+SUFFIXES = ('.vsf', '.vsf.gz', '.vsf.bz2', '.vsf.xz')
+
+Record = dict[str, Any]
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    """Open catalog database (created if it does not exist).
+
+    A database of a different schema version is rebuilt from scratch.
+    """
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA foreign_keys = ON')
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    if conn.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+        with conn:
+            conn.execute('DROP TABLE IF EXISTS modules')
+            conn.execute('DROP TABLE IF EXISTS snapshots')
+            conn.executescript(SCHEMA)
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    return conn
+
+
+def describe(file: Path) -> Record:
+    """Return catalog record of a snapshot file.
+
+    Errors are recorded too (error column), so broken files are not opened
+    again until they change.
+    """
+    stat = file.stat()
+    record: Record = dict.fromkeys(COLUMNS)
+    record.update(path=os.path.abspath(file), size=stat.st_size, mtime_ns=stat.st_mtime_ns,
+                  hash=file_hash(file), modules=[])
+    try:
+        with fileutils.open_file(file) as fobj:
+            if not vice.is_vice_snapshot(fobj):
+                raise vsf.VSFError('file is not a VSF snapshot')
+            snap = vsf.ViceSnapshotFile(fobj)
+            _describe_snapshot(snap, record)
+    except Exception as err:        # pylint: disable=broad-exception-caught
+        record['error'] = f'{type(err).__name__}: {err}'
+    return record
+
+
+def _describe_snapshot(snap: vsf.ViceSnapshotFile, record: Record) -> None:
+    """Fill record from snapshot."""
+    record.update(
+        vsf_version=snap.version(),
+        machine=snap.machine.decode(errors='replace'),
+        vice_version='.'.join(str(_) for _ in snap.vice_version),
+        modules=[(_.magic.decode(errors='replace'), _.version(), _.size) for _ in snap.modules]
+    )
+    if snap.truncated:
+        record['error'] = 'truncated snapshot'
+    if not snap.is_c64():
+        return
+    missing = [_.value.decode() for _ in X64.MODULES if not snap.has_module(_)]
+    if missing:
+        # Note: modules cut off by the end of file are missing, truncated is reported then.
+        record['error'] = record['error'] or f'missing module(s): {", ".join(missing)}'
+        return
+    x64 = X64(snap)
+    regs = x64.regs
+    record.update(
+        mode=regs.mode.name.lower(),
+        bank=regs.bank,
+        bitmap_addr=regs.bitmap_addr,
+        screen_addr=regs.screen_addr,
+        font_addr=regs.font_addr,
+        sprites=regs.sprites.enabled,
+        active_sprites=len(regs.sprites.active())
+    )
+    try:
+        shot = vice.load_c64(snap, Path(), vice.ExportOptions(formats=()))
+    except vice.UnsupportedSnapshot:
+        return
+    record['screen_hash'] = shot.image.digest()
+
+
+def _scan(file: Path, known_hash: Optional[str]) -> Record:
+    """Return record of changed file (only path, mtime and hash if content is the same)."""
+    if known_hash is not None:
+        stat = file.stat()
+        digest = file_hash(file)
+        if digest == known_hash:
+            return {'path': os.path.abspath(file), 'mtime_ns': stat.st_mtime_ns, 'hash': digest}
+    return describe(file)
+
+
+def iter_snapshots(paths: Iterable[Path]) -> Iterator[Path]:
+    """Iterate snapshot files (directories are searched recursively)."""
+    for path in paths:
+        if not path.is_dir():
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(SUFFIXES):
+                    yield Path(root) / name
+
+
+def store(conn: sqlite3.Connection, record: Record) -> None:
+    """Insert or replace snapshot record."""
+    if 'size' not in record:
+        conn.execute('UPDATE snapshots SET mtime_ns = ? WHERE path = ?',
+                     (record['mtime_ns'], record['path']))
+        return
+    conn.execute('DELETE FROM modules WHERE path = ?', (record['path'],))
+    conn.execute(f'INSERT OR REPLACE INTO snapshots ({", ".join(COLUMNS)})'
+                 f' VALUES ({", ".join("?" * len(COLUMNS))})',
+                 [record[_] for _ in COLUMNS])
+    conn.executemany('INSERT OR REPLACE INTO modules (path, name, version, size)'
+                     ' VALUES (?, ?, ?, ?)',
+                     [(record['path'], *_) for _ in record['modules']])
+
+
+def index(conn: sqlite3.Connection, paths: Iterable[Path], jobs: int = 1,
+          force: bool = False) -> tuple[int, int]:
+    """Index snapshot files, return numbers of (re)indexed and unchanged files.
+
+    Unchanged files (same size and mtime) are skipped unless forced.
+    """
+    known = {_[0]: _[1:]
+             for _ in conn.execute('SELECT path, size, mtime_ns, hash FROM snapshots')}
+    todo: list[tuple[Path, Optional[str]]] = []
+    unchanged = 0
+    for file in iter_snapshots(paths):
+        entry = known.get(os.path.abspath(file))
+        if entry is not None and not force:
+            stat = file.stat()
+            if stat.st_size == entry[0] and stat.st_mtime_ns == entry[1]:
+                unchanged += 1
+                continue
+            # Note: same size, new mtime - hash decides if it changed.
+            todo.append((file, entry[2] if stat.st_size == entry[0] else None))
+        else:
+            todo.append((file, None))
+
+    if jobs == 1 or len(todo) <= 1:
+        records: Iterable[Record] = (_scan(*_) for _ in todo)
+        with conn:
+            for record in records:
+                store(conn, record)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as pool:
+            with conn:
+                for record in pool.map(_scan, *zip(*todo), chunksize=8):
+                    store(conn, record)
+    return len(todo), unchanged
+
+
+def prune(conn: sqlite3.Connection) -> int:
+    """Remove records of files that no longer exist, return their number."""
+    gone = [(_[0],) for _ in conn.execute('SELECT path FROM snapshots')
+            if not os.path.exists(_[0])]
+    with conn:
+        conn.executemany('DELETE FROM snapshots WHERE path = ?', gone)
+    return len(gone)
+
+
+@dataclass
+class Filter:           # pylint: disable=too-many-instance-attributes
+    """Snapshot query filter (None = any value)."""
+    mode: Optional[str] = None
+    machine: Optional[str] = None
+    vice_version: Optional[str] = None      # Version or its prefix ('3.7' matches '3.7.1.0').
+    sprites: Optional[bool] = None          # With active sprites.
+    module: Optional[str] = None            # Snapshot contains the module.
+    screen_hash: Optional[str] = None
+    errors: Optional[bool] = None           # Snapshot could not be read.
+
+    def where(self) -> tuple[str, list[Any]]:
+        """Return SQL WHERE clause (empty if no filter is set) and its parameters."""
+        terms: list[str] = []
+        params: list[Any] = []
+        if self.mode is not None:
+            terms.append('mode = ?')
+            params.append(self.mode)
+        if self.machine is not None:
+            terms.append('machine = ?')
+            params.append(self.machine.upper())
+        if self.vice_version is not None:
+            # Note: GLOB (unlike LIKE) is case sensitive, it can use the index.
+            terms.append('(vice_version = ? OR vice_version GLOB ?)')
+            params += [self.vice_version, self.vice_version + '.*']
+        if self.sprites is not None:
+            terms.append('active_sprites > 0' if self.sprites else 'active_sprites = 0')
+        if self.module is not None:
+            terms.append('path IN (SELECT path FROM modules WHERE name = ?)')
+            params.append(self.module)
+        if self.screen_hash is not None:
+            terms.append('screen_hash = ?')
+            params.append(self.screen_hash)
+        if self.errors is not None:
+            terms.append('error IS NOT NULL' if self.errors else 'error IS NULL')
+        return (' WHERE ' + ' AND '.join(terms) if terms else ''), params
+
+
+def query(conn: sqlite3.Connection, filt: Filter,
+          columns: Sequence[str] = ('path',)) -> list[tuple[Any, ...]]:
+    """Return rows of snapshots matching the filter (ordered by path)."""
+    where, params = filt.where()
+    return conn.execute(f'SELECT {", ".join(columns)} FROM snapshots{where} ORDER BY path',
+                        params).fetchall()
+
+
+def count(conn: sqlite3.Connection, filt: Filter) -> int:
+    """Return number of snapshots matching the filter."""
+    where, params = filt.where()
+    return int(conn.execute(f'SELECT count(*) FROM snapshots{where}', params).fetchone()[0])
+
+# vim: set sts=4 et sw=4:
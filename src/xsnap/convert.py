@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Image format conversion.
+
+Images are decoded into screen data by the format unpack() function and
+encoded again by pack(). Conversion is possible between formats of the same
+screen type (multicolor, hires or text). Converting an image to its own
+format copies the file.
+"""
+
+import glob
+import os
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Union
+
+from .imageformats.c64 import (EcmTextImage, HiresImage, MultiColorImage, MultiTextImage,
+                               TextImage)
+from .imageformats.c64.formats import FormatError
+from .imageformats.c64.scrtypes import (EcmTextScreen, HiresScreen, MultiColorScreen,
+                                        MultiTextScreen, TextScreen)
+from .report import Output, Report
+from .utils import fileutils
+
+Screen = Union[HiresScreen, MultiColorScreen, TextScreen, MultiTextScreen, EcmTextScreen]
+
+# Formats by screen type.
+SCREEN_FORMATS = {
+    'multicolor': MultiColorImage.FORMATS,
+    'hires': HiresImage.FORMATS,
+    'text': TextImage.FORMATS,
+    'multitext': MultiTextImage.FORMATS,
+    'ecmtext': EcmTextImage.FORMATS
+}
+
+# All formats by file extension.
+FORMATS = {ext: mod for _ in SCREEN_FORMATS.values() for ext, mod in _.items()}
+
+
+def screen_type(ext: str) -> str:
+    """Return screen type of image format."""
+    for name, formats in SCREEN_FORMATS.items():
+        if ext in formats:
+            return name
+    raise FormatError(f'unsupported format: {ext}')
+
+
+def image_format(path: Path) -> str:
+    """Return image format (file extension) of a file."""
+    return path.suffix.lstrip('.').lower()
+
+
+def decode(data: bytes, ext: str) -> Screen:
+    """Decode image data in format ext into screen data."""
+    screen_type(ext)
+    screen: Screen = FORMATS[ext].unpack(data)
+    return screen
+
+
+def encode(screen: Screen, ext: str) -> bytes:
+    """Encode screen data in format ext."""
+    screen_type(ext)
+    data: bytes = FORMATS[ext].pack(screen)
+    return data
+
+
+def convert(data: bytes, src: str, dest: str) -> bytes:
+    """Convert image data from src to dest format."""
+    if screen_type(src) != screen_type(dest):
+        raise FormatError(f'cannot convert {screen_type(src)} image ({src})'
+                          f' to {screen_type(dest)} format ({dest})')
+    if src == dest:
+        return data
+    return encode(decode(data, src), dest)
+
+
+def convert_file(file: Path, outdir: Optional[Path], ext: str) -> Report:
+    """Convert image file to format ext, return report of written file.
+
+    Output file is written to outdir (the directory of the file by default).
+    """
+    src = image_format(file)
+    if src not in FORMATS:
+        raise FormatError(f'unsupported format: {src or file.name}')
+    dest = (outdir or file.parent) / f'{file.stem}.{ext}'
+    if src != ext:
+        fileutils.replace_file(dest, convert(file.read_bytes(), src, ext))
+    elif dest.exists() and os.path.samefile(file, dest):
+        return Report(str(file), warnings=[f'already in {ext} format'])
+    else:
+        # Note: no-op conversion is a plain copy (dest may be a content store link).
+        fileutils.replace_file(dest, file.read_bytes())
+    return Report(str(file), screen=screen_type(ext),
+                  outputs=[Output(str(dest), dest.stat().st_size)])
+
+
+def iter_files(paths: Iterable[Path],
+               exts: Optional[Iterable[str]] = None) -> Iterator[Path]:
+    """Iterate image files of supported formats (or of formats exts).
+
+    Directories are searched recursively, nonexistent paths are expanded as
+    glob patterns, files found there are filtered by format. Files are
+    returned as found (no list is built).
+    """
+    formats = set(FORMATS if exts is None else exts)
+    for path in paths:
+        if path.is_dir():
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    file = Path(root) / name
+                    if image_format(file) in formats:
+                        yield file
+        elif path.exists() or not any(_ in str(path) for _ in '*?['):
+            yield path
+        else:
+            for name in glob.iglob(str(path), recursive=True):
+                if image_format(Path(name)) in formats:
+                    yield Path(name)
+
+# vim: set sts=4 et sw=4:
@@ -1,12 +1,16 @@
 """Pack library."""
 
+from .ecmtext import EcmTextImage
 from .hires import HiresImage
 from .multicolor import MultiColorImage
+from .multitext import MultiTextImage
 from .text import TextImage
 
 __all__ = [
+    'EcmTextImage',
     'HiresImage',
     'MultiColorImage',
+    'MultiTextImage',
     'TextImage'
 ]
 
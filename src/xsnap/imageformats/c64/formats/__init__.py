@@ -11,4 +11,19 @@
 # from . import vid
 # from . import zom
 
+
+class FormatError(ValueError):
+    """Invalid image file."""
+
+
+def check_size(data: bytes, size: int) -> None:
+    """Raise FormatError if data is not size bytes long."""
+    if len(data) != size:
+        raise FormatError(f'invalid file size: {len(data)} bytes (expected {size})')
+
+
+def color(val: int) -> bytes:
+    """Return color value (low nibble) as a byte."""
+    return bytes([val & 0x0f])
+
 # vim: set sts=4 et sw=4:
@@ -0,0 +1,15 @@
+"""Extended background color character mode image formats."""
+
+from . import ect
+
+__all__ = [
+    'FORMATS',
+    'ect'
+]
+
+# Formats by file extension.
+FORMATS = {
+    'ect': ect
+}
+
+# vim: set sts=4 et sw=4:
@@ -0,0 +1,49 @@
+# pylint: disable=duplicate-code
+"""Extended background color character screen dump (raw, no native format).
+
+Screen RAM (1000), color RAM (1000), border, background, $d022, $d023,
+$d024, $d018 and the character set (2048 bytes, zero filled if not known).
+"""
+
+from .. import check_size, color
+from ...scrtypes import EcmTextScreen
+
+FILE_SIZE = 4054
+
+
+def pack(image: EcmTextScreen, _verbose: bool = False) -> bytes:
+    """Extended background color character screen dump."""
+    data = b''.join([
+        image.screen,
+        image.colors,
+        image.border,
+        image.bgcolor,
+        image.bgcolor1,
+        image.bgcolor2,
+        image.bgcolor3,
+        image.d018,
+        image.charset or bytes(2048)
+    ])
+
+    assert len(data) == FILE_SIZE
+
+    return data
+
+
+def unpack(data: bytes) -> EcmTextScreen:
+    """Extended background color character screen dump."""
+    check_size(data, FILE_SIZE)
+    charset = bytes(data[2006:4054])
+    return EcmTextScreen(
+        screen=bytes(data[0:1000]),
+        colors=bytes(data[1000:2000]),
+        bgcolor=color(data[2001]),
+        bgcolor1=color(data[2002]),
+        bgcolor2=color(data[2003]),
+        bgcolor3=color(data[2004]),
+        border=color(data[2000]),
+        d018=bytes(data[2005:2006]),
+        charset=charset if any(charset) else b''
+    )
+
+# vim: set sts=4 et sw=4:
@@ -5,9 +5,17 @@ from . import doo
 from . import hpc
 
 __all__ = [
+    'FORMATS',
     'aas',
     'doo',
     'hpc'
 ]
 
+# Formats by file extension.
+FORMATS = {
+    'aas': aas,
+    'doo': doo,
+    'hpc': hpc
+}
+
 # vim: set sts=4 et sw=4:
@@ -1,6 +1,7 @@
 # pylint: disable=duplicate-code,too-many-arguments
 """Doodle!."""
 
+from .. import check_size
 from ...scrtypes import HiresScreen
 
 LDADDR = b'\x00\x5c'
@@ -22,4 +23,13 @@ def pack(image: HiresScreen, _verbose: bool = False) -> bytes:
 
     return data
 
+
+def unpack(data: bytes) -> HiresScreen:
+    """Doodle!."""
+    check_size(data, FILE_SIZE)
+    return HiresScreen(
+        bitmap=bytes(data[1026:9026]),
+        screen=bytes(data[2:1002])
+    )
+
 # vim: set sts=4 et sw=4:
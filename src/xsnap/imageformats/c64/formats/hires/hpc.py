@@ -1,6 +1,7 @@
 # pylint: disable=duplicate-code,too-many-arguments
 """HiPic Creator."""
 
+from .. import check_size, color
 from ...scrtypes import HiresScreen
 
 LDADDR = b'\x00\x60'
@@ -21,4 +22,14 @@ def pack(image: HiresScreen, _verbose: bool = False) -> bytes:
 
     return data
 
+
+def unpack(data: bytes) -> HiresScreen:
+    """HiPic Creator."""
+    check_size(data, FILE_SIZE)
+    return HiresScreen(
+        bitmap=bytes(data[2:8002]),
+        screen=bytes(data[8002:9002]),
+        border=color(data[9002])
+    )
+
 # vim: set sts=4 et sw=4:
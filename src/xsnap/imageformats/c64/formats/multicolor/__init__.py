@@ -13,6 +13,7 @@ from . import vid
 from . import zom
 
 __all__ = [
+    'FORMATS',
     'a64',
     'ami',
     'art',
@@ -25,4 +26,18 @@ __all__ = [
     'zom'
 ]
 
+# Formats by file extension.
+FORMATS = {
+    'a64': a64,
+    'ami': ami,
+    'art': art,
+    'che': che,
+    'drp': drp,
+    'drz': drz,
+    'gas': gas,
+    'koa': koa,
+    'vid': vid,
+    'zom': zom
+}
+
 # vim: set sts=4 et sw=4:
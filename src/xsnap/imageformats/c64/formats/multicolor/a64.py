@@ -1,6 +1,7 @@
 # pylint: disable=duplicate-code,too-many-arguments
 """Artist 64."""
 
+from .. import check_size, color
 from ...scrtypes import MultiColorScreen
 
 # Load address.
@@ -26,4 +27,15 @@ def pack(image: MultiColorScreen, _verbose: bool = False) -> bytes:
 
     return data
 
+
+def unpack(data: bytes) -> MultiColorScreen:
+    """Artist 64."""
+    check_size(data, FILE_SIZE)
+    return MultiColorScreen(
+        bitmap=bytes(data[2:8002]),
+        screen=bytes(data[8194:9194]),
+        colors=bytes(data[9218:10_218]),
+        bgcolor=color(data[10_241])
+    )
+
 # vim: set sts=4 et sw=4:
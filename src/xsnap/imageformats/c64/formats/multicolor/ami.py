@@ -1,7 +1,7 @@
 # pylint: disable=duplicate-code
 """Amica Paint."""
 
-from .. import rle
+from .. import FormatError, color, rle
 from ...scrtypes import MultiColorScreen
 
 LDADDR = b'\x00\x40'
@@ -13,35 +13,27 @@ ESC = 0xc2
 MAX_REPEAT = 255
 
 
+# Single escape value.
+_ESC_SINGLE = bytes([ESC, 0x01, ESC])
+
+
+def _run(val: int, count: int) -> bytes:
+    """RLE run of any byte."""
+    return bytes((ESC, count, val))
+
+
+def _literal(data: bytes) -> bytes:
+    """Single values (escape value is encoded as a run)."""
+    return data.replace(_ESC_SINGLE[:1], _ESC_SINGLE)
+
+
 def packbuf(buf: bytes, verbose: bool = False) -> bytes:
     """Pack data."""
     assert len(buf) == BUFSIZE
 
-    result = [LDADDR]
-
-    for val, count in rle.rleiter(buf, MAX_REPEAT):
-        if verbose:
-            print(f'{count:3} x ${val:02x} ->', end=' ')
-        if count > 1:
-            # RLE run of any byte.
-            if verbose:
-                print(f'$c2 ${count:02x} ${val:02x}')
-            result.append(bytes([ESC, count, val]))
-        elif val != ESC:
-            # Single non-escape value.
-            if verbose:
-                print(f'${val:02x}')
-            result.append(bytes([val]))
-        else:
-            # Single escape $c2 value.
-            if verbose:
-                print(f'${ESC:02x} $01 ${val:02x}')
-            result.append(bytes([ESC, 0x01, val]))
-
-    # EOF marker.
-    result.append(b'\xc2\x00')
-
-    return b''.join(result)
+    # Note: EOF marker is $c2 $00.
+    return rle.encode(buf, MAX_REPEAT, _run, _literal, header=LDADDR,
+                      trailer=b'\xc2\x00', verbose=verbose)
 
 
 def pack(image: MultiColorScreen, verbose: bool = False) -> bytes:
@@ -57,4 +49,23 @@ def pack(image: MultiColorScreen, verbose: bool = False) -> bytes:
 
     return packbuf(data, verbose=verbose)
 
+
+def unpackbuf(data: bytes) -> bytes:
+    """Unpack data."""
+    # Note: count 0 is the EOF marker.
+    return rle.decode(data, ESC, BUFSIZE, zero=0)
+
+
+def unpack(data: bytes) -> MultiColorScreen:
+    """Amica Paint."""
+    if len(data) < len(LDADDR):
+        raise FormatError('file too short')
+    buf = unpackbuf(data[len(LDADDR):])
+    return MultiColorScreen(
+        bitmap=buf[0:8000],
+        screen=buf[8000:9000],
+        colors=buf[9000:10_000],
+        bgcolor=color(buf[10_000])
+    )
+
 # vim: set sts=4 et sw=4:
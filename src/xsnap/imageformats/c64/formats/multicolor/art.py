@@ -1,6 +1,7 @@
 # pylint: disable=duplicate-code,too-many-arguments
 """Advanced Art Studio (OCP Art Studio)."""
 
+from .. import check_size, color
 from ...scrtypes import MultiColorScreen
 
 LDADDR = b'\x00\x20'
@@ -24,4 +25,16 @@ def pack(image: MultiColorScreen, _verbose: bool = False) -> bytes:
 
     return data
 
+
+def unpack(data: bytes) -> MultiColorScreen:
+    """Advanced Art Studio (OCP Art Studio)."""
+    check_size(data, FILE_SIZE)
+    return MultiColorScreen(
+        bitmap=bytes(data[2:8002]),
+        screen=bytes(data[8002:9002]),
+        colors=bytes(data[9018:10_018]),
+        bgcolor=color(data[9003]),
+        border=color(data[9002])
+    )
+
 # vim: set sts=4 et sw=4:
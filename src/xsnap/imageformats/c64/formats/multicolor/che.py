@@ -1,6 +1,7 @@
 # pylint: disable=duplicate-code,too-many-arguments
 """Cheese Paint."""
 
+from .. import check_size, color
 from ...scrtypes import MultiColorScreen
 
 LDADDR = b'\x00\x80'
@@ -26,4 +27,15 @@ def pack(image: MultiColorScreen, _verbose: bool = False) -> bytes:
 
     return data
 
+
+def unpack(data: bytes) -> MultiColorScreen:
+    """Cheese Paint."""
+    check_size(data, FILE_SIZE)
+    return MultiColorScreen(
+        bitmap=bytes(data[2:8002]),
+        screen=bytes(data[16_898:17_898]),
+        colors=bytes(data[18_434:19_434]),
+        bgcolor=color(data[20_479])
+    )
+
 # vim: set sts=4 et sw=4:
@@ -1,7 +1,7 @@
 # pylint: disable=duplicate-code
 """Draz Paint (compressed)."""
 
-from .. import rle
+from .. import FormatError, color, rle
 from ...scrtypes import MultiColorScreen
 
 LDADDR = b'\x00\x58'
@@ -17,39 +17,22 @@ def packbuf(buf: bytes, esc: int, verbose: bool = False) -> bytes:
     """Pack data."""
     assert len(buf) == BUFSIZE
 
-    result = [
-        LDADDR,
-        MAGIC,
-        int.to_bytes(esc)
-    ]
-
-    for val, count in rle.rleiter(buf, MAX_REPEAT):
-        if verbose:
-            print(f'{count:3} x ${val:02x} ->', end=' ')
-        if count > 1:
-            # RLE run of any byte.
-            if verbose:
-                print(f'${esc:02x} ${count:02x} ${val:02x}')
-            result.append(bytes([esc, count, val]))
-        elif val != esc:
-            # Single non-escape value.
-            if verbose:
-                print(f'${val:02x}')
-            result.append(bytes([val]))
-        else:
-            # Single escape $c2 value.
-            if verbose:
-                print(f'${esc:02x} $01 ${val:02x}')
-            result.append(bytes([esc, 0x01, val]))
-
-    return b''.join(result)
+    esc_single = bytes([esc, 0x01, esc])
 
+    def run(val: int, count: int) -> bytes:
+        """RLE run of any byte."""
+        return bytes((esc, count, val))
+
+    def literal(data: bytes) -> bytes:
+        """Single values (escape value is encoded as a run)."""
+        return data.replace(esc_single[:1], esc_single)
+
+    return rle.encode(buf, MAX_REPEAT, run, literal,
+                      header=b''.join([LDADDR, MAGIC, int.to_bytes(esc)]), verbose=verbose)
 
-def pack(image: MultiColorScreen, escval: int = -1,
-         verbose: bool = False) -> bytes:
-    """Draz Paint (compressed)."""
-    assert escval <= 0xff
 
+def buffer(image: MultiColorScreen) -> bytes:
+    """Return unpacked data."""
     data = b''.join([
         image.colors,
         bytes(24),
@@ -58,13 +41,53 @@ def pack(image: MultiColorScreen, escval: int = -1,
         image.bitmap,
         image.bgcolor
     ])
-
     assert len(data) == BUFSIZE
+    return data
+
+
+def default_esc(image: MultiColorScreen) -> int:
+    """Return the default escape value (the least common value)."""
+    # Same as rle.find_esc_byte(buffer(image)), from cached component histograms.
+    counts = rle.merge(image.histogram('colors'), image.histogram('screen'),
+                       image.histogram('bitmap'))
+    counts[0x00] += 48
+    counts[ord(image.bgcolor)] += 1
+    return rle.least_common(counts)
+
+
+def optimal_esc(image: MultiColorScreen) -> tuple[int, int]:
+    """Return escape value giving the smallest file, and bytes saved by it."""
+    sizes = rle.escape_sizes(buffer(image), MAX_REPEAT)
+    size = min(sizes)
+    return sizes.index(size), sizes[default_esc(image)] - size
 
-    esc = escval
-    if escval < 0:
-        esc = rle.find_esc_byte(data)
 
-    return packbuf(data, esc, verbose=verbose)
+def pack(image: MultiColorScreen, escval: int = -1,
+         verbose: bool = False) -> bytes:
+    """Draz Paint (compressed)."""
+    assert escval <= 0xff
+
+    esc = escval if escval >= 0 else default_esc(image)
+
+    return packbuf(buffer(image), esc, verbose=verbose)
+
+
+def unpackbuf(data: bytes, esc: int) -> bytes:
+    """Unpack data."""
+    return rle.decode(data, esc, BUFSIZE)
+
+
+def unpack(data: bytes) -> MultiColorScreen:
+    """Draz Paint (compressed)."""
+    header = len(LDADDR) + len(MAGIC)
+    if len(data) <= header or data[len(LDADDR):header] != MAGIC:
+        raise FormatError('not a Draz Paint (compressed) image')
+    buf = unpackbuf(data[header + 1:], data[header])
+    return MultiColorScreen(
+        bitmap=buf[2048:10_048],
+        screen=buf[1024:2024],
+        colors=buf[0:1000],
+        bgcolor=color(buf[10_048])
+    )
 
 # vim: set sts=4 et sw=4:
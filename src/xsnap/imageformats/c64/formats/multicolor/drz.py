@@ -1,6 +1,7 @@
 # pylint: disable=duplicate-code,too-many-arguments
 """Draz Paint (uncompressed)."""
 
+from .. import check_size, color
 from ...scrtypes import MultiColorScreen
 
 LDADDR = b'\x00\x58'
@@ -24,4 +25,15 @@ def pack(image: MultiColorScreen, _verbose: bool = False) -> bytes:
 
     return data
 
+
+def unpack(data: bytes) -> MultiColorScreen:
+    """Draz Paint (uncompressed)."""
+    check_size(data, FILE_SIZE)
+    return MultiColorScreen(
+        bitmap=bytes(data[2050:10_050]),
+        screen=bytes(data[1026:2026]),
+        colors=bytes(data[2:1002]),
+        bgcolor=color(data[10_050])
+    )
+
 # vim: set sts=4 et sw=4:
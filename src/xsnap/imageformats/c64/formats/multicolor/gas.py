@@ -1,7 +1,7 @@
 # pylint: disable=duplicate-code
 """Graphic Assault System image."""
 
-from .. import rle
+from .. import FormatError, color, rle
 from ...scrtypes import MultiColorScreen
 
 LDADDR = b'\x00\x60'
@@ -15,29 +15,26 @@ REPEAT = 255
 FOOTER = "gas UTILITY COMPRESSED GRAPHIC- bRUCE bOWDEN hEURISTICS 1987,1988".encode()
 
 
-def packbuf(buf: bytes, verbose: bool = False) -> bytes:
-    """Pack data."""
-    assert len(buf) == BUFSIZE
+def _run(val: int, count: int) -> bytes:
+    """RLE run."""
+    return bytes((count, val))
 
-    result = [
-        LDADDR,
-        int.to_bytes(MAGIC)
-    ]
 
-    for val, count in rle.rleiter(buf, REPEAT):
-        if verbose:
-            print(f'{count:3} x ${val:02x} ->', end=' ')
-        # RLE run.
-        if verbose:
-            print(f'${count:02x} ${val:02x}')
-        result.append(bytes([count, val]))
+def _literal(data: bytes) -> bytes:
+    """Single values (runs of length 1)."""
+    result = bytearray(2 * len(data))
+    result[0::2] = b'\x01' * len(data)
+    result[1::2] = data
+    return bytes(result)
 
-    # EOF marker.
-    result.append(b'\x00\x00')
 
-    result.append(FOOTER)
+def packbuf(buf: bytes, verbose: bool = False) -> bytes:
+    """Pack data."""
+    assert len(buf) == BUFSIZE
 
-    return b''.join(result)
+    # Note: EOF marker is $00 $00.
+    return rle.encode(buf, REPEAT, _run, _literal, header=LDADDR + int.to_bytes(MAGIC),
+                      trailer=b'\x00\x00' + FOOTER, max_ratio=2, verbose=verbose)
 
 
 def pack(image: MultiColorScreen, verbose: bool = False) -> bytes:
@@ -53,4 +50,22 @@ def pack(image: MultiColorScreen, verbose: bool = False) -> bytes:
 
     return packbuf(data, verbose=verbose)
 
+
+def unpackbuf(data: bytes) -> bytes:
+    """Unpack data."""
+    return rle.decode_pairs(data, BUFSIZE)
+
+
+def unpack(data: bytes) -> MultiColorScreen:
+    """Graphic Assault System image."""
+    if len(data) < 3 or data[2] != MAGIC:
+        raise FormatError('not a Graphic Assault System image')
+    buf = unpackbuf(data[3:])
+    return MultiColorScreen(
+        bitmap=buf[0:8000],
+        screen=buf[8000:9000],
+        colors=buf[9000:10_000],
+        bgcolor=color(buf[10_000])
+    )
+
 # vim: set sts=4 et sw=4:
@@ -1,6 +1,7 @@
 # pylint: disable=duplicate-code,too-many-arguments
 """Koala Painter."""
 
+from .. import check_size, color
 from ...scrtypes import MultiColorScreen
 
 LDADDR = b'\x00\x60'
@@ -22,4 +23,15 @@ def pack(image: MultiColorScreen, _verbose: bool = False) -> bytes:
 
     return data
 
+
+def unpack(data: bytes) -> MultiColorScreen:
+    """Koala Painter."""
+    check_size(data, FILE_SIZE)
+    return MultiColorScreen(
+        bitmap=bytes(data[2:8002]),
+        screen=bytes(data[8002:9002]),
+        colors=bytes(data[9002:10_002]),
+        bgcolor=color(data[10_002])
+    )
+
 # vim: set sts=4 et sw=4:
@@ -1,7 +1,7 @@
 # pylint: disable=duplicate-code
 """Zoomatic."""
 
-from .. import rle
+from .. import FormatError, color, rle
 from ...scrtypes import MultiColorScreen
 
 LDADDR = b'\x00\x60'
@@ -15,55 +15,76 @@ def packbuf(buf: bytes, esc: int, verbose: bool = False) -> bytes:
     """Pack data."""
     assert len(buf) == BUFSIZE
 
-    result = [LDADDR]
-
-    for val, count in rle.rleiter(buf, MAX_REPEAT):
-        if verbose:
-            print(f'{count:3} x ${val:02x} ->', end=' ')
-        if count > 1:
-            # RLE run of any byte.
-            if count == 256:
-                count = 0
-            if verbose:
-                print(f'${esc:02x} ${count:02x} ${val:02x}')
-            # Note: reversed order.
-            result.append(bytes([val, count, esc]))
-        elif val != esc:
-            # Single non-escape value.
-            if verbose:
-                print(f'${val:02x}')
-            result.append(bytes([val]))
-        else:
-            # Single escape $c2 value.
-            if verbose:
-                print(f'${esc:02x} $01 ${val:02x}')
-            # Note: reversed order.
-            result.append(bytes([val, 0x01, esc]))
-
-    # Escape byte.
-    result.append(bytes([esc]))
-
-    return b''.join(result)
+    esc_single = bytes([esc, 0x01, esc])
 
+    def run(val: int, count: int) -> bytes:
+        """RLE run of any byte (count 256 is stored as 0)."""
+        # Note: reversed order.
+        return bytes((val, count & 0xff, esc))
 
-def pack(image: MultiColorScreen, escval: int = -1,
-         verbose: bool = False) -> bytes:
-    """Zoomatic."""
-    assert escval <= 0xff
+    def literal(data: bytes) -> bytes:
+        """Single values (escape value is encoded as a run)."""
+        return data.replace(esc_single[:1], esc_single)
+
+    # Note: file ends with the escape byte.
+    return rle.encode(buf, MAX_REPEAT, run, literal, header=LDADDR,
+                      trailer=bytes([esc]), verbose=verbose)
 
-    last_byte = int.to_bytes((ord(image.border) << 4) | ord(image.bgcolor))
 
-    data = b''.join([
+def buffer(image: MultiColorScreen) -> bytes:
+    """Return unpacked data."""
+    return b''.join([
         image.bitmap,
         image.screen,
         image.colors,
-        last_byte
+        int.to_bytes((ord(image.border) << 4) | ord(image.bgcolor))
     ])
 
-    esc = escval
-    if escval < 0:
-        esc = rle.find_esc_byte(data)
 
-    return packbuf(data, esc, verbose=verbose)
+def default_esc(image: MultiColorScreen) -> int:
+    """Return the default escape value (the least common value)."""
+    # Same as rle.find_esc_byte(buffer(image)), from cached component histograms.
+    counts = rle.merge(image.histogram('bitmap'), image.histogram('screen'),
+                       image.histogram('colors'))
+    counts[(ord(image.border) << 4) | ord(image.bgcolor)] += 1
+    return rle.least_common(counts)
+
+
+def optimal_esc(image: MultiColorScreen) -> tuple[int, int]:
+    """Return escape value giving the smallest file, and bytes saved by it."""
+    sizes = rle.escape_sizes(buffer(image), MAX_REPEAT)
+    size = min(sizes)
+    return sizes.index(size), sizes[default_esc(image)] - size
+
+
+def pack(image: MultiColorScreen, escval: int = -1,
+         verbose: bool = False) -> bytes:
+    """Zoomatic."""
+    assert escval <= 0xff
+
+    esc = escval if escval >= 0 else default_esc(image)
+
+    return packbuf(buffer(image), esc, verbose=verbose)
+
+
+def unpackbuf(data: bytes) -> bytes:
+    """Unpack data (the last byte is the escape value)."""
+    # Note: decoded backwards, reversed runs are escape value, count and value.
+    rev = bytes(data)[::-1]
+    return rle.decode(rev[1:], rev[0], BUFSIZE)[::-1]
+
+
+def unpack(data: bytes) -> MultiColorScreen:
+    """Zoomatic."""
+    if len(data) <= len(LDADDR):
+        raise FormatError('file too short')
+    buf = unpackbuf(data[len(LDADDR):])
+    return MultiColorScreen(
+        bitmap=buf[0:8000],
+        screen=buf[8000:9000],
+        colors=buf[9000:10_000],
+        bgcolor=color(buf[10_000]),
+        border=color(buf[10_000] >> 4)
+    )
 
 # vim: set sts=4 et sw=4:
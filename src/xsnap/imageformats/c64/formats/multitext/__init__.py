@@ -0,0 +1,15 @@
+"""Multicolor character mode image formats."""
+
+from . import mct
+
+__all__ = [
+    'FORMATS',
+    'mct'
+]
+
+# Formats by file extension.
+FORMATS = {
+    'mct': mct
+}
+
+# vim: set sts=4 et sw=4:
@@ -1,17 +1,36 @@
-"""@@@"""
+"""Run-length encoding."""
 
 import random
-from typing import Iterator
+import re
+from typing import Callable, Iterator, Union
+
+from .. import FormatError
+from ...scrtypes import histogram
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+# Run of two or more identical bytes.
+_RUN = re.compile(rb'(.)\1+', re.DOTALL)
+
+# Sequence of count 1 pairs (single values).
+_SINGLES = re.compile(rb'\x01+')
 
 
 def find_esc_byte(buf: bytes) -> int:
     """Find the least common value in a buffer."""
-    counts = [0] * 256
-    for val in buf:
-        counts[val] += 1
+    return least_common(histogram(buf))
+
+
+def least_common(counts: list[int]) -> int:
+    """Return the least common value of a histogram (lowest one on ties)."""
     return counts.index(min(counts))
 
 
+def merge(*histograms: list[int]) -> list[int]:
+    """Return sum of histograms."""
+    return [sum(_) for _ in zip(*histograms)]
+
+
 def random_buffer(size: int) -> bytes:
     """Generate buffer of random data."""
     return random.randbytes(size)
@@ -39,4 +58,151 @@ def rleiter(buf: bytes, max_repeat: int) -> Iterator[tuple[int, int]]:
     assert prev is not None     # Shut mypy up.
     yield (prev, count)
 
+
+def runs(buf: bytes) -> Iterator[tuple[int, int]]:
+    """Iterate runs of two or more identical bytes, return (start, end) pairs.
+
+    Run boundaries are found by the regular expression engine, bytes between
+    runs are single (non-repeated) values.
+    """
+    for match in _RUN.finditer(buf):
+        yield match.span()
+
+
+def escape_sizes(buf: Buffer, max_repeat: int) -> list[int]:
+    """Return encoded size of buffer for every escape value.
+
+    Escape coded formats store a run chunk in 3 bytes and a single value in
+    1 byte, except the escape value itself which is stored as a 3 byte run.
+    The size is computed from the run list (runs split as in encode()), with
+    no trial encoding: the size of the runs and single values plus two bytes
+    for every single occurrence of the escape value. Header and trailer are
+    not included.
+    """
+    buf = bytes(buf)
+    singles = histogram(buf)
+    chunks = 0
+    for start, end in runs(buf):
+        val = buf[start]
+        full, rest = divmod(end - start, max_repeat)
+        singles[val] -= end - start
+        if rest == 1:
+            singles[val] += 1
+        chunks += full + (rest > 1)
+    size = 3 * chunks + sum(singles)
+    return [size + 2 * _ for _ in singles]
+
+
+def encode(buf: Buffer, max_repeat: int,   # pylint: disable=too-many-arguments
+           run: Callable[[int, int], bytes], literal: Callable[[bytes], bytes],
+           header: bytes = b'', trailer: bytes = b'', max_ratio: int = 3,
+           verbose: bool = False) -> bytes:
+    """Run-length encode buffer.
+
+    Runs are split into chunks of at most max_repeat bytes (a trailing chunk
+    of a single byte is a literal). run(value, count) returns encoded run,
+    literal(data) returns encoded sequence of single values. max_ratio is the
+    worst case encoded to input size ratio of the format.
+
+    Output is the same as encoding (value, count) pairs returned by rleiter().
+    """
+    # pylint: disable=too-many-positional-arguments,too-many-locals
+    buf = bytes(buf)
+    if verbose:
+        dump(buf, max_repeat, run, literal)
+
+    out = bytearray(len(header) + max_ratio * len(buf) + len(trailer))
+    pos = len(header)
+    out[:pos] = header
+
+    last = 0
+    for start, end in runs(buf):
+        if last < start:
+            data = literal(buf[last:start])
+            out[pos:pos + len(data)] = data
+            pos += len(data)
+        val = buf[start]
+        full, rest = divmod(end - start, max_repeat)
+        if full:
+            data = run(val, max_repeat) * full
+            out[pos:pos + len(data)] = data
+            pos += len(data)
+        if rest > 1:
+            data = run(val, rest)
+            out[pos:pos + len(data)] = data
+            pos += len(data)
+        elif rest:
+            data = literal(buf[start:start + 1])
+            out[pos:pos + len(data)] = data
+            pos += len(data)
+        last = end
+    if last < len(buf):
+        data = literal(buf[last:])
+        out[pos:pos + len(data)] = data
+        pos += len(data)
+
+    out[pos:pos + len(trailer)] = trailer
+    pos += len(trailer)
+
+    return bytes(out[:pos])
+
+
+def decode(data: Buffer, esc: int, size: int, zero: int = 256) -> bytes:
+    """Decode escape coded data to size bytes.
+
+    Runs are stored as escape value, count and value. Single values between
+    runs are copied as slices, runs are found by bytes.find(). Count 0 stands
+    for zero repeats (256 by default).
+    """
+    data = bytes(data)
+    marker = bytes([esc])
+    out = bytearray()
+    pos = 0
+    while len(out) < size:
+        found = data.find(marker, pos)
+        if found < 0:
+            found = len(data)
+        out += data[pos:found]
+        if len(out) >= size or found == len(data):
+            break
+        if found + 3 > len(data):
+            raise FormatError('unexpected end of data in run')
+        out += data[found + 2:found + 3] * (data[found + 1] or zero)
+        pos = found + 3
+    if len(out) < size:
+        raise FormatError(f'unexpected end of data: {len(out)} bytes decoded (expected {size})')
+    return bytes(out[:size])
+
+
+def decode_pairs(data: Buffer, size: int) -> bytes:
+    """Decode (count, value) pairs to size bytes, data ends with count 0.
+
+    Sequences of single values (count 1) are copied as slices.
+    """
+    data = bytes(data)
+    counts = data[0::2]
+    values = data[1::2]
+    end = counts.find(0)
+    if end < 0 or end > len(values):
+        end = len(values)
+
+    out = bytearray()
+    last = 0
+    for start, stop in [_.span() for _ in _SINGLES.finditer(counts, 0, end)] + [(end, end)]:
+        for pos in range(last, start):
+            out += values[pos:pos + 1] * counts[pos]
+        out += values[start:stop]
+        last = stop
+    if len(out) < size:
+        raise FormatError(f'unexpected end of data: {len(out)} bytes decoded (expected {size})')
+    return bytes(out[:size])
+
+
+def dump(buf: bytes, max_repeat: int, run: Callable[[int, int], bytes],
+         literal: Callable[[bytes], bytes]) -> None:
+    """Print encoding of every run."""
+    for val, count in rleiter(buf, max_repeat):
+        data = run(val, count) if count > 1 else literal(bytes([val]))
+        print(f'{count:3} x ${val:02x} ->', ' '.join(f'${_:02x}' for _ in data))
+
 # vim: set sts=4 et sw=4:
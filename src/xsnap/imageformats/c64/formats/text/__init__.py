@@ -4,8 +4,15 @@ from . import pdr
 from . import pet
 
 __all__ = [
+    'FORMATS',
     'pdr',
     'pet'
 ]
 
+# Formats by file extension.
+FORMATS = {
+    'pdr': pdr,
+    'pet': pet
+}
+
 # vim: set sts=4 et sw=4:
@@ -1,6 +1,7 @@
 # pylint: disable=duplicate-code,too-many-arguments
 """Petdraw64."""
 
+from .. import check_size, color
 from ...scrtypes import TextScreen
 
 LDADDR = b'\x71\x31'
@@ -24,4 +25,15 @@ def pack(image: TextScreen, _verbose: bool = False) -> bytes:
 
     return data
 
+
+def unpack(data: bytes) -> TextScreen:
+    """Petdraw64."""
+    check_size(data, FILE_SIZE)
+    return TextScreen(
+        screen=bytes(data[5:1005]),
+        colors=bytes(data[1029:2029]),
+        bgcolor=color(data[3]),
+        border=color(data[4])
+    )
+
 # vim: set sts=4 et sw=4:
@@ -1,6 +1,7 @@
 # pylint: disable=duplicate-code,too-many-arguments
 """PETSCII Editor."""
 
+from .. import check_size, color
 from ...scrtypes import TextScreen
 
 LDADDR = b'\x00\x30'
@@ -24,4 +25,16 @@ def pack(image: TextScreen, _verbose: bool = False) -> bytes:
 
     return data
 
+
+def unpack(data: bytes) -> TextScreen:
+    """PETSCII Editor."""
+    check_size(data, FILE_SIZE)
+    return TextScreen(
+        screen=bytes(data[2:1002]),
+        colors=bytes(data[1026:2026]),
+        bgcolor=color(data[1003]),
+        border=color(data[1002]),
+        d018=bytes(data[1004:1005])
+    )
+
 # vim: set sts=4 et sw=4:
@@ -1,7 +1,10 @@
 """Hires image."""
 
 import random
+from typing import Optional
 
+from ..raster import Frame
+from . import render
 from .formats import hires
 from .scrtypes import HiresScreen
 
@@ -9,12 +12,43 @@ from .scrtypes import HiresScreen
 class HiresImage:
     """Hires image."""
 
+    # Output formats by file extension.
+    FORMATS = hires.FORMATS
+
     def __init__(self, bitmap: bytes, screen: bytes, border: bytes = b'\x00') -> None:
         assert len(bitmap) == 8000
         assert len(screen) == 1000
         assert len(border) == 1
         assert ord(border) < 16
         self._image = HiresScreen(bitmap, screen, border)
+        # Sprites drawn over rendered images.
+        self.sprites: list[render.Sprite] = []
+
+    @property
+    def data(self) -> HiresScreen:
+        """Screen data."""
+        return self._image
+
+    def digest(self) -> str:
+        """Content hash of the image (same screens have same hash)."""
+        return render.digest(self._image.digest(), self.sprites)
+
+    def histogram(self, component: str) -> list[int]:
+        """Byte value histogram of a screen component (cached)."""
+        return self._image.histogram(component)
+
+    def render(self, border: bool = False) -> Frame:
+        """Render image to palette indices (with border of full frame)."""
+        return render.hires(self._image, border, self.sprites)
+
+    def is_blank(self) -> bool:
+        """Return True if the screen is blank."""
+        return self._image.is_blank()
+
+    def encode(self, ext: str) -> bytes:
+        """Export image in format given by file extension."""
+        data: bytes = self.FORMATS[ext].pack(self._image)
+        return data
 
     def as_aas(self) -> bytes:
         """Export image in Art Studio Hires format."""
@@ -60,11 +94,12 @@ class WhiteHiresC64(HiresImage):
 
 
 class RandomHiresC64(HiresImage):
-    """Random hires image."""
-    def __init__(self) -> None:
-        bitmap = random.randbytes(8000)
-        screen = random.randbytes(1000)
-        border = random.randrange(15).to_bytes()
+    """Random hires image (rnd is seeded from the global generator by default)."""
+    def __init__(self, rnd: Optional[random.Random] = None) -> None:
+        rnd = rnd or random.Random(random.getrandbits(64))
+        bitmap = rnd.randbytes(8000)
+        screen = rnd.randbytes(1000)
+        border = rnd.randrange(15).to_bytes()
         super().__init__(bitmap, screen, border)
 
 # vim: set sts=4 et sw=4:
@@ -1,7 +1,10 @@
 """Multicolor image."""
 
 import random
+from typing import Optional
 
+from ..raster import Frame
+from . import render
 from .formats import multicolor
 from .scrtypes import MultiColorScreen
 
@@ -9,6 +12,9 @@ from .scrtypes import MultiColorScreen
 class MultiColorImage:
     """Multicolor image."""
 
+    # Output formats by file extension.
+    FORMATS = multicolor.FORMATS
+
     def __init__(self, bitmap: bytes,   # pylint: disable=too-many-arguments
                  screen: bytes, colors: bytes, bgcolor: bytes,
                  border: bytes) -> None:
@@ -20,6 +26,50 @@ class MultiColorImage:
         assert ord(bgcolor) < 16
         assert ord(border) < 16
         self._image = MultiColorScreen(bitmap, screen, colors, bgcolor, border)
+        # Sprites drawn over rendered images.
+        self.sprites: list[render.Sprite] = []
+
+    @property
+    def data(self) -> MultiColorScreen:
+        """Screen data."""
+        return self._image
+
+    def digest(self) -> str:
+        """Content hash of the image (same screens have same hash)."""
+        return render.digest(self._image.digest(), self.sprites)
+
+    def histogram(self, component: str) -> list[int]:
+        """Byte value histogram of a screen component (cached)."""
+        return self._image.histogram(component)
+
+    def render(self, border: bool = False) -> Frame:
+        """Render image to palette indices (with border of full frame)."""
+        return render.multicolor(self._image, border, self.sprites)
+
+    def is_blank(self) -> bool:
+        """Return True if the screen is blank."""
+        return self._image.is_blank()
+
+    def encode(self, ext: str, escval: int = -1) -> bytes:
+        """Export image in format given by file extension.
+
+        Escape value is used by escape coded formats only (drp, zom).
+        """
+        data: bytes
+        if escval >= 0 and hasattr(self.FORMATS[ext], 'optimal_esc'):
+            data = self.FORMATS[ext].pack(self._image, escval=escval)
+        else:
+            data = self.FORMATS[ext].pack(self._image)
+        return data
+
+    def optimal_escape(self, ext: str) -> Optional[tuple[int, int]]:
+        """Return escape value giving the smallest file and bytes saved by it,
+        None if the format is not escape coded.
+        """
+        if not hasattr(self.FORMATS[ext], 'optimal_esc'):
+            return None
+        best: tuple[int, int] = self.FORMATS[ext].optimal_esc(self._image)
+        return best
 
     def as_amica(self) -> bytes:
         """Export image in Amica Paint format."""
@@ -37,9 +87,9 @@ class MultiColorImage:
         """Export image in Cheese Paint format."""
         return multicolor.che.pack(self._image)
 
-    def as_drp(self) -> bytes:
+    def as_drp(self, escval: int = -1) -> bytes:
         """Export image in Draz Paint (compressed) format."""
-        return multicolor.drp.pack(self._image)
+        return multicolor.drp.pack(self._image, escval=escval)
 
     def as_drz(self) -> bytes:
         """Export image in Draz Paint (uncompressed) format."""
@@ -97,13 +147,14 @@ class WhiteMultiC64(MultiColorImage):
 
 
 class RandomMultiC64(MultiColorImage):
-    """Random multicolor image."""
-    def __init__(self) -> None:
-        bitmap = random.randbytes(8000)
-        screen = random.randbytes(1000)
-        colors = random.randbytes(1000)
-        bgcolor = random.randrange(15).to_bytes()
-        border = random.randrange(15).to_bytes()
+    """Random multicolor image (rnd is seeded from the global generator by default)."""
+    def __init__(self, rnd: Optional[random.Random] = None) -> None:
+        rnd = rnd or random.Random(random.getrandbits(64))
+        bitmap = rnd.randbytes(8000)
+        screen = rnd.randbytes(1000)
+        colors = rnd.randbytes(1000)
+        bgcolor = rnd.randrange(15).to_bytes()
+        border = rnd.randrange(15).to_bytes()
         super().__init__(bitmap, screen, colors, bgcolor, border)
 
 # vim: set sts=4 et sw=4:
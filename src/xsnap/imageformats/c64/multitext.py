@@ -0,0 +1,57 @@
+"""Multicolor character image."""
+
+from ..raster import Frame
+from . import render
+from .formats import multitext
+from .scrtypes import MultiTextScreen
+
+
+class MultiTextImage:
+    """Multicolor character image."""
+
+    # Output formats by file extension.
+    FORMATS = multitext.FORMATS
+
+    def __init__(self, screen: bytes,   # pylint: disable=too-many-arguments
+                 colors: bytes, bgcolor: bytes, bgcolor1: bytes, bgcolor2: bytes,
+                 border: bytes, d018: bytes = b'\x00', charset: bytes = b'') -> None:
+        # pylint: disable=too-many-positional-arguments
+        assert len(screen) == 1000
+        assert len(colors) == 1000
+        assert len(bgcolor) == len(bgcolor1) == len(bgcolor2) == 1
+        assert len(border) == 1
+        assert len(d018) == 1
+        assert ord(bgcolor) < 16 and ord(bgcolor1) < 16 and ord(bgcolor2) < 16
+        assert ord(border) < 16
+        assert len(charset) in (0, 2048)
+        self._image = MultiTextScreen(screen, colors, bgcolor, bgcolor1, bgcolor2, border,
+                                      d018, bytes(charset))
+        # Sprites drawn over rendered images.
+        self.sprites: list[render.Sprite] = []
+
+    def digest(self) -> str:
+        """Content hash of the image (same screens have same hash)."""
+        return render.digest(self._image.digest(), self.sprites)
+
+    def histogram(self, component: str) -> list[int]:
+        """Byte value histogram of a screen component (cached)."""
+        return self._image.histogram(component)
+
+    def render(self, border: bool = False) -> Frame:
+        """Render image to palette indices (with border of full frame)."""
+        return render.multitext(self._image, border, self.sprites)
+
+    def is_blank(self) -> bool:
+        """Return True if the screen is blank."""
+        return self._image.is_blank()
+
+    def encode(self, ext: str) -> bytes:
+        """Export image in format given by file extension."""
+        data: bytes = self.FORMATS[ext].pack(self._image)
+        return data
+
+    def as_mct(self) -> bytes:
+        """Export image as multicolor character screen dump."""
+        return multitext.mct.pack(self._image)
+
+# vim: set sts=4 et sw=4:
@@ -0,0 +1,44 @@
+"""C64 color palettes (RGB)."""
+
+Palette = tuple[tuple[int, int, int], ...]
+
+
+def _palette(*colors: int) -> Palette:
+    """Return palette of 0xRRGGBB colors."""
+    return tuple(((_ >> 16) & 0xff, (_ >> 8) & 0xff, _ & 0xff) for _ in colors)
+
+
+# Philip "Pepto" Timmermann, <https://www.pepto.de/projects/colorvic/2001/>.
+PEPTO = _palette(
+    0x000000, 0xffffff, 0x68372b, 0x70a4b2,
+    0x6f3d86, 0x588d43, 0x352879, 0xb8c76f,
+    0x6f4f25, 0x433900, 0x9a6759, 0x444444,
+    0x6c6c6c, 0x9ad284, 0x6c5eb5, 0x959595
+)
+
+# Colodore, <https://www.pepto.de/projects/colorvic/>.
+COLODORE = _palette(
+    0x000000, 0xffffff, 0x813338, 0x75cec8,
+    0x8e3c97, 0x56ac4d, 0x2e2c9b, 0xedf171,
+    0x8e5029, 0x553800, 0xc46c71, 0x4a4a4a,
+    0x7b7b7b, 0xa9ff9f, 0x706deb, 0xb2b2b2
+)
+
+# VICE default palette (vice.vpl).
+VICE = _palette(
+    0x000000, 0xfdfefc, 0xbe1a24, 0x30e6c6,
+    0xb41ae2, 0x1fd21e, 0x211bae, 0xdff60a,
+    0xb84104, 0x6a3304, 0xfe4a57, 0x424540,
+    0x70746f, 0x59fe59, 0x5f53fe, 0xa4a7a2
+)
+
+# Palettes by name.
+PALETTES = {
+    'colodore': COLODORE,
+    'pepto': PEPTO,
+    'vice': VICE
+}
+
+DEFAULT_PALETTE = 'pepto'
+
+# vim: set sts=4 et sw=4:
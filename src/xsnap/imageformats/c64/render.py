@@ -0,0 +1,388 @@
+"""Screen rendering.
+
+Screens are rendered to palette indices with precomputed tables: bitmap
+bytes are expanded to pixel masks, cell colors to 8 pixel wide spans. The
+cell ordered bitmap is reordered to scanlines with extended slices and the
+pixel colors are selected with masks on big integers, there are no per-pixel
+Python loops.
+
+Text screens are drawn from glyph pixel rows rasterized once per character
+set (identified by its hash) and colors, and kept in a cache shared by all
+rendered screens.
+"""
+
+import hashlib
+import sys
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+from ..raster import Frame
+from .scrtypes import (EcmTextScreen, HiresScreen, MultiColorScreen, MultiTextScreen,
+                       TextScreen, _digest)
+
+WIDTH = 320
+HEIGHT = 200
+
+# Full frame (visible PAL screen with border).
+FRAME_WIDTH = 384
+FRAME_HEIGHT = 272
+BORDER_LEFT = 32
+BORDER_TOP = 35
+
+# Bitmap byte -> 8 pixel masks ($ff = pixel set).
+HIRES_MASK = [bytes(0xff if _ & (0x80 >> bit) else 0x00 for bit in range(8))
+              for _ in range(256)]
+
+# Bitmap byte -> masks of low and high bits of 4 double wide pixels.
+MULTI_LO_MASK = [bytes(0xff if (_ >> (6 - bit // 2 * 2)) & 1 else 0x00 for bit in range(8))
+                 for _ in range(256)]
+MULTI_HI_MASK = [bytes(0xff if (_ >> (6 - bit // 2 * 2)) & 2 else 0x00 for bit in range(8))
+                 for _ in range(256)]
+
+# Byte -> 8 (16 if X expanded) pixel values (hires 0-1, multicolor 0-3).
+HIRES_VALUES = [bytes(mask).translate(bytes([0]) * 255 + b'\x01') for mask in HIRES_MASK]
+MULTI_VALUES = [bytes((_ >> (6 - bit // 2 * 2)) & 3 for bit in range(8)) for _ in range(256)]
+HIRES_VALUES_X2 = [bytes(_ for _ in values for _ in (_, _)) for values in HIRES_VALUES]
+MULTI_VALUES_X2 = [bytes(_ for _ in values for _ in (_, _)) for values in MULTI_VALUES]
+
+# Pixel value -> mask (value 0 is transparent).
+OPAQUE = b'\x00' + b'\xff' * 255
+
+# Sprite position of the top left pixel of the screen.
+SPRITE_X = 24
+SPRITE_Y = 50
+
+# Byte -> 8 pixels in color of the high and low nibble.
+HI_NIBBLE = [bytes([_ >> 4]) * 8 for _ in range(256)]
+LO_NIBBLE = [bytes([_ & 0x0f]) * 8 for _ in range(256)]
+
+# Byte -> low nibble, low 6 bits (translation tables).
+LOW_NIBBLE = bytes(_ & 0x0f for _ in range(256))
+LOW_6BITS = bytes(_ & 0x3f for _ in range(256))
+
+# Color RAM byte -> 8 pixel mask of multicolor character cells (bit 3 set).
+MULTI_CELL = [bytes([0xff if _ & 0x08 else 0x00]) * 8 for _ in range(256)]
+
+# Max number of cached glyph sets (character set and colors).
+GLYPH_CACHE_SIZE = 256
+
+# Glyph pixel rows by character set hash and colors.
+_glyphs: dict[tuple[str, bytes], list[list[bytes]]] = {}
+
+# Placeholder of colors not used on a screen.
+_NO_GLYPHS = [[b''] * 256] * 8
+
+
+@dataclass
+class Sprite:           # pylint: disable=too-many-instance-attributes
+    """Sprite data and attributes."""
+    data: bytes         # 63 bytes (21 rows of 3 bytes).
+    posx: int
+    posy: int
+    color: int          # Sprite color (%10 in multicolor sprites).
+    multicolor: bool = False
+    color01: int = 0    # Sprite extra colors ($d025, $d026).
+    color11: int = 0
+    xexp: bool = False
+    yexp: bool = False
+    behind: bool = False    # Behind screen foreground ($d01b).
+
+    def width(self) -> int:
+        """Width in pixels."""
+        return 48 if self.xexp else 24
+
+    def height(self) -> int:
+        """Height in pixels."""
+        return 42 if self.yexp else 21
+
+    def values(self) -> bytes:
+        """Return pixel values (width x height, 0 = transparent)."""
+        rows = [self.data[_:_ + 3] for _ in range(0, 63, 3)]
+        if self.yexp:
+            rows = [_ for _ in rows for _ in (_, _)]
+        if self.multicolor:
+            table = MULTI_VALUES_X2 if self.xexp else MULTI_VALUES
+        else:
+            table = HIRES_VALUES_X2 if self.xexp else HIRES_VALUES
+        return expand(b''.join(rows), table)
+
+    def palette(self) -> bytes:
+        """Return translation table of pixel values to colors."""
+        if self.multicolor:
+            # %01 $d025, %10 sprite color, %11 $d026.
+            colors = [0, self.color01, self.color, self.color11]
+        else:
+            colors = [0, self.color]
+        return bytes(_ & 0x0f for _ in colors).ljust(256, b'\x00')
+
+
+def composite(pixels: bytes, foreground: bytes, sprites: Sequence[Sprite]) -> bytes:
+    """Draw sprites over screen pixels (sprite 0 first, it is on top).
+
+    Sprites are clipped to the screen, the border covers them. Sprites behind
+    the screen are drawn only where the foreground mask is not set, there they
+    hide the sprites under them too (like VIC-II).
+    """
+    out = bytearray(pixels)
+    view = memoryview(out)
+    for sprite in reversed(sprites):
+        clipped = clip_sprite(sprite)
+        if clipped is None:
+            continue
+        # Note: screen lines are copied in and out.
+        values, lines, cols = clipped
+        colors = values.translate(sprite.palette())
+        if sprite.behind:
+            # Note: foreground hides the sprite and the sprites under it (sprite priority
+            # is resolved first).
+            colors = select(b''.join(foreground[_:_ + cols] for _ in lines),
+                            b''.join(pixels[_:_ + cols] for _ in lines), colors)
+        area = memoryview(select(values.translate(OPAQUE), colors,
+                                 b''.join([view[_:_ + cols] for _ in lines])))
+        for pos, line in zip(range(0, len(area), cols), lines):
+            view[line:line + cols] = area[pos:pos + cols]
+    view.release()
+    return bytes(out)
+
+
+def clip_sprite(sprite: Sprite) -> Optional[tuple[bytes, range, int]]:
+    """Return pixel values of sprite clipped to the screen, screen offsets of its
+    lines and its visible width (None if the sprite is not on the screen).
+    """
+    posx, posy = sprite.posx - SPRITE_X, sprite.posy - SPRITE_Y
+    width, height = sprite.width(), sprite.height()
+    left, right = max(posx, 0), min(posx + width, WIDTH)
+    top, bottom = max(posy, 0), min(posy + height, HEIGHT)
+    if left >= right or top >= bottom:
+        return None
+    values = sprite.values()
+    cols = right - left
+    lines = range(top * WIDTH + left, bottom * WIDTH + left, WIDTH)
+    if cols < width:
+        start = (top - posy) * width + left - posx
+        rows = range(start, start + len(lines) * width, width)
+        values = b''.join(values[_:_ + cols] for _ in rows)
+    elif top > posy or bottom < posy + height:
+        values = values[(top - posy) * width:(bottom - posy) * width]
+    return values, lines, cols
+
+
+def digest(screen_digest: str, sprites: Sequence[Sprite]) -> str:
+    """Return content hash of screen with sprites (screen hash if no sprites)."""
+    if not sprites:
+        return screen_digest
+    return _digest(screen_digest.encode(), *(repr(_).encode() for _ in sprites))
+
+
+def scanlines(bitmap: bytes) -> bytes:
+    """Reorder cell ordered bitmap (8 bytes per cell) to scanline order."""
+    bitmap = bytes(bitmap)
+    return b''.join(bitmap[row + line:row + 320:8]
+                    for row in range(0, 8000, 320) for line in range(8))
+
+
+def expand(data: bytes, table: list[bytes]) -> bytes:
+    """Expand scanline ordered bytes to pixels (8 per byte)."""
+    return b''.join(map(table.__getitem__, data))
+
+
+def cell_colors(cells: bytes, table: list[bytes]) -> bytes:
+    """Expand color of every cell (40x25) to its 8x8 pixels."""
+    return b''.join(b''.join(map(table.__getitem__, cells[row:row + 40])) * 8
+                    for row in range(0, 1000, 40))
+
+
+def select(mask: bytes, ones: bytes, zeros: bytes) -> bytes:
+    """Return pixels of ones where mask is set, of zeros elsewhere."""
+    bits = int.from_bytes(mask, 'big')
+    value = (bits & int.from_bytes(ones, 'big')) | (~bits & int.from_bytes(zeros, 'big'))
+    return value.to_bytes(len(mask), 'big')
+
+
+def fill(color: int, size: int = WIDTH * HEIGHT) -> bytes:
+    """Return pixels of single color."""
+    return bytes([color & 0x0f]) * size
+
+
+def frame(pixels: bytes, border: int, with_border: bool = False) -> Frame:
+    """Return screen frame, optionally surrounded by border."""
+    if not with_border:
+        return Frame(WIDTH, HEIGHT, pixels)
+    side = fill(border, BORDER_LEFT)
+    right = fill(border, FRAME_WIDTH - WIDTH - BORDER_LEFT)
+    rows = b''.join(b''.join([side, pixels[_:_ + WIDTH], right])
+                    for _ in range(0, WIDTH * HEIGHT, WIDTH))
+    top = fill(border, FRAME_WIDTH * BORDER_TOP)
+    bottom = fill(border, FRAME_WIDTH * (FRAME_HEIGHT - HEIGHT - BORDER_TOP))
+    return Frame(FRAME_WIDTH, FRAME_HEIGHT, top + rows + bottom)
+
+
+def hires(screen: HiresScreen, with_border: bool = False,
+          sprites: Sequence[Sprite] = ()) -> Frame:
+    """Render hires bitmap screen."""
+    mask = expand(scanlines(screen.bitmap), HIRES_MASK)
+    pixels = select(mask, cell_colors(screen.screen, HI_NIBBLE),
+                    cell_colors(screen.screen, LO_NIBBLE))
+    if sprites:
+        pixels = composite(pixels, mask, sprites)
+    return frame(pixels, ord(screen.border), with_border)
+
+
+def multicolor(screen: MultiColorScreen, with_border: bool = False,
+               sprites: Sequence[Sprite] = ()) -> Frame:
+    """Render multicolor bitmap screen."""
+    lines = scanlines(screen.bitmap)
+    low = expand(lines, MULTI_LO_MASK)
+    high = expand(lines, MULTI_HI_MASK)
+    # %00 background, %01 screen high nibble, %10 screen low nibble, %11 color RAM.
+    color0x = select(low, cell_colors(screen.screen, HI_NIBBLE), fill(ord(screen.bgcolor)))
+    color1x = select(low, cell_colors(screen.colors, LO_NIBBLE),
+                     cell_colors(screen.screen, LO_NIBBLE))
+    pixels = select(high, color1x, color0x)
+    if sprites:
+        # Note: %1x pixels are foreground.
+        pixels = composite(pixels, high, sprites)
+    return frame(pixels, ord(screen.border), with_border)
+
+
+def glyph_rows(screen: bytes, charset: bytes) -> bytes:
+    """Return scanline ordered glyph bytes of a character screen."""
+    # Note: charset[line::8] maps character code to its glyph byte of the line.
+    tables = [bytes(charset[line:2048:8]) for line in range(8)]
+    return b''.join(bytes(screen[row:row + 40]).translate(tables[line])
+                    for row in range(0, 1000, 40) for line in range(8))
+
+
+def charset_id(charset: bytes) -> str:
+    """Return character set fingerprint (short blake2b hash)."""
+    return hashlib.blake2b(charset, digest_size=8).hexdigest()
+
+
+def glyphs(charset: bytes, key: str, colors: bytes) -> list[list[bytes]]:
+    """Return 8 pixel glyph rows of character set (by glyph line and code).
+
+    Colors of pixel values are 2 (hires glyphs) or 4 (multicolor glyphs).
+    Glyphs are rasterized once per character set hash (key) and colors.
+    """
+    lines = _glyphs.get((key, colors))
+    if lines is None:
+        table = colors.ljust(256, b'\x00')
+        values = MULTI_VALUES if len(colors) == 4 else HIRES_VALUES
+        pixels = [_.translate(table) for _ in values]
+        lines = _cache_glyphs(key, colors, [
+            list(map(pixels.__getitem__, charset[line:2048:8])) for line in range(8)
+        ])
+    return lines
+
+
+def _cache_glyphs(key: str, colors: bytes, lines: list[list[bytes]]) -> list[list[bytes]]:
+    """Add glyph rows to the cache, return them."""
+    if len(_glyphs) >= GLYPH_CACHE_SIZE:
+        # Note: oldest entry goes first (dicts keep insertion order).
+        del _glyphs[next(iter(_glyphs))]
+    _glyphs[key, colors] = lines
+    return lines
+
+
+def ecm_glyphs(charset: bytes, key: str, backgrounds: bytes,
+               fgcolor: int) -> list[list[bytes]]:
+    """Return 8 pixel glyph rows of extended background color character codes.
+
+    Codes 64n-64n+63 are glyphs 0-63 on background n (cached as glyphs).
+    """
+    colors = backgrounds + bytes([fgcolor])
+    lines = _glyphs.get((key, colors))
+    if lines is None:
+        lines = [[] for _ in range(8)]
+        for bgcolor in backgrounds:
+            for line, glyph_line in zip(lines, glyphs(charset, key, bytes([bgcolor, fgcolor]))):
+                line += glyph_line[:64]
+        _cache_glyphs(key, colors, lines)
+    return lines
+
+
+def draw_cells(screen: bytes, colors: bytes, fonts: list[list[list[bytes]]]) -> bytes:
+    """Return pixels of character cells drawn from glyph rows of every color.
+
+    Glyph rows of color RAM value (low nibble) are fonts[value].
+    """
+    # Note: cells are looked up by character code + 256 * color.
+    tables: list[list[bytes]] = [[] for _ in range(8)]
+    for font in fonts:
+        for table, glyph_line in zip(tables, font):
+            table += glyph_line
+    # Note: interleaved code and color bytes read as native 16-bit cells.
+    pairs = bytearray(2000)
+    low = 0 if sys.byteorder == 'little' else 1
+    pairs[low::2], pairs[1 - low::2] = screen, colors
+    cells = memoryview(pairs).cast('H').tolist()
+    return b''.join(b''.join(map(tables[line].__getitem__, cells[row:row + 40]))
+                    for row in range(0, 1000, 40) for line in range(8))
+
+
+def text(screen: TextScreen, with_border: bool = False,
+         sprites: Sequence[Sprite] = ()) -> Frame:
+    """Render standard character screen."""
+    if len(screen.charset) < 2048:
+        raise ValueError('character set not available')
+    key = charset_id(screen.charset)
+    colors = bytes(screen.colors).translate(LOW_NIBBLE)
+    used = set(colors)
+    fonts = [glyphs(screen.charset, key, screen.bgcolor + bytes([_])) if _ in used
+             else _NO_GLYPHS for _ in range(16)]
+    pixels = draw_cells(screen.screen, colors, fonts)
+    if sprites:
+        mask = expand(glyph_rows(screen.screen, screen.charset), HIRES_MASK)
+        pixels = composite(pixels, mask, sprites)
+    return frame(pixels, ord(screen.border), with_border)
+
+
+def multitext(screen: MultiTextScreen, with_border: bool = False,
+              sprites: Sequence[Sprite] = ()) -> Frame:
+    """Render multicolor character screen.
+
+    Characters of color RAM values 0-7 are hires, 8-15 are multicolor (%00
+    background, %01 $d022, %10 $d023, %11 color RAM & 7).
+    """
+    if len(screen.charset) < 2048:
+        raise ValueError('character set not available')
+    key = charset_id(screen.charset)
+    colors = bytes(screen.colors).translate(LOW_NIBBLE)
+    used = set(colors)
+    extra = screen.bgcolor + screen.bgcolor1 + screen.bgcolor2
+    fonts = [_NO_GLYPHS if _ not in used
+             else glyphs(screen.charset, key, screen.bgcolor + bytes([_])) if _ < 8
+             else glyphs(screen.charset, key, extra + bytes([_ & 0x07])) for _ in range(16)]
+    pixels = draw_cells(screen.screen, colors, fonts)
+    if sprites:
+        # Note: set pixels of hires and %1x pixels of multicolor cells are foreground.
+        lines = glyph_rows(screen.screen, screen.charset)
+        mask = select(cell_colors(colors, MULTI_CELL), expand(lines, MULTI_HI_MASK),
+                      expand(lines, HIRES_MASK))
+        pixels = composite(pixels, mask, sprites)
+    return frame(pixels, ord(screen.border), with_border)
+
+
+def ecmtext(screen: EcmTextScreen, with_border: bool = False,
+            sprites: Sequence[Sprite] = ()) -> Frame:
+    """Render extended background color character screen.
+
+    Bits 6-7 of character code select the background color ($d021-$d024) of
+    character 0-63.
+    """
+    if len(screen.charset) < 2048:
+        raise ValueError('character set not available')
+    key = charset_id(screen.charset)
+    colors = bytes(screen.colors).translate(LOW_NIBBLE)
+    used = set(colors)
+    backgrounds = screen.bgcolor + screen.bgcolor1 + screen.bgcolor2 + screen.bgcolor3
+    fonts = [ecm_glyphs(screen.charset, key, backgrounds, _) if _ in used else _NO_GLYPHS
+             for _ in range(16)]
+    pixels = draw_cells(screen.screen, colors, fonts)
+    if sprites:
+        codes = bytes(screen.screen).translate(LOW_6BITS)
+        mask = expand(glyph_rows(codes, screen.charset), HIRES_MASK)
+        pixels = composite(pixels, mask, sprites)
+    return frame(pixels, ord(screen.border), with_border)
+
+# vim: set sts=4 et sw=4:
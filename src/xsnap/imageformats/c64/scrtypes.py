@@ -1,18 +1,61 @@
 """Pack library."""
 
-from dataclasses import dataclass
+import hashlib
+from collections import Counter
+from dataclasses import dataclass, field
+
+
+def _digest(*parts: bytes) -> str:
+    """Return content hash of screen components."""
+    digest = hashlib.blake2b(digest_size=20)
+    for part in parts:
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def histogram(buf: bytes) -> list[int]:
+    """Return byte value histogram (256 counts)."""
+    counts = [0] * 256
+    for val, count in Counter(buf).items():
+        counts[val] = count
+    return counts
+
+
+@dataclass
+class _Screen:
+    """Screen data with cached byte histograms of its components."""
+    _histograms: dict[str, list[int]] = field(default_factory=dict, init=False,
+                                              repr=False, compare=False)
+
+    def histogram(self, component: str) -> list[int]:
+        """Byte value histogram of a screen component (computed once).
+
+        Note: the returned list is shared, copy it before modifying.
+        """
+        counts = self._histograms.get(component)
+        if counts is None:
+            counts = self._histograms[component] = histogram(getattr(self, component))
+        return counts
 
 
 @dataclass
-class HiresScreen:
+class HiresScreen(_Screen):
     """Hires screen data."""
     bitmap: bytes
     screen: bytes
     border: bytes = b'\x00'
 
+    def digest(self) -> str:
+        """Content hash of the screen."""
+        return _digest(b'hires', self.bitmap, self.screen, self.border)
+
+    def is_blank(self) -> bool:
+        """Return True if no bitmap pixel is set."""
+        return self.histogram('bitmap')[0] == len(self.bitmap)
+
 
 @dataclass
-class MultiColorScreen:
+class MultiColorScreen(_Screen):
     """Multicolor screen data."""
     bitmap: bytes
     screen: bytes
@@ -20,14 +63,78 @@ class MultiColorScreen:
     bgcolor: bytes
     border: bytes = b'\x00'
 
+    def digest(self) -> str:
+        """Content hash of the screen."""
+        return _digest(b'multicolor', self.bitmap, self.screen, self.colors, self.bgcolor,
+                       self.border)
+
+    def is_blank(self) -> bool:
+        """Return True if all bitmap pixels show the background color."""
+        return self.histogram('bitmap')[0] == len(self.bitmap)
+
 
 @dataclass
-class TextScreen:
+class TextScreen(_Screen):
     """Text screen data."""
     screen: bytes
     colors: bytes
     bgcolor: bytes
     border: bytes
     d018: bytes = b'\x00'       # VIC-II memory control register.
+    charset: bytes = b''        # Character set (2048 bytes, empty if not known).
+
+    def digest(self) -> str:
+        """Content hash of the screen."""
+        return _digest(b'text', self.screen, self.colors, self.bgcolor, self.border, self.d018,
+                       self.charset)
+
+    def is_blank(self) -> bool:
+        """Return True if all screen characters are the same."""
+        return max(self.histogram('screen')) == len(self.screen)
+
+
+@dataclass
+class MultiTextScreen(_Screen):     # pylint: disable=too-many-instance-attributes
+    """Multicolor character screen data."""
+    screen: bytes
+    colors: bytes               # Bit 3 set: multicolor character.
+    bgcolor: bytes
+    bgcolor1: bytes             # Extra background colors ($d022, $d023).
+    bgcolor2: bytes
+    border: bytes
+    d018: bytes = b'\x00'       # VIC-II memory control register.
+    charset: bytes = b''        # Character set (2048 bytes, empty if not known).
+
+    def digest(self) -> str:
+        """Content hash of the screen."""
+        return _digest(b'multitext', self.screen, self.colors, self.bgcolor, self.bgcolor1,
+                       self.bgcolor2, self.border, self.d018, self.charset)
+
+    def is_blank(self) -> bool:
+        """Return True if all screen characters are the same."""
+        return max(self.histogram('screen')) == len(self.screen)
+
+
+@dataclass
+class EcmTextScreen(_Screen):       # pylint: disable=too-many-instance-attributes
+    """Extended background color character screen data."""
+    screen: bytes               # Bits 6-7: background color, bits 0-5: character.
+    colors: bytes
+    bgcolor: bytes
+    bgcolor1: bytes             # Extra background colors ($d022, $d023, $d024).
+    bgcolor2: bytes
+    bgcolor3: bytes
+    border: bytes
+    d018: bytes = b'\x00'       # VIC-II memory control register.
+    charset: bytes = b''        # Character set (2048 bytes, empty if not known).
+
+    def digest(self) -> str:
+        """Content hash of the screen."""
+        return _digest(b'ecmtext', self.screen, self.colors, self.bgcolor, self.bgcolor1,
+                       self.bgcolor2, self.bgcolor3, self.border, self.d018, self.charset)
+
+    def is_blank(self) -> bool:
+        """Return True if all screen characters are the same."""
+        return max(self.histogram('screen')) == len(self.screen)
 
 # vim: set sts=4 et sw=4:
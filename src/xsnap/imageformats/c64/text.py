@@ -1,7 +1,10 @@
 """Text image."""
 
 import random
+from typing import Optional
 
+from ..raster import Frame
+from . import render
 from .formats import text
 from .scrtypes import TextScreen
 
@@ -9,9 +12,13 @@ from .scrtypes import TextScreen
 class TextImage:
     """Text image."""
 
+    # Output formats by file extension.
+    FORMATS = text.FORMATS
+
     def __init__(self, screen: bytes,   # pylint: disable=too-many-arguments
                  colors: bytes, bgcolor: bytes, border: bytes,
-                 d018: bytes = b'\x00') -> None:
+                 d018: bytes = b'\x00', charset: bytes = b'') -> None:
+        # pylint: disable=too-many-positional-arguments
         assert len(screen) == 1000
         assert len(colors) == 1000
         assert len(bgcolor) == 1
@@ -19,7 +26,36 @@ class TextImage:
         assert len(d018) == 1       # XXX: check values.
         assert ord(bgcolor) < 16
         assert ord(border) < 16
-        self._image = TextScreen(screen, colors, bgcolor, border, d018)
+        assert len(charset) in (0, 2048)
+        self._image = TextScreen(screen, colors, bgcolor, border, d018, bytes(charset))
+        # Sprites drawn over rendered images.
+        self.sprites: list[render.Sprite] = []
+
+    @property
+    def data(self) -> TextScreen:
+        """Screen data."""
+        return self._image
+
+    def digest(self) -> str:
+        """Content hash of the image (same screens have same hash)."""
+        return render.digest(self._image.digest(), self.sprites)
+
+    def histogram(self, component: str) -> list[int]:
+        """Byte value histogram of a screen component (cached)."""
+        return self._image.histogram(component)
+
+    def render(self, border: bool = False) -> Frame:
+        """Render image to palette indices (with border of full frame)."""
+        return render.text(self._image, border, self.sprites)
+
+    def is_blank(self) -> bool:
+        """Return True if the screen is blank."""
+        return self._image.is_blank()
+
+    def encode(self, ext: str) -> bytes:
+        """Export image in format given by file extension."""
+        data: bytes = self.FORMATS[ext].pack(self._image)
+        return data
 
     def as_pdr(self) -> bytes:
         """Export image in Petdraw64 format."""
@@ -65,12 +101,13 @@ class WhiteTextC64(TextImage):
 
 
 class RandomTextC64(TextImage):
-    """Random text image."""
-    def __init__(self) -> None:
-        screen = random.randbytes(1000)
-        colors = random.randbytes(1000)
-        bgcolor = random.randrange(15).to_bytes()
-        border = random.randrange(15).to_bytes()
+    """Random text image (rnd is seeded from the global generator by default)."""
+    def __init__(self, rnd: Optional[random.Random] = None) -> None:
+        rnd = rnd or random.Random(random.getrandbits(64))
+        screen = rnd.randbytes(1000)
+        colors = rnd.randbytes(1000)
+        bgcolor = rnd.randrange(15).to_bytes()
+        border = rnd.randrange(15).to_bytes()
         d018 = b'\x00'      # XXX: TODO.
         super().__init__(screen, colors, bgcolor, border, d018)
 
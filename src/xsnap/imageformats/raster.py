@@ -0,0 +1,74 @@
+"""Raster images (PNG and PPM)."""
+
+import struct
+import zlib
+from dataclasses import dataclass
+from typing import Iterator, Sequence
+
+# Raster output formats (file extensions).
+FORMATS = ('png', 'ppm')
+
+PNG_MAGIC = b'\x89PNG\r\n\x1a\n'
+
+
+@dataclass
+class Frame:
+    """Palette indexed image (one byte per pixel)."""
+    width: int
+    height: int
+    pixels: bytes
+
+    def rows(self, scale: int = 1) -> Iterator[bytes]:
+        """Iterate pixel rows, scaled by integer factor."""
+        width = self.width
+        for pos in range(0, width * self.height, width):
+            row = self.pixels[pos:pos + width]
+            if scale > 1:
+                scaled = bytearray(width * scale)
+                for _ in range(scale):
+                    scaled[_::scale] = row
+                row = bytes(scaled)
+            for _ in range(scale):
+                yield row
+
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    """Return PNG chunk."""
+    return b''.join([
+        struct.pack('>L', len(data)), kind, data,
+        struct.pack('>L', zlib.crc32(data, zlib.crc32(kind)))
+    ])
+
+
+def png(frame: Frame, palette: Sequence[tuple[int, int, int]], level: int = 6,
+        scale: int = 1) -> bytes:
+    """Encode frame as palette PNG.
+
+    Rows are compressed as they are produced (zlib level 0-9), every row uses
+    filter type 0 (none).
+    """
+    compressor = zlib.compressobj(level)
+    idat = [compressor.compress(b'\x00' + _) for _ in frame.rows(scale)]
+    idat.append(compressor.flush())
+    header = struct.pack('>LLBBBBB', frame.width * scale, frame.height * scale, 8, 3, 0, 0, 0)
+    return b''.join([
+        PNG_MAGIC,
+        _chunk(b'IHDR', header),
+        _chunk(b'PLTE', b''.join(bytes(_) for _ in palette)),
+        _chunk(b'IDAT', b''.join(idat)),
+        _chunk(b'IEND', b'')
+    ])
+
+
+def ppm(frame: Frame, palette: Sequence[tuple[int, int, int]], scale: int = 1) -> bytes:
+    """Encode frame as binary PPM (P6)."""
+    # Note: one translation table per RGB channel, no per-pixel loop.
+    tables = [bytes(_[channel] for _ in palette).ljust(256, b'\x00') for channel in range(3)]
+    pixels = b''.join(frame.rows(scale))
+    rgb = bytearray(3 * len(pixels))
+    for channel, table in enumerate(tables):
+        rgb[channel::3] = pixels.translate(table)
+    header = f'P6\n{frame.width * scale} {frame.height * scale}\n255\n'.encode()
+    return header + bytes(rgb)
+
+# vim: set sts=4 et sw=4:
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""Hot path instrumentation.
+
+Stages (open, decompress, parse, decode, encode.<ext>, write) are timed with
+a monotonic clock when instrumentation is enabled, optionally with the peak
+of memory allocated by the stage (tracemalloc). Stages nest, time of the
+inner stage is included in the outer one (parse includes decompress).
+
+Disabled (the default), stage() returns a shared no-op context manager, the
+cost is a function call per stage.
+
+Samples are kept in the recording process, worker processes return them in
+their results (take). Hooks are called in the parent process only: for
+samples recorded there and for samples returned by workers (replay).
+"""
+
+import math
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Optional, Union
+
+# Stage name, seconds, bytes processed, allocated memory peak (0 = not traced).
+Sample = tuple[str, float, int, int]
+Hook = Callable[[str, float, int, int], None]
+
+
+@dataclass
+class _State:
+    """Instrumentation state."""
+    enabled: bool = False
+    memory: bool = False            # Memory peaks traced.
+
+
+_state = _State()
+_samples: list[Sample] = []
+_hooks: list[Hook] = []
+_local = threading.local()
+
+
+class _NullStage:
+    """Stage of disabled instrumentation."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> '_NullStage':
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        pass
+
+    def add(self, nbytes: int) -> None:
+        """Ignore processed bytes."""
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Stage:
+    """Timed stage."""
+
+    __slots__ = ('name', 'nbytes', 'start', 'mem_start', 'peak')
+
+    def __init__(self, name: str, nbytes: int = 0) -> None:
+        self.name = name
+        self.nbytes = nbytes
+        self.start = 0.0
+        self.mem_start = 0
+        self.peak = 0
+
+    def add(self, nbytes: int) -> None:
+        """Add processed bytes."""
+        self.nbytes += nbytes
+
+    def __enter__(self) -> 'Stage':
+        if _state.memory and tracemalloc.is_tracing():
+            # Note: peak of the enclosing stage is saved before the reset.
+            self.mem_start, peak = tracemalloc.get_traced_memory()
+            stack = _stack()
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+            self.peak = self.mem_start
+            stack.append(self)
+            tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        elapsed = time.perf_counter() - self.start
+        peak = 0
+        stack = _stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, self.peak)
+            peak = self.peak - self.mem_start
+        record(self.name, elapsed, self.nbytes, peak)
+
+
+def _stack() -> list[Stage]:
+    """Return memory traced stages of the current thread."""
+    stack: Optional[list[Stage]] = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def stage(name: str, nbytes: int = 0, when: bool = True) -> Union[Stage, _NullStage]:
+    """Return context manager timing a stage (no-op when disabled or not when)."""
+    if not _state.enabled or not when:
+        return _NULL_STAGE
+    return Stage(name, nbytes)
+
+
+def record(name: str, seconds: float, nbytes: int = 0, peak: int = 0) -> None:
+    """Record stage sample."""
+    _samples.append((name, seconds, nbytes, peak))
+    for hook in _hooks:
+        hook(name, seconds, nbytes, peak)
+
+
+def enable(memory: bool = False) -> None:
+    """Enable instrumentation (with memory peaks if memory)."""
+    _state.enabled = True
+    _state.memory = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable() -> None:
+    """Disable instrumentation."""
+    _state.enabled = _state.memory = False
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def enabled() -> bool:
+    """Return True if instrumentation is enabled."""
+    return _state.enabled
+
+
+def state() -> tuple[bool, bool]:
+    """Return instrumentation state (passed to worker processes)."""
+    return _state.enabled, _state.memory
+
+
+def init_worker(enabled_: bool, memory: bool) -> None:
+    """Worker process initializer, set instrumentation state."""
+    # Note: hooks inherited from the parent (fork) are called there on replay.
+    _hooks.clear()
+    if enabled_:
+        enable(memory)
+
+
+def add_hook(hook: Hook) -> None:
+    """Call hook(stage, seconds, nbytes, peak) for every sample.
+
+    Hooks are called in the parent process, samples of worker processes when
+    their results are received (replay).
+    """
+    _hooks.append(hook)
+
+
+def remove_hook(hook: Hook) -> None:
+    """Remove hook."""
+    _hooks.remove(hook)
+
+
+def replay(samples: Iterable[Sample]) -> None:
+    """Call hooks for samples recorded in another process."""
+    for sample in samples:
+        for hook in _hooks:
+            hook(*sample)
+
+
+def take() -> list[Sample]:
+    """Return samples recorded since the last call."""
+    samples = _samples[:]
+    del _samples[:len(samples)]
+    return samples
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Return percentile of sorted values (nearest rank)."""
+    if not values:
+        return 0.0
+    rank = min(len(values), max(1, math.ceil(pct / 100 * len(values))))
+    return values[rank - 1]
+
+
+@dataclass
+class StageStats:
+    """Stage statistics."""
+    times: list[float] = field(default_factory=list)
+    nbytes: int = 0
+    peak: int = 0
+
+
+class Stats:
+    """Stage statistics collected from samples."""
+
+    def __init__(self) -> None:
+        self.stages: dict[str, StageStats] = {}
+
+    def add(self, samples: Iterable[Sample]) -> None:
+        """Add samples."""
+        for name, seconds, nbytes, peak in samples:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = StageStats()
+            stats.times.append(seconds)
+            stats.nbytes += nbytes
+            stats.peak = max(stats.peak, peak)
+
+    def table(self, memory: Optional[bool] = None) -> str:
+        """Return summary table (stages ordered by total time)."""
+        if memory is None:
+            memory = any(_.peak for _ in self.stages.values())
+        lines = [f'{"stage":14}  {"count":>6}  {"total":>9}  {"p50":>9}  {"p95":>9}  {"p99":>9}'
+                 f'  {"MB/s":>8}' + (f'  {"peak":>9}' if memory else '')]
+        items = sorted(self.stages.items(), key=lambda _: sum(_[1].times), reverse=True)
+        for name, stats in items:
+            times = sorted(stats.times)
+            total = sum(times)
+            rate = f'{stats.nbytes / total / 1e6:8.1f}' if stats.nbytes and total else f'{"-":>8}'
+            line = (f'{name:14}  {len(times):6}  {total:8.3f}s'
+                    + ''.join(f'  {percentile(times, _) * 1e3:7.3f}ms' for _ in (50, 95, 99))
+                    + f'  {rate}')
+            if memory:
+                line += f'  {stats.peak / 1024:7.0f}kB'
+            lines.append(line)
+        return '\n'.join(lines) + '\n'
+
+
+# vim: set sts=4 et sw=4:
@@ -2,12 +2,25 @@
 """VSNAP."""
 
 import argparse
+import contextlib
+import sys
+import time
+from functools import partial
 from pathlib import Path
+from typing import Iterable, Optional
 
-from . import vice
+from . import batch, cache, catalog, convert, instrument, pipeline, synth, vice
+from .imageformats.c64.palettes import DEFAULT_PALETTE, PALETTES
+from .report import Format, Report
 from .utils import fileutils, logutils as log
 
 
+COMMANDS_EPILOG = '''
+commands (xsnap COMMAND -h for help): convert, generate, index, query
+The first argument naming a command is the command, process a snapshot file
+named like a command with "xsnap -- NAME" or "xsnap ./NAME".
+'''
+
 USAGE_EPILOG = '''
 xsnap home page: <https://github.com/amnr/xsnap/>
 '''
@@ -16,15 +29,62 @@ xsnap home page: <https://github.com/amnr/xsnap/>
 def parse_args() -> argparse.Namespace:
     """Parse args."""
     parser = argparse.ArgumentParser(
-        epilog=USAGE_EPILOG,
+        epilog=COMMANDS_EPILOG + USAGE_EPILOG,
         formatter_class=lambda prog: argparse.RawDescriptionHelpFormatter(
             prog, max_help_position=30, width=100))
     # parser.add_argument('-f', '--overwrite', action='store_true')
-    # parser.add_argument('-i', '--info', action='store_true')
+    parser.add_argument('-b', '--border', action='store_true',
+                        help='render full frame with border (png, ppm)')
+    parser.add_argument('-d', '--dedup', action='store_true',
+                        help='store identical screens once (output files are hard links)')
+    parser.add_argument('-f', '--force', action='store_true',
+                        help='process all snapshots, including unchanged ones')
+    parser.add_argument('-F', '--formats', metavar='EXT[,EXT...]',
+                        help=f"output formats ({','.join(vice.ALL_FORMATS)})")
+    parser.add_argument('-s', '--smallest', action='store_true',
+                        help='write only the smallest of the output formats')
+    parser.add_argument('-i', '--info', action='store_true',
+                        help='print one line summary of snapshots (no images are written)')
+    parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                        help='number of worker processes (0 = number of CPUs)')
+    parser.add_argument('--json', action='store_true',
+                        help='print one JSON record per snapshot')
+    parser.add_argument('-O', '--optimize', action='store_true',
+                        help='choose escape byte of drp and zom images by exact encoded size')
     parser.add_argument('-o', '--outdir', type=Path, help='output directory')
+    parser.add_argument('-p', '--palette', choices=sorted(PALETTES), default=DEFAULT_PALETTE,
+                        help=f'color palette (png, ppm; default: {DEFAULT_PALETTE})')
+    parser.add_argument('--profile', action='store_true',
+                        help='print time spent in processing stages at the end (stderr)')
+    parser.add_argument('--profile-memory', action='store_true',
+                        help='profile with peak memory use of stages (slow, implies --profile)')
+    parser.add_argument('--png-level', type=int, default=6, metavar='N',
+                        help='PNG compression level 0-9 (default: 6)')
+    parser.add_argument('--scale', type=int, choices=(1, 2), default=1,
+                        help='scale rendered images (png, ppm)')
+    parser.add_argument('-t', '--threads', type=int, default=0, metavar='N',
+                        help='pipelined mode with N reader threads')
+    parser.add_argument('-v', '--verbose', action='count', default=0,
+                        help='print snapshot summary and written images (-vv: VIC-II registers)')
     parser.add_argument('snapshot_file', type=Path, nargs='+', help='VSF snapshot file')
     args = parser.parse_args()
 
+    if args.jobs < 0:
+        parser.error(f'invalid number of jobs: {args.jobs}')
+    if args.threads < 0:
+        parser.error(f'invalid number of threads: {args.threads}')
+    if not 0 <= args.png_level <= 9:
+        parser.error(f'invalid PNG compression level: {args.png_level}')
+    if args.threads and args.jobs != 1:
+        parser.error('options --jobs and --threads are mutually exclusive')
+    args.profile = args.profile or args.profile_memory
+
+    if args.formats is not None:
+        args.formats = tuple(_.strip().lstrip('.').lower() for _ in args.formats.split(','))
+        unknown = set(args.formats) - set(vice.ALL_FORMATS)
+        if unknown:
+            parser.error(f"unsupported format(s): {', '.join(sorted(unknown))}")
+
     # Outdir must be a directory.
     if isinstance(args.outdir, Path) and not args.outdir.is_dir():
         parser.error(f"not a directory: '{args.outdir}'")
@@ -32,30 +92,371 @@ def parse_args() -> argparse.Namespace:
     return args
 
 
-def extract_images(file: Path, outdir: Path, showinfo: bool = False) -> None:
-    """Extract images from snapshot file."""
+def parse_convert_args(argv: list[str]) -> argparse.Namespace:
+    """Parse convert command args."""
+    parser = argparse.ArgumentParser(
+        prog='xsnap convert',
+        description='Convert images to another format of the same screen type.',
+        epilog=USAGE_EPILOG,
+        formatter_class=lambda prog: argparse.RawDescriptionHelpFormatter(
+            prog, max_help_position=30, width=100))
+    parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                        help='number of worker processes (0 = number of CPUs)')
+    parser.add_argument('-o', '--outdir', type=Path,
+                        help='output directory (default: directory of the image)')
+    parser.add_argument('-t', '--to', required=True, metavar='EXT',
+                        help=f"output format ({','.join(sorted(convert.FORMATS))})")
+    parser.add_argument('image_file', type=Path, nargs='+',
+                        help='image file, directory or glob pattern')
+    args = parser.parse_args(argv)
+
+    if args.jobs < 0:
+        parser.error(f'invalid number of jobs: {args.jobs}')
+
+    args.to = args.to.strip().lstrip('.').lower()
+    if args.to not in convert.FORMATS:
+        parser.error(f'unsupported format: {args.to}')
+
+    # Outdir must be a directory.
+    if isinstance(args.outdir, Path) and not args.outdir.is_dir():
+        parser.error(f"not a directory: '{args.outdir}'")
+
+    return args
+
+
+def parse_index_args(argv: list[str]) -> argparse.Namespace:
+    """Parse index command args."""
+    parser = argparse.ArgumentParser(
+        prog='xsnap index',
+        description='Record snapshot metadata in the catalog database.',
+        epilog=USAGE_EPILOG,
+        formatter_class=lambda prog: argparse.RawDescriptionHelpFormatter(
+            prog, max_help_position=30, width=100))
+    parser.add_argument('--db', type=Path, default=catalog.DEFAULT_DB,
+                        help=f'catalog database (default: {catalog.DEFAULT_DB})')
+    parser.add_argument('-f', '--force', action='store_true',
+                        help='index all snapshots, including unchanged ones')
+    parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                        help='number of worker processes (0 = number of CPUs)')
+    parser.add_argument('--prune', action='store_true',
+                        help='remove records of snapshots that no longer exist')
+    parser.add_argument('snapshot_file', type=Path, nargs='*',
+                        help='snapshot file or directory')
+    args = parser.parse_args(argv)
+
+    if args.jobs < 0:
+        parser.error(f'invalid number of jobs: {args.jobs}')
+    if not args.snapshot_file and not args.prune:
+        parser.error('no snapshot files given')
+
+    return args
+
+
+def parse_query_args(argv: list[str]) -> argparse.Namespace:
+    """Parse query command args."""
+    parser = argparse.ArgumentParser(
+        prog='xsnap query',
+        description='List snapshots in the catalog database matching all given filters.',
+        epilog=USAGE_EPILOG,
+        formatter_class=lambda prog: argparse.RawDescriptionHelpFormatter(
+            prog, max_help_position=30, width=100))
+    parser.add_argument('--db', type=Path, default=catalog.DEFAULT_DB,
+                        help=f'catalog database (default: {catalog.DEFAULT_DB})')
+    parser.add_argument('-c', '--count', action='store_true',
+                        help='print only the number of matching snapshots')
+    parser.add_argument('-l', '--long', action='store_true',
+                        help='print mode, VICE version and sprites of snapshots')
+    parser.add_argument('--mode', choices=catalog.MODES, help='graphics mode')
+    parser.add_argument('--machine', help='machine (e.g. C64)')
+    parser.add_argument('--vice', metavar='VERSION',
+                        help='VICE version or its prefix (e.g. 3.7)')
+    sprites = parser.add_mutually_exclusive_group()
+    sprites.add_argument('--sprites', action='store_const', const=True,
+                         help='with active sprites')
+    sprites.add_argument('--no-sprites', dest='sprites', action='store_const', const=False,
+                         help='without active sprites')
+    parser.add_argument('--module', help='snapshot contains module (e.g. C64ROM)')
+    parser.add_argument('--screen', metavar='HASH', help='screen content hash')
+    errors = parser.add_mutually_exclusive_group()
+    errors.add_argument('--errors', action='store_const', const=True,
+                        help='only snapshots that could not be read')
+    errors.add_argument('--no-errors', dest='errors', action='store_const', const=False,
+                        help='only snapshots read without errors')
+    args = parser.parse_args(argv)
+
+    if not args.db.exists():
+        parser.error(f"catalog database not found: '{args.db}'")
+
+    return args
+
+
+def parse_generate_args(argv: list[str]) -> argparse.Namespace:
+    """Parse generate command args."""
+    parser = argparse.ArgumentParser(
+        prog='xsnap generate',
+        description='Generate a corpus of synthetic C64 snapshots (random graphics modes, VIC'
+                    ' banks, screen layouts and sprites).',
+        epilog=USAGE_EPILOG,
+        formatter_class=lambda prog: argparse.RawDescriptionHelpFormatter(
+            prog, max_help_position=30, width=100))
+    parser.add_argument('-c', '--compress', default='none', metavar='METHOD[,METHOD...]',
+                        help=f"compressions, mixed ({','.join(synth.COMPRESSIONS)};"
+                             " default: none)")
+    parser.add_argument('--filler', default='', metavar='SIZE[,SIZE...]',
+                        help='payload sizes of filler modules (bytes, default: none)')
+    parser.add_argument('--images', default=','.join(synth.IMAGES), metavar='KIND[,KIND...]',
+                        help=f"image kinds ({','.join(synth.IMAGES)}; default: all)")
+    parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                        help='number of worker processes (0 = number of CPUs)')
+    parser.add_argument('-m', '--modes', default=','.join(synth.MODES),
+                        metavar='MODE[,MODE...]',
+                        help=f"graphics modes ({','.join(synth.MODES)}; default: all)")
+    parser.add_argument('-n', '--count', type=int, default=100, metavar='N',
+                        help='number of snapshots (default: 100)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='corpus seed (same seed, same corpus; default: 0)')
+    parser.add_argument('--sprites', type=int, default=50, metavar='PCT',
+                        help='percentage of snapshots with sprites (default: 50)')
+    parser.add_argument('outdir', type=Path, help='output directory (created if missing)')
+    args = parser.parse_args(argv)
+
+    if args.jobs < 0:
+        parser.error(f'invalid number of jobs: {args.jobs}')
+    if args.count < 0:
+        parser.error(f'invalid number of snapshots: {args.count}')
+    if not 0 <= args.sprites <= 100:
+        parser.error(f'invalid sprites percentage: {args.sprites}')
+
+    def split(value: str, choices: Iterable[str], what: str) -> tuple[str, ...]:
+        """Split comma separated list, check values."""
+        values = tuple(_.strip().lower() for _ in value.split(',') if _.strip())
+        for item in values:
+            if item not in choices:
+                parser.error(f'unsupported {what}: {item}')
+        if not values:
+            parser.error(f'no {what} given')
+        return values
+
+    args.compress = split(args.compress, synth.COMPRESSIONS, 'compression')
+    args.images = split(args.images, synth.IMAGES, 'image kind')
+    args.modes = split(args.modes, synth.MODES, 'graphics mode')
+    try:
+        args.filler = tuple(int(_) for _ in args.filler.split(',') if _.strip())
+    except ValueError:
+        parser.error(f'invalid filler sizes: {args.filler}')
+    if any(_ < 0 for _ in args.filler):
+        parser.error(f'invalid filler sizes: {args.filler}')
+
+    return args
+
+
+def load_images(file: Path, outdir: Optional[Path],
+                options: Optional[vice.ExportOptions] = None) -> vice.Screenshot:
+    """Decode screenshot from snapshot file."""
     with fileutils.open_file(file) as fobj:
-        if vice.is_vice_snapshot(fobj):
-            vice.extract_vice(fobj, outdir, showinfo=showinfo)
-        else:
-            print(f"File '{file}' - file format not recognized")
+        if not vice.is_vice_snapshot(fobj):
+            raise vice.UnsupportedSnapshot('file format not recognized')
+        return vice.load_vice(fobj, outdir, options)
+
+
+def extract_images(file: Path, outdir: Optional[Path],
+                   options: Optional[vice.ExportOptions] = None) -> Report:
+    """Extract images from snapshot file, return the report."""
+    start = time.perf_counter()
+    shot = load_images(file, outdir, options)
+    loaded = time.perf_counter()
+    formats = shot.encode()
+    encoded = time.perf_counter()
+    shot.write(formats)
+    assert shot.report is not None      # Shut mypy up.
+    shot.report.timings.update(load=loaded - start, encode=encoded - loaded,
+                               write=time.perf_counter() - encoded)
+    return shot.report
+
+
+def show_info(file: Path, outdir: Optional[Path]) -> Report:  # pylint: disable=unused-argument
+    """Return report of snapshot file metadata (nothing is written)."""
+    with fileutils.open_file(file) as fobj:
+        if not vice.is_vice_snapshot(fobj):
+            raise vice.UnsupportedSnapshot('file format not recognized')
+        return vice.snapshot_info(fobj)
+
+
+def report_result(result: batch.BatchResult, fmt: Format, verbose: bool = False) -> None:
+    """Print result report in given format (errors are always reported)."""
+    if result.output:
+        sys.stdout.write(result.output)
+    report = result.report
+    if fmt is Format.JSON:
+        if report is None:
+            report = Report(str(result.file))
+        report.error = result.error
+        sys.stdout.write(report.format(fmt))
+        return
+    if report is not None:
+        sys.stdout.write(report.format(fmt, verbose))
+    if not result.ok:
+        log.error(f"'{result.file}': {result.error}")
+
+
+def show_files_info(args: argparse.Namespace, stats: instrument.Stats) -> None:
+    """Print summary of snapshot files."""
+    files = args.snapshot_file
+    if args.jobs == 1 or len(files) <= 1:
+        results = batch.run_sequential(show_info, files, args.outdir)
+    else:
+        results = batch.run_parallel(show_info, files, args.outdir, args.jobs)
+    fmt = Format.JSON if args.json else Format.HUMAN
+    for result in results:
+        report_result(result, fmt)
+        stats.add(result.samples)
 
 
 def process_files() -> None:
     """Process snapshot files."""
     args = parse_args()
+    stats = instrument.Stats()
+    if args.profile:
+        instrument.enable(memory=args.profile_memory)
+    start = time.perf_counter()
+    try:
+        if args.info:
+            show_files_info(args, stats)
+        else:
+            extract_files(args, stats)
+    finally:
+        if args.profile:
+            # Note: samples of pipeline stages are recorded in this process.
+            stats.add(instrument.take())
+            sys.stdout.flush()
+            sys.stderr.write(f'Profile ({time.perf_counter() - start:.3f}s):\n' + stats.table())
+
+
+def extract_files(args: argparse.Namespace, stats: instrument.Stats) -> None:
+    """Extract images from snapshot files."""
 
-    for file in args.snapshot_file:
-        try:
-            extract_images(file, args.outdir)   # XXX: args.info)
-        except (FileNotFoundError, IsADirectoryError, PermissionError) as err:
-            log.error(err)
+    fmt = Format.JSON if args.json else Format.HUMAN if args.verbose else Format.QUIET
+    render = vice.RenderOptions(palette=args.palette, level=args.png_level,
+                                border=args.border, scale=args.scale)
+    options = vice.ExportOptions(formats=args.formats, smallest=args.smallest, dedup=args.dedup,
+                                 optimize=args.optimize, render=render)
+
+    # Skip snapshots processed before (unless forced).
+    manifests = cache.ManifestSet(args.outdir, tag=options.tag())
+    files = args.snapshot_file
+    if not args.force:
+        files = [_ for _ in files if not manifests.is_current(_)]
+        skipped = len(args.snapshot_file) - len(files)
+        if skipped and fmt is Format.HUMAN:
+            print(f'Skipping {skipped} unchanged snapshot file(s)')
+
+    load = partial(load_images, options=options)
+    extract = partial(extract_images, options=options)
+    if args.threads:
+        results = pipeline.run_pipelined(load, files, args.outdir, args.threads)
+    elif args.jobs == 1 or len(files) <= 1:
+        results = batch.run_sequential(extract, files, args.outdir)
+    else:
+        results = batch.run_parallel(extract, files, args.outdir, args.jobs)
+
+    try:
+        for result in results:
+            report_result(result, fmt, args.verbose > 1)
+            stats.add(result.samples)
+            if result.ok and result.outputs:
+                manifests.update(result.file, result.outputs)
+    finally:
+        manifests.save()
+
+
+def convert_files(argv: list[str]) -> None:
+    """Convert image files."""
+    args = parse_convert_args(argv)
+
+    # Note: only images of the same screen type are converted from directories.
+    files = convert.iter_files(args.image_file,
+                               convert.SCREEN_FORMATS[convert.screen_type(args.to)])
+    func = partial(convert.convert_file, ext=args.to)
+    if args.jobs == 1:
+        results = batch.run_sequential(func, files, args.outdir)
+    else:
+        results = batch.run_streamed(func, files, args.outdir, args.jobs)
+
+    for result in results:
+        if result.output:
+            print(result.output, end='')
+        if result.report is not None:
+            for warning in result.report.warnings:
+                print(f"'{result.file}' : {warning}")
+            for out in result.report.outputs:
+                print(f'{result.file} -> {out.path} : {out.size:5} bytes')
+        if not result.ok:
+            log.error(f"'{result.file}': {result.error}")
+
+
+def index_files(argv: list[str]) -> None:
+    """Index snapshot files in the catalog."""
+    args = parse_index_args(argv)
+
+    with contextlib.closing(catalog.connect(args.db)) as conn:
+        if args.snapshot_file:
+            indexed, unchanged = catalog.index(conn, args.snapshot_file, args.jobs, args.force)
+            print(f'Indexed {indexed} snapshot file(s), {unchanged} unchanged')
+        if args.prune:
+            print(f'Removed {catalog.prune(conn)} missing snapshot file(s)')
+
+
+def query_catalog(argv: list[str]) -> None:
+    """Query the catalog."""
+    args = parse_query_args(argv)
+
+    filt = catalog.Filter(mode=args.mode, machine=args.machine, vice_version=args.vice,
+                          sprites=args.sprites, module=args.module, screen_hash=args.screen,
+                          errors=args.errors)
+    with contextlib.closing(catalog.connect(args.db)) as conn:
+        if args.count:
+            print(catalog.count(conn, filt))
+            return
+        if not args.long:
+            for (path,) in catalog.query(conn, filt):
+                print(path)
+            return
+        rows = catalog.query(conn, filt, ('mode', 'vice_version', 'sprites', 'error', 'path'))
+        for mode, version, sprites, error, path in rows:
+            mode = 'error' if error else mode or '-'
+            print(f'{mode:10}  {version or "-":9}  {sprites or 0:08b}  {path}')
+
+
+def generate_snapshots(argv: list[str]) -> None:
+    """Generate synthetic snapshot corpus."""
+    args = parse_generate_args(argv)
+
+    start = time.perf_counter()
+    specs = synth.corpus(args.count, args.seed, args.modes, args.images, args.compress,
+                         args.sprites / 100, args.filler)
+    count, nbytes = synth.generate(specs, args.outdir, args.jobs)
+    elapsed = time.perf_counter() - start
+    print(f'Generated {count} snapshot file(s), {nbytes / 1e6:.1f} MB in {elapsed:.2f}s')
+
+
+# Subcommands (dispatched before parsing snapshot options).
+COMMANDS = {
+    'convert': convert_files,
+    'generate': generate_snapshots,
+    'index': index_files,
+    'query': query_catalog
+}
 
 
 def main() -> None:
     """Main."""
     try:
-        process_files()
+        # Note: the first argument is a command if it is a command name (see COMMANDS_EPILOG).
+        command = COMMANDS.get(sys.argv[1] if len(sys.argv) > 1 else '')
+        if command is not None:
+            command(sys.argv[2:])
+        else:
+            process_files()
     except (BrokenPipeError, KeyboardInterrupt):
         raise SystemExit(1)     # pylint: disable=raise-missing-from
 
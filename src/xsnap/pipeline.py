@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Pipelined (multi-threaded) processing of snapshot files.
+
+Snapshots are opened, decompressed and decoded by a pool of reader threads
+ahead of time, encoded in the calling thread and written by a writer thread.
+Decompression and file writes release the GIL, so reading, encoding and
+writing overlap. Queues between the stages are bounded, at most `depth`
+snapshots are held in memory by each stage.
+
+Stages do not print, their output (reports, stage timings and errors) is
+returned in the results.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+from .batch import BatchResult
+from .vice import Screenshot
+
+LoadFunc = Callable[[Path, Optional[Path]], Optional[Screenshot]]
+
+
+@dataclass
+class _Item:
+    """Snapshot passed between pipeline stages."""
+    result: BatchResult
+    shot: Optional[Screenshot] = None
+    formats: list[tuple[str, bytes]] = field(default_factory=list)
+
+    def fail(self, err: Exception) -> None:
+        """Mark item as failed."""
+        self.result.ok = False
+        self.result.error = f'{type(err).__name__}: {err}'
+        self.shot = None
+
+
+def _read(load: LoadFunc, file: Path, outdir: Optional[Path]) -> _Item:
+    """Reader stage: open, decompress and decode snapshot."""
+    item = _Item(BatchResult(file))
+    start = time.perf_counter()
+    try:
+        item.shot = load(file, outdir)
+    except Exception as err:        # pylint: disable=broad-exception-caught
+        item.fail(err)
+    if item.shot is not None and item.shot.report is not None:
+        item.result.report = item.shot.report
+        item.result.report.timings['load'] = time.perf_counter() - start
+    return item
+
+
+def _write(items: 'queue.Queue[Optional[_Item]]',
+           results: 'queue.Queue[Optional[BatchResult]]') -> None:
+    """Writer stage: write encoded images."""
+    while (item := items.get()) is not None:
+        if item.shot is not None:
+            start = time.perf_counter()
+            try:
+                item.result.outputs = item.shot.write(item.formats)
+            except Exception as err:    # pylint: disable=broad-exception-caught
+                item.fail(err)
+            if item.result.report is not None:
+                item.result.report.timings['write'] = time.perf_counter() - start
+        results.put(item.result)
+    results.put(None)
+
+
+def _drain(results: 'queue.Queue[Optional[BatchResult]]') -> Iterator[BatchResult]:
+    """Return results available without blocking."""
+    while True:
+        try:
+            result = results.get_nowait()
+        except queue.Empty:
+            return
+        assert result is not None       # Shut mypy up.
+        yield result
+
+
+def run_pipelined(load: LoadFunc, files: list[Path], outdir: Optional[Path],
+                  threads: int = 2, depth: int = 4) -> Iterator[BatchResult]:
+    """Process files in a read/encode/write pipeline.
+
+    Results are returned in input order.
+    """
+    # pylint: disable=too-many-locals
+    items: 'queue.Queue[Optional[_Item]]' = queue.Queue(maxsize=depth)
+    results: 'queue.Queue[Optional[BatchResult]]' = queue.Queue()
+    writer = threading.Thread(target=_write, args=(items, results),
+                              name='xsnap-writer', daemon=True)
+
+    writer.start()
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='xsnap-reader') as pool:
+        pending: deque[Future[_Item]] = deque()
+        todo = iter(files)
+        for file in todo:
+            pending.append(pool.submit(_read, load, file, outdir))
+            if len(pending) == depth:
+                break
+        while pending:
+            item = pending.popleft().result()
+            for file in todo:
+                pending.append(pool.submit(_read, load, file, outdir))
+                break
+            # Encoder stage.
+            if item.shot is not None:
+                start = time.perf_counter()
+                try:
+                    item.formats = item.shot.encode()
+                except Exception as err:    # pylint: disable=broad-exception-caught
+                    item.fail(err)
+                if item.result.report is not None:
+                    item.result.report.timings['encode'] = time.perf_counter() - start
+            items.put(item)
+            yield from _drain(results)
+    items.put(None)
+    while (result := results.get()) is not None:
+        yield result
+
+
+# vim: set sts=4 et sw=4:
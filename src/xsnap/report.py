@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Snapshot reports.
+
+The library fills reports (snapshot metadata, warnings, written images and
+stage timings) instead of printing, the caller decides what to show: nothing
+but errors (quiet), human readable text or one JSON record per snapshot.
+"""
+
+import json
+from dataclasses import asdict, dataclass, field
+from enum import Enum
+from pathlib import Path
+from typing import Any, Optional
+
+
+class Format(Enum):
+    """Report output format."""
+    QUIET = 'quiet'
+    HUMAN = 'human'
+    JSON = 'json'
+
+
+@dataclass
+class Output:
+    """Written image."""
+    path: str
+    size: int
+    saved: int = 0                  # Bytes saved by optimization.
+    stored: Optional[str] = None    # Content store image name (dedup).
+
+
+@dataclass
+class Report:           # pylint: disable=too-many-instance-attributes
+    """Snapshot report."""
+    file: str
+    vsf_version: Optional[str] = None
+    machine: Optional[str] = None
+    vice_version: Optional[str] = None
+    modules: dict[str, str] = field(default_factory=dict)  # Module versions (by name).
+    mode: Optional[str] = None      # Graphics mode (GraphicsMode name, lower case).
+    screen: Optional[str] = None    # Screen type of written images.
+    bank: Optional[int] = None
+    sprites: Optional[int] = None   # Sprite enable mask ($d015).
+    truncated: bool = False
+    warnings: list[str] = field(default_factory=list)
+    outputs: list[Output] = field(default_factory=list)
+    timings: dict[str, float] = field(default_factory=dict)     # Stage times (seconds).
+    error: Optional[str] = None
+    # Register dump (human format, verbose only).
+    details: list[str] = field(default_factory=list, repr=False)
+
+    def paths(self) -> list[Path]:
+        """Return paths of written images."""
+        return [Path(_.path) for _ in self.outputs]
+
+    def summary(self) -> str:
+        """Return one line summary."""
+        info = [f'VSF {self.vsf_version}', self.machine or '?', f'VICE {self.vice_version}']
+        if self.mode is not None:
+            info += [self.mode, f'bank ${self.bank:04x}', f'sprites {self.sprites:08b}']
+        info.append(' '.join(f'{name}/{version}' for name, version in self.modules.items()))
+        if self.truncated:
+            info.append('truncated')
+        return ', '.join(info)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return report as a dictionary (without details)."""
+        data = asdict(self)
+        del data['details']
+        return data
+
+    def to_json(self) -> str:
+        """Return report as a single line JSON record."""
+        return json.dumps(self.to_dict(), separators=(',', ':'))
+
+    def to_text(self, verbose: bool = False) -> str:
+        """Return report as human readable text (errors are not included)."""
+        lines = [f'{self.file}: {self.summary()}' if self.vsf_version else str(self.file)]
+        if verbose:
+            lines += self.details
+        lines += [f'Warning: {_}' for _ in self.warnings]
+        if self.outputs:
+            lines.append(f'Writing {self.screen} images:')
+        for out in self.outputs:
+            line = f'  {out.path} : {out.size:5} bytes'
+            if out.stored is not None:
+                line += f' -> {out.stored}'
+            if out.saved:
+                line += f' (optimized, {out.saved} bytes saved)'
+            lines.append(line)
+        return '\n'.join(lines) + '\n'
+
+    def format(self, fmt: Format, verbose: bool = False) -> str:
+        """Return report in given format ('' in quiet mode)."""
+        if fmt is Format.JSON:
+            return self.to_json() + '\n'
+        if fmt is Format.HUMAN:
+            return self.to_text(verbose)
+        return ''
+
+
+# vim: set sts=4 et sw=4:
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Content-addressed output store.
+
+Images are stored once per distinct screen in the store directory, named by
+the screen content hash. Output files of snapshots showing the same screen
+are hard links to the stored images (copies where hard links are not
+supported), so identical screens are neither encoded nor stored twice.
+"""
+
+import os
+import shutil
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from . import instrument
+from .imageformats import raster
+from .report import Output
+from .utils import fileutils
+
+if TYPE_CHECKING:
+    from .vice import Screenshot
+
+STORE_DIRNAME = '.xsnap-store'
+
+
+class ContentStore:
+    """Content-addressed output store."""
+
+    def __init__(self, outdir: Path) -> None:
+        self.path = outdir / STORE_DIRNAME
+
+    def image_path(self, key: str, ext: str) -> Path:
+        """Return path of stored image."""
+        return self.path / f'{key}.{ext}'
+
+    @staticmethod
+    def _split(exts: tuple[str, ...]) -> tuple[list[str], list[str]]:
+        """Split extensions into native and rendered image formats."""
+        return ([_ for _ in exts if _ not in raster.FORMATS],
+                [_ for _ in exts if _ in raster.FORMATS])
+
+    def key(self, shot: 'Screenshot') -> str:
+        """Return store key of the screenshot images."""
+        # Note: images encoded with non-default options differ from the default ones.
+        variant = shot.options.variant()
+        return shot.image.digest() + (f'-{variant}' if variant else '')
+
+    def contains(self, shot: 'Screenshot') -> bool:
+        """Return True if images of the screenshot are stored."""
+        key = self.key(shot)
+        if not shot.options.smallest:
+            return all(self.image_path(key, _).exists() for _ in shot.extensions())
+        # Note: only the smallest native image is stored in smallest mode.
+        native, rendered = self._split(shot.extensions())
+        return (any(self.image_path(key, _).exists() for _ in native)
+                and all(self.image_path(key, _).exists() for _ in rendered))
+
+    def write(self, shot: 'Screenshot', formats: list[tuple[str, bytes]]) -> list[Path]:
+        """Store encoded images and link them to the screenshot output files."""
+        key = self.key(shot)
+        self.path.mkdir(exist_ok=True)
+        for ext, data in formats:
+            # Note: atomic, workers may store the same screen concurrently.
+            with instrument.stage('write', len(data)):
+                fileutils.replace_file(self.image_path(key, ext), data)
+
+        images = sorted(((ext, self.image_path(key, ext)) for ext in shot.extensions()
+                         if self.image_path(key, ext).exists()),
+                        key=lambda _: _[1].stat().st_size)
+        if shot.options.smallest:
+            native, _ = self._split(shot.extensions())
+            images = [_ for _ in images if _[0] in native][:1] + \
+                [_ for _ in images if _[0] not in native]
+
+        assert shot.report is not None      # Shut mypy up.
+        written = []
+        for ext, stored in images:
+            fullpath = shot.outdir / f'{shot.basename}.{ext}'
+            link(stored, fullpath)
+            written.append(fullpath)
+            shot.report.outputs.append(Output(str(fullpath), stored.stat().st_size,
+                                              shot.savings.get(ext, 0), stored.name))
+        return written
+
+
+def link(src: Path, dest: Path) -> None:
+    """Hard link src to dest (replacing dest), copy if linking fails."""
+    try:
+        if dest.samefile(src):
+            return
+        dest.unlink()
+    except FileNotFoundError:
+        pass
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copyfile(src, dest)
+
+
+# vim: set sts=4 et sw=4:
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""Synthetic snapshot generator.
+
+Builds C64 snapshots of any graphics mode, VIC bank and screen layout, with
+sprites, from the random, black and white images (the screen data is placed
+in RAM and color RAM where VIC-II reads it). Snapshots are described by specs,
+a corpus of random specs is reproducible from its seed. Compression levels are
+the fastest ones, the corpus is meant for load testing.
+"""
+
+import bz2
+import gzip
+import lzma
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Sequence, Union
+
+from .imageformats.c64 import hires, multicolor, text
+from .imageformats.c64.scrtypes import MultiColorScreen, TextScreen
+from .vice.vsf import writer
+
+# VIC-II $d011 and $d016 of graphics modes (GraphicsMode names, lower case, as in
+# reports and the catalog).
+MODES = {
+    'bitmap': (0x3b, 0x08),
+    'multicolor': (0x3b, 0x18),
+    'char_std': (0x1b, 0x08),
+    'char_multi': (0x1b, 0x18),
+    'ext_bgcol': (0x5b, 0x08),
+}
+
+BITMAP_MODES = ('bitmap', 'multicolor')
+
+# Image kinds.
+IMAGES = ('random', 'black', 'white')
+
+# File name suffixes by compression.
+COMPRESSIONS = {
+    'none': '.vsf',
+    'gz': '.vsf.gz',
+    'bz2': '.vsf.bz2',
+    'xz': '.vsf.xz',
+}
+
+BANKS = (0x0000, 0x4000, 0x8000, 0xc000)
+
+# Font slots VIC-II reads from character ROM in banks $0000 and $8000.
+ROM_FONT_SLOTS = (2, 3)
+
+# Names of filler modules (VICE modules not read by xsnap).
+FILLER_NAMES = (b'SID', b'DRIVE8', b'DRIVECPU0', b'DATASETTE')
+
+# Size of the BASIC program block at $0801 (random bytes).
+PROGRAM_SIZE = 4096
+
+Image = Union[hires.HiresImage, multicolor.MultiColorImage, text.TextImage]
+
+# Random (from a generator), black and white image classes of a screen type.
+ImageClasses = tuple[Callable[[random.Random], Image], Callable[[], Image], Callable[[], Image]]
+
+
+@dataclass(frozen=True)
+class Spec:             # pylint: disable=too-many-instance-attributes
+    """Synthetic snapshot description.
+
+    Slots are $d018 fields: screen in 1 kB, bitmap in 8 kB and font in 2 kB
+    units from the VIC bank address.
+    """
+    mode: str = 'multicolor'
+    bank: int = 0x0000
+    screen: int = 1
+    bitmap: int = 1
+    font: int = 4
+    image: str = 'random'
+    sprites: int = 0                # Sprite enable mask ($d015).
+    seed: int = 0
+    filler: tuple[int, ...] = ()    # Payload sizes of filler modules.
+    compression: str = 'none'
+
+    def check(self) -> None:
+        """Raise ValueError if the spec is not valid (unknown values, overlapping data)."""
+        if self.mode not in MODES:
+            raise ValueError(f'unknown graphics mode: {self.mode}')
+        if self.image not in IMAGES:
+            raise ValueError(f'unknown image kind: {self.image}')
+        if self.compression not in COMPRESSIONS:
+            raise ValueError(f'unknown compression: {self.compression}')
+        if self.bank not in BANKS:
+            raise ValueError(f'invalid VIC bank address: ${self.bank:04x}')
+        if not (0 <= self.screen < 16 and 0 <= self.bitmap < 2 and 0 <= self.font < 8):
+            raise ValueError('invalid screen, bitmap or font slot')
+        if not 0 <= self.sprites < 256:
+            raise ValueError(f'invalid sprite mask: {self.sprites}')
+        if self.screen in self.used_slots(screen=False):
+            raise ValueError('screen overlaps bitmap or font')
+        if self.sprites and self.sprite_slot() is None:
+            raise ValueError('no free slot for sprite data')
+
+    def is_rom_font(self) -> bool:
+        """Return True if VIC-II reads the font from character ROM."""
+        return (self.mode not in BITMAP_MODES and self.bank in (0x0000, 0x8000)
+                and self.font in ROM_FONT_SLOTS)
+
+    def used_slots(self, screen: bool = True) -> set[int]:
+        """Return 1 kB slots of the bank used by screen, bitmap and font."""
+        slots = {self.screen} if screen else set()
+        if self.mode in BITMAP_MODES:
+            slots.update(range(8 * self.bitmap, 8 * self.bitmap + 8))
+        else:
+            slots.update((2 * self.font, 2 * self.font + 1))
+        return slots
+
+    def sprite_slot(self) -> Optional[int]:
+        """Return 1 kB slot of sprite data (None if there is none free)."""
+        used = self.used_slots()
+        # Note: VIC-II sees character ROM at slots 4-7 of banks $0000 and $8000.
+        rom = range(4, 8) if self.bank in (0x0000, 0x8000) else ()
+        for slot in range(1, 16):
+            if slot not in used and slot not in rom:
+                return slot
+        return None
+
+    def d018(self) -> int:
+        """Return $d018 (memory setup register)."""
+        if self.mode in BITMAP_MODES:
+            return self.screen << 4 | self.bitmap << 3 | 0b0001
+        return self.screen << 4 | self.font << 1 | 0b0001
+
+    def filename(self, num: int) -> str:
+        """Return snapshot file name."""
+        return f'snap{num:05}-{self.mode}{COMPRESSIONS[self.compression]}'
+
+
+def random_spec(rnd: random.Random, modes: Sequence[str] = tuple(MODES),
+                images: Sequence[str] = IMAGES, compressions: Sequence[str] = ('none',),
+                sprites: float = 0.5, filler: tuple[int, ...] = ()) -> Spec:
+    """Return random valid spec (sprites is the probability of enabled sprites)."""
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    mode = rnd.choice(modes)
+    bank = rnd.choice(BANKS)
+    bitmap = rnd.randrange(2)
+    font = rnd.choice([_ for _ in range(8)
+                       if _ not in ROM_FONT_SLOTS or bank not in (0x0000, 0x8000)])
+    spec = Spec(mode=mode, bank=bank, bitmap=bitmap, font=font)
+    # Note: screen slot 0 of bank $0000 is the zero page and stack.
+    screens = [_ for _ in range(16)
+               if _ not in spec.used_slots(screen=False) and (bank or _)]
+    mask = rnd.randrange(1, 256) if rnd.random() < sprites else 0
+    return Spec(mode=mode, bank=bank, screen=rnd.choice(screens), bitmap=bitmap, font=font,
+                image=rnd.choice(images), sprites=mask, seed=rnd.getrandbits(32),
+                filler=filler, compression=rnd.choice(compressions))
+
+
+def make_image(mode: str, kind: str, rnd: random.Random) -> Image:
+    """Return image of screen type of the graphics mode (random images generated from rnd)."""
+    classes: ImageClasses
+    if mode == 'bitmap':
+        classes = (hires.RandomHiresC64, hires.BlackHiresC64, hires.WhiteHiresC64)
+    elif mode == 'multicolor':
+        classes = (multicolor.RandomMultiC64, multicolor.BlackMultiC64, multicolor.WhiteMultiC64)
+    else:
+        # Note: character modes share text images (multicolor / extended colors in registers).
+        classes = (text.RandomTextC64, text.BlackTextC64, text.WhiteTextC64)
+    random_cls, black_cls, white_cls = classes
+    if kind == 'random':
+        return random_cls(rnd)
+    return black_cls() if kind == 'black' else white_cls()
+
+
+def build(spec: Spec) -> bytes:
+    """Return uncompressed snapshot described by spec."""
+    # pylint: disable=too-many-locals
+    spec.check()
+    rnd = random.Random(spec.seed)
+    data = make_image(spec.mode, spec.image, rnd).data
+
+    ram = bytearray(65536)
+    ram[0x0801:0x0801 + PROGRAM_SIZE] = rnd.randbytes(PROGRAM_SIZE)
+    regs = bytearray(64)
+    regs[0x11], regs[0x16] = MODES[spec.mode]
+    regs[0x12] = rnd.randrange(256)
+    regs[0x18] = spec.d018()
+    regs[0x20] = 0xf0 | ord(data.border)    # Note: unused bits read as 1.
+    regs[0x21] = 0xf0
+    if isinstance(data, TextScreen):
+        regs[0x21] |= ord(data.bgcolor)
+        # Extra background colors ($d022-$d024).
+        extra = {'random': rnd.randbytes(3), 'black': bytes(3), 'white': b'\x01' * 3}
+        regs[0x22:0x25] = bytes(0xf0 | _ & 0x0f for _ in extra[spec.image])
+        if not spec.is_rom_font():
+            font = spec.bank + 2048 * spec.font
+            charset = {'random': rnd.randbytes(2048), 'black': bytes(2048),
+                       'white': b'\xff' * 2048}[spec.image]
+            ram[font:font + 2048] = charset
+    else:
+        bitmap = spec.bank + 8192 * spec.bitmap
+        ram[bitmap:bitmap + 8000] = data.bitmap
+        if isinstance(data, MultiColorScreen):
+            regs[0x21] |= ord(data.bgcolor)
+    screen = spec.bank + 1024 * spec.screen
+    ram[screen:screen + 1000] = data.screen
+    # Note: hires screens do not use color RAM.
+    colors = getattr(data, 'colors', None) or rnd.randbytes(1000)
+    color_ram = bytes(_ & 0x0f for _ in colors)
+
+    if spec.sprites:
+        _add_sprites(rnd, spec, ram, regs)
+
+    modules = [
+        writer.pack_module(b'MAINCPU', bytes(40), 1, 1),
+        writer.c64mem_module(bytes(ram)),
+        writer.cia2_module(spec.bank),
+        writer.vic2_module(bytes(regs), color_ram),
+    ]
+    for num, size in enumerate(spec.filler):
+        name = FILLER_NAMES[num] if num < len(FILLER_NAMES) else f'FILLER{num}'.encode()
+        # Note: partly random payload (compresses like real emulator state).
+        modules.append(writer.pack_module(name, rnd.randbytes(size // 4)
+                                          + bytes(size - size // 4)))
+    return writer.pack_snapshot(modules)
+
+
+def _add_sprites(rnd: random.Random, spec: Spec, ram: bytearray, regs: bytearray) -> None:
+    """Place sprite data and pointers in RAM, set sprite registers."""
+    slot = spec.sprite_slot()
+    assert slot is not None
+    data = spec.bank + 1024 * slot
+    pointers = spec.bank + 1024 * spec.screen + 0x3f8
+    msb = 0
+    for num in range(8):
+        ram[pointers + num] = 16 * slot + num
+        ram[data + 64 * num:data + 64 * num + 63] = rnd.randbytes(63)
+        posx = rnd.randrange(24, 344)
+        regs[2 * num] = posx & 0xff
+        regs[2 * num + 1] = rnd.randrange(50, 230)
+        msb |= (posx >> 8) << num
+        regs[0x27 + num] = 0xf0 | rnd.randrange(16)
+    regs[0x10] = msb
+    regs[0x15] = spec.sprites
+    # Double height, priority, multicolor and double width masks.
+    regs[0x17], regs[0x1b], regs[0x1c], regs[0x1d] = rnd.randbytes(4)
+    regs[0x25], regs[0x26] = (0xf0 | _ for _ in rnd.randbytes(2))
+
+
+def compress(data: bytes, method: str) -> bytes:
+    """Compress snapshot (fastest level)."""
+    if method == 'gz':
+        return gzip.compress(data, 1, mtime=0)
+    if method == 'bz2':
+        return bz2.compress(data, 1)
+    if method == 'xz':
+        return lzma.compress(data, preset=0)
+    if method == 'none':
+        return data
+    raise ValueError(f'unknown compression: {method}')
+
+
+def write(spec: Spec, path: Path) -> int:
+    """Write snapshot file, return its size."""
+    data = compress(build(spec), spec.compression)
+    path.write_bytes(data)
+    return len(data)
+
+
+def corpus(count: int, seed: int = 0,  # pylint: disable=too-many-arguments
+           modes: Sequence[str] = tuple(MODES), images: Sequence[str] = IMAGES,
+           compressions: Sequence[str] = ('none',), sprites: float = 0.5,
+           filler: tuple[int, ...] = ()) -> list[Spec]:
+    """Return specs of a reproducible random corpus (same seed, same corpus)."""
+    # pylint: disable=too-many-positional-arguments
+    rnd = random.Random(seed)
+    return [random_spec(rnd, modes, images, compressions, sprites, filler)
+            for _ in range(count)]
+
+
+def generate(specs: Iterable[Spec], outdir: Path, jobs: int = 1) -> tuple[int, int]:
+    """Write snapshot files to outdir, return number of files and bytes written.
+
+    Files are numbered in the order of specs.
+    """
+    specs = list(specs)
+    for spec in specs:
+        spec.check()
+    outdir.mkdir(parents=True, exist_ok=True)
+    paths = [outdir / spec.filename(num) for num, spec in enumerate(specs)]
+    if jobs == 1 or len(specs) <= 1:
+        sizes: Iterable[int] = map(write, specs, paths)
+        return len(specs), sum(sizes)
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as pool:
+        return len(specs), sum(pool.map(write, specs, paths, chunksize=64))
+
+
+# vim: set sts=4 et sw=4:
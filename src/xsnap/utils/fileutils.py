@@ -4,51 +4,101 @@
 import bz2
 import gzip
 import lzma
+import mmap
+import os
 from datetime import datetime
 from io import BufferedReader
 from pathlib import Path
+from typing import Optional
+
+from .. import instrument
+
+
+# Compressed stream signatures (the longest one determines the sniff size).
+GZIP_MAGIC = b'\x1f\x8b'
+BZIP2_MAGIC = b'BZh'
+XZ_MAGIC = b'\xfd7zXZ\x00'
+
+_SNIFF_SIZE = len(XZ_MAGIC)
 
 
 def open_file(path: Path) -> BufferedReader:
-    """Open the file."""
-    # Gzip file.
-    try:
-        fobj = gzip.open(path)
-        fobj.read(1)
-        fobj.seek(0)
-        return fobj
-    except gzip.BadGzipFile:
-        pass
-
-    # Bzip2 file.
-    try:
-        fobj = bz2.open(path)
-        fobj.read(1)
-        fobj.seek(0)
-        fobj.name = path.name           # XXX: dirty hack.
-        fobj.dirname = path.parent      # XXX: dirty hack.
-        return fobj
-    except OSError:
-        pass
-
-    # LZMA file.
-    try:
-        fobj = lzma.open(path)
-        fobj.read(1)
-        fobj.seek(0)
-        fobj.name = path.name   # XXX: dirty hack.
-        fobj.dirname = path.parent      # XXX: dirty hack.
-        return fobj
-    except lzma.LZMAError:
-        pass
-
-    # Uncompressed file.
-    fobj = open(path, 'rb')         # pylint: disable=consider-using-with
+    """Open the file.
+
+    Compression is detected from the magic bytes at the start of the file,
+    the stream is then decompressed in a single forward pass.
+    """
+    # pylint: disable=consider-using-with
+    with instrument.stage('open'):
+        fobj = open(path, 'rb')
+        try:
+            magic = fobj.peek(_SNIFF_SIZE)[:_SNIFF_SIZE]
+            opener = None
+            if magic.startswith(GZIP_MAGIC):
+                opener = gzip.open
+            elif magic.startswith(BZIP2_MAGIC):
+                opener = bz2.open
+            elif magic.startswith(XZ_MAGIC):
+                opener = lzma.open
+            if opener is not None:
+                fobj.close()
+                fobj = opener(path)
+                fobj.name = str(path)   # XXX: dirty hack.
+        except BaseException:
+            fobj.close()
+            raise
+
     fobj.dirname = path.parent      # XXX: dirty hack.
 
     return fobj
 
 
+def peek(fobj: BufferedReader, size: int) -> bytes:
+    """Return next size bytes without moving the file position.
+
+    Uses the stream read-ahead buffer when possible, so compressed streams
+    are not rewound (which means decompressing them from the start again).
+    """
+    data = fobj.peek(size)[:size]
+    if len(data) < size:
+        pos = fobj.tell()
+        data = fobj.read(size)
+        fobj.seek(pos)
+    return data
+
+
+def map_file(fobj: BufferedReader) -> Optional[mmap.mmap]:
+    """Map uncompressed file into memory (read-only).
+
+    Returns None for compressed streams, empty files and files that cannot be
+    mapped; the caller falls back to regular reads then.
+    """
+    if not isinstance(fobj, BufferedReader):
+        return None
+    try:
+        fileno = fobj.fileno()
+        if os.fstat(fileno).st_size == 0:
+            return None
+        return mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+
+def replace_file(path: Path, data: bytes) -> None:
+    """Write file through a temporary file renamed over path (atomic).
+
+    The old file is replaced, not overwritten in place, so hard links to it
+    (e.g. content store images) keep their content.
+    """
+    tmppath = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    try:
+        tmppath.write_bytes(data)
+        os.replace(tmppath, path)
+    except BaseException:
+        tmppath.unlink(missing_ok=True)
+        raise
+
+
 def save_file(outdir: Path, name_stem: str, ext: str, data: bytes,
               overwrite: bool = False) -> bool:
     """Write file."""
@@ -2,80 +2,338 @@
 """VSF (VICE Snapshot File).
 """
 
+import hashlib
+import sys
 import tempfile
+from dataclasses import dataclass, field
 from io import BufferedReader
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Iterable, Optional, Union
 
 from . import vsf
 from .x64 import X64
-from .. import imageformats
-from ..utils import log
+from .. import imageformats, instrument
+from ..imageformats import raster
+from ..imageformats.c64.palettes import DEFAULT_PALETTE, PALETTES
+from ..report import Output, Report
+from ..utils import fileutils
+
+if TYPE_CHECKING:
+    from ..store import ContentStore
+
+
+class UnsupportedSnapshot(vsf.VSFError):
+    """Snapshot of unsupported machine or graphics mode (no screenshot)."""
 
 
 def is_vice_snapshot(fobj: BufferedReader) -> bool:
     """Return True if file is a VICE snapshot (VSF) file."""
-    fobj.seek(0)
-    return fobj.read(len(vsf.VSF_MAGIC)) == vsf.VSF_MAGIC
+    if fobj.tell() != 0:
+        fobj.seek(0)
+    return fileutils.peek(fobj, len(vsf.VSF_MAGIC)) == vsf.VSF_MAGIC
 
 
-def export_hires_images(img: imageformats.c64.HiresImage, basename: str,
-                        outdir: Path) -> None:
-    """Export hires images."""
-    formats = sorted([
-        ('aas', img.as_aas()),
-        ('doo', img.as_doo()),
-        ('hpc', img.as_hpc())
-    ], key=lambda _: len(_[1]), reverse=False)
+Image = Union[imageformats.c64.HiresImage, imageformats.c64.MultiColorImage,
+              imageformats.c64.TextImage, imageformats.c64.MultiTextImage,
+              imageformats.c64.EcmTextImage]
+
+# Default output formats (file extensions).
+HIRES_FORMATS = ('aas', 'doo', 'hpc')
+MULTI_FORMATS = ('ami', 'drp', 'drz', 'gas', 'koa', 'zom')
+TEXT_FORMATS = ('pdr', 'pet')
+MULTITEXT_FORMATS = ('mct',)
+ECMTEXT_FORMATS = ('ect',)
+
+# Rendered image formats (any screen type).
+RASTER_FORMATS = raster.FORMATS
+
+# All supported output formats.
+ALL_FORMATS = tuple(sorted({
+    *imageformats.c64.HiresImage.FORMATS,
+    *imageformats.c64.MultiColorImage.FORMATS,
+    *imageformats.c64.TextImage.FORMATS,
+    *imageformats.c64.MultiTextImage.FORMATS,
+    *imageformats.c64.EcmTextImage.FORMATS,
+    *RASTER_FORMATS
+}))
+
+
+@dataclass
+class RenderOptions:
+    """Rendered image (PNG, PPM) options."""
+    palette: str = DEFAULT_PALETTE
+    level: int = 6              # PNG compression level.
+    border: bool = False        # Full frame with border.
+    scale: int = 1              # Integer scale factor.
+
+    def tag(self) -> str:
+        """Return string identifying the options."""
+        return f'{self.palette},{self.level},{int(self.border)},{self.scale}'
+
+
+@dataclass
+class ExportOptions:
+    """Image export options."""
+    formats: Optional[tuple[str, ...]] = None   # Selected formats (None = defaults).
+    smallest: bool = False      # Export only the smallest of the selected formats.
+    dedup: bool = False         # Use content-addressed output store.
+    optimize: bool = False      # Optimal escape value for escape coded formats.
+    render: RenderOptions = field(default_factory=RenderOptions)
+
+    def tag(self) -> str:
+        """Return string identifying options affecting the output files."""
+        formats = ','.join(self.formats) if self.formats is not None else ''
+        return (f'formats={formats};smallest={int(self.smallest)};optimize={int(self.optimize)}'
+                f';render={self.render.tag()}')
+
+    def variant(self) -> str:
+        """Return short hash of options changing image contents ('' for defaults)."""
+        if not self.optimize and self.render == RenderOptions():
+            return ''
+        tag = f'{int(self.optimize)};{self.render.tag()}'
+        return hashlib.blake2b(tag.encode(), digest_size=4).hexdigest()
+
+
+def render_image(img: Image, ext: str, options: Optional[RenderOptions] = None) -> bytes:
+    """Render image in raster format (png, ppm)."""
+    options = options or RenderOptions()
+    frame = img.render(border=options.border)
+    palette = PALETTES[options.palette]
+    if ext == 'png':
+        return raster.png(frame, palette, options.level, options.scale)
+    return raster.ppm(frame, palette, options.scale)
 
-    print('Writing hires screen images:')
+
+def encode_image(img: Image, ext: str, optimize: bool = False,
+                 render: Optional[RenderOptions] = None) -> tuple[bytes, int]:
+    """Encode image in given format, return data and bytes saved by optimization.
+
+    With optimize the escape value of escape coded formats is chosen by exact
+    encoded size instead of value frequency.
+    """
+    with instrument.stage(f'encode.{ext}') as stage:
+        saved = 0
+        if ext in RASTER_FORMATS:
+            data = render_image(img, ext, render)
+        elif optimize and isinstance(img, imageformats.c64.MultiColorImage) \
+                and (best := img.optimal_escape(ext)) is not None:
+            escval, saved = best
+            data = img.encode(ext, escval=escval)
+        else:
+            data = img.encode(ext)
+        stage.add(len(data))
+    return data, saved
+
+
+def encode_images(img: Image, exts: Iterable[str],   # pylint: disable=too-many-arguments
+                  smallest: bool = False, optimize: bool = False,
+                  savings: Optional[dict[str, int]] = None,
+                  render: Optional[RenderOptions] = None,
+                  warnings: Optional[list[str]] = None) -> list[tuple[str, bytes]]:
+    """Encode image in given formats (sorted by size).
+
+    Only the requested encoders are run. In smallest mode only the smallest
+    image is returned, fixed size formats are not encoded unless they win.
+    Rendered images (png, ppm) are previews, they are always returned.
+    Bytes saved by optimization are stored in savings (by extension), images
+    that cannot be rendered are reported in warnings.
+    """
+    # pylint: disable=too-many-positional-arguments,too-many-locals
+    def encode(ext: str) -> bytes:
+        data, saved = encode_image(img, ext, optimize, render)
+        if saved and savings is not None:
+            savings[ext] = saved
+        return data
+
+    exts = list(exts)
+    rendered = []
+    for ext in [_ for _ in exts if _ in RASTER_FORMATS]:
+        try:
+            rendered.append((ext, encode(ext)))
+        except ValueError as err:
+            if warnings is not None:
+                warnings.append(f'{ext} image not rendered: {err}')
+
+    exts = [_ for _ in exts if _ in img.FORMATS]
+    if not smallest:
+        return sorted([(_, encode(_)) for _ in exts] + rendered, key=lambda _: len(_[1]))
+
+    fixed = [(img.FORMATS[_].FILE_SIZE, _) for _ in exts if hasattr(img.FORMATS[_], 'FILE_SIZE')]
+    best_size, best_ext = min(fixed) if fixed else (sys.maxsize, '')
+    best_data = None
+    for ext in exts:
+        if hasattr(img.FORMATS[ext], 'FILE_SIZE'):
+            continue
+        data = encode(ext)
+        if len(data) < best_size:
+            best_size, best_ext, best_data = len(data), ext, data
+    if not best_ext:
+        return rendered
+    return [(best_ext, best_data if best_data is not None else encode(best_ext))] + rendered
+
+
+def encode_hires_images(img: imageformats.c64.HiresImage,
+                        exts: Iterable[str] = HIRES_FORMATS) -> list[tuple[str, bytes]]:
+    """Encode hires images (sorted by size)."""
+    return encode_images(img, exts)
+
+
+def encode_multi_images(img: imageformats.c64.MultiColorImage,
+                        exts: Iterable[str] = MULTI_FORMATS) -> list[tuple[str, bytes]]:
+    """Encode multicolor images (sorted by size)."""
+    return encode_images(img, exts)
+
+
+def encode_text_images(img: imageformats.c64.TextImage,
+                       exts: Iterable[str] = TEXT_FORMATS) -> list[tuple[str, bytes]]:
+    """Encode text images (sorted by size)."""
+    return encode_images(img, exts)
+
+
+def write_images(formats: list[tuple[str, bytes]], basename: str, outdir: Path) -> list[Path]:
+    """Write encoded images, return paths of written files."""
+    written = []
     for ext, data in formats:
         fullpath = outdir / f'{basename}.{ext}'
-        print(f'  {fullpath} : {len(data):5} bytes')
-        fullpath.write_bytes(data)
+        with instrument.stage('write', len(data)):
+            # Note: output files of dedup runs are hard links into the store.
+            fileutils.replace_file(fullpath, data)
+        written.append(fullpath)
+    return written
+
+
+def export_hires_images(img: imageformats.c64.HiresImage, basename: str,
+                        outdir: Path) -> None:
+    """Export hires images."""
+    write_images(encode_hires_images(img), basename, outdir)
 
 
 def export_multi_images(img: imageformats.c64.MultiColorImage, basename: str,
                         outdir: Path) -> None:
     """Export multicolor images."""
-    formats = sorted([
-        ('ami', img.as_amica()),
-        ('drp', img.as_drp()),
-        ('drz', img.as_drz()),
-        ('gas', img.as_graphic_assault_system()),
-        ('koa', img.as_koala()),
-        ('zom', img.as_zoomatic())
-    ], key=lambda _: len(_[1]), reverse=False)
-
-    print('Writing multicolor screen images:')
-    for ext, data in formats:
-        fullpath = outdir / f'{basename}.{ext}'
-        print(f'  {fullpath} : {len(data):5} bytes')
-        fullpath.write_bytes(data)
+    write_images(encode_multi_images(img), basename, outdir)
 
 
 def export_text_images(img: imageformats.c64.TextImage, basename: str,
                        outdir: Path) -> None:
     """Export text images."""
-    formats = sorted([
-        ('pdr', img.as_pdr()),
-        ('pet', img.as_pet())
-    ], key=lambda _: len(_[1]), reverse=False)
+    write_images(encode_text_images(img), basename, outdir)
 
-    print('Writing standard character screen images:')
-    for ext, data in formats:
-        fullpath = outdir / f'{basename}.{ext}'
-        print(f'  {fullpath} : {len(data):5} bytes')
-        fullpath.write_bytes(data)
 
+@dataclass
+class Screenshot:
+    """Screenshot decoded from a snapshot, ready to be encoded and written."""
+    basename: str
+    outdir: Path
+    image: Image
+    options: ExportOptions = field(default_factory=ExportOptions)
+    store: Optional['ContentStore'] = None     # Deduplicated output.
+    report: Optional[Report] = None             # Filled when images are encoded and written.
+    # Bytes saved by optimization (by extension), set by encode().
+    savings: dict[str, int] = field(default_factory=dict, init=False, repr=False)
 
-def extract_c64(snap: vsf.ViceSnapshotFile, outdir: Path) -> None:
-    """Extract images from C64 snapshot file."""
+    def __post_init__(self) -> None:
+        if self.report is None:
+            self.report = Report(self.basename)
+        self.report.screen = self.title()
+        if self.options.dedup and self.store is None:
+            from ..store import ContentStore    # pylint: disable=import-outside-toplevel
+            self.store = ContentStore(self.outdir)
+
+    def extensions(self) -> tuple[str, ...]:
+        """Output formats (file extensions)."""
+        if self.options.formats is not None:
+            return tuple(_ for _ in self.options.formats
+                         if _ in self.image.FORMATS or _ in RASTER_FORMATS)
+        if isinstance(self.image, imageformats.c64.MultiColorImage):
+            return MULTI_FORMATS
+        if isinstance(self.image, imageformats.c64.HiresImage):
+            return HIRES_FORMATS
+        if isinstance(self.image, imageformats.c64.MultiTextImage):
+            return MULTITEXT_FORMATS
+        if isinstance(self.image, imageformats.c64.EcmTextImage):
+            return ECMTEXT_FORMATS
+        return TEXT_FORMATS
+
+    def title(self) -> str:
+        """Screen type name."""
+        if isinstance(self.image, imageformats.c64.MultiColorImage):
+            return 'multicolor screen'
+        if isinstance(self.image, imageformats.c64.HiresImage):
+            return 'hires screen'
+        if isinstance(self.image, imageformats.c64.MultiTextImage):
+            return 'multicolor character screen'
+        if isinstance(self.image, imageformats.c64.EcmTextImage):
+            return 'extended background color character screen'
+        return 'standard character screen'
+
+    def encode(self) -> list[tuple[str, bytes]]:
+        """Encode image in selected output formats.
+
+        With content store, nothing is encoded (an empty list is returned)
+        when the store already holds images of the same screen.
+        """
+        if self.store is not None and self.store.contains(self):
+            return []
+        assert self.report is not None      # Shut mypy up.
+        return encode_images(self.image, self.extensions(), smallest=self.options.smallest,
+                             optimize=self.options.optimize, savings=self.savings,
+                             render=self.options.render, warnings=self.report.warnings)
+
+    def write(self, formats: list[tuple[str, bytes]]) -> list[Path]:
+        """Write encoded images, return paths of written files (added to the report)."""
+        assert self.report is not None      # Shut mypy up.
+        if self.store is not None:
+            return self.store.write(self, formats)
+        written = write_images(formats, self.basename, self.outdir)
+        self.report.outputs += [Output(str(path), len(data), self.savings.get(ext, 0))
+                                for path, (ext, data) in zip(written, formats)]
+        return written
+
+
+def describe_snapshot(snap: vsf.ViceSnapshotFile) -> Report:
+    """Return report of snapshot metadata.
+
+    Graphics mode, VIC bank and sprites are set when the snapshot contains
+    C64 CIA2 and VIC-II modules.
+    """
+    report = Report(
+        str(snap.fobj.name),
+        vsf_version=snap.version(),
+        machine=snap.machine.decode(errors='replace'),
+        vice_version='.'.join(str(_) for _ in snap.vice_version),
+        modules={_.magic.decode(errors='replace'): _.version() for _ in snap.modules},
+        truncated=snap.truncated
+    )
+    if snap.is_c64() and snap.has_module(vsf.Module.CIA2) and snap.has_module(vsf.Module.VIC2):
+        vic2 = snap.vic2()
+        regs = vic2.registers(snap.cia2().vic_bank_addr)
+        report.mode = regs.mode.name.lower()
+        report.bank = regs.bank
+        report.sprites = regs.sprites.enabled
+        report.warnings += vic2.warnings
+    return report
+
+
+def load_c64(snap: vsf.ViceSnapshotFile, outdir: Path,
+             options: Optional[ExportOptions] = None) -> Screenshot:
+    """Decode screenshot from C64 snapshot file."""
+    with instrument.stage('decode'):
+        return _load_c64(snap, outdir, options)
+
+
+def _load_c64(snap: vsf.ViceSnapshotFile, outdir: Path,
+              options: Optional[ExportOptions]) -> Screenshot:
+    """Decode screenshot from C64 snapshot file."""
     x64 = X64(snap)
-    x64.show_info()
+    report = describe_snapshot(snap)
+    report.details = x64.describe()
 
-    if x64.has_active_sprites():
-        log.warn((
+    options = options or ExportOptions()
+    # Note: sprites are drawn over rendered images only.
+    rendered = bool(set(options.formats or ()) & set(RASTER_FORMATS))
+    if x64.has_active_sprites() and not rendered:
+        report.warnings.append((
             'snapshot file has active sprites,'
             ' screenshot images may not reflect the actual screen'
         ))
@@ -86,41 +344,71 @@ def extract_c64(snap: vsf.ViceSnapshotFile, outdir: Path) -> None:
     bgcolr = x64.background_color()
     border = x64.border_color()
 
+    img: Image
     if x64.is_screen_multicolor():
-        mimg = imageformats.c64.MultiColorImage(bitmap, screen, colors, bgcolr,
-                                                border)
-        export_multi_images(mimg, snap.basename(), outdir)
+        img = imageformats.c64.MultiColorImage(bitmap, screen, colors, bgcolr, border)
     elif x64.is_screen_hires():
-        himg = imageformats.c64.HiresImage(bitmap, screen, border)
-        export_hires_images(himg, snap.basename(), outdir)
+        img = imageformats.c64.HiresImage(bitmap, screen, border)
     elif x64.is_screen_text():
-        timg = imageformats.c64.TextImage(screen, colors, bgcolr, border,
-                                          x64.memory_setup_register())
-        export_text_images(timg, snap.basename(), outdir)
+        # Note: ROM font is available only in snapshots saved with ROMs.
+        img = imageformats.c64.TextImage(screen, colors, bgcolr, border,
+                                         x64.memory_setup_register(), x64.charset())
+    elif x64.is_screen_multitext():
+        bgcol1, bgcol2, _ = x64.extra_background_colors()
+        img = imageformats.c64.MultiTextImage(screen, colors, bgcolr, bgcol1, bgcol2, border,
+                                              x64.memory_setup_register(), x64.charset())
+    elif x64.is_screen_ecmtext():
+        bgcol1, bgcol2, bgcol3 = x64.extra_background_colors()
+        img = imageformats.c64.EcmTextImage(screen, colors, bgcolr, bgcol1, bgcol2, bgcol3,
+                                            border, x64.memory_setup_register(), x64.charset())
     else:
-        log.error('Screen mode not yet supported')  # XXX: add mode name to error.
+        raise UnsupportedSnapshot(f'screen mode not supported: {x64.graphics_mode()}')
 
+    if rendered:
+        img.sprites = x64.sprites()
+
+    return Screenshot(snap.basename(), outdir, img, options, report=report)
+
+
+def extract_c64(snap: vsf.ViceSnapshotFile, outdir: Path,
+                options: Optional[ExportOptions] = None) -> None:
+    """Extract images from C64 snapshot file."""
+    shot = load_c64(snap, outdir, options)
+    shot.write(shot.encode())
 
-def extract_vice(fobj: BufferedReader, outdir: Optional[Path] = None,
-                 showinfo: bool = False) -> bool:
-    """@@@"""
-    # Read snapshot file.
-    try:
-        snap = vsf.ViceSnapshotFile(fobj)
-    except vsf.VSFError as err:
-        log.error(err)
-        return False
+
+def load_vice(fobj: BufferedReader, outdir: Optional[Path] = None,
+              options: Optional[ExportOptions] = None) -> Screenshot:
+    """Decode screenshot from VICE snapshot file."""
+    # Read snapshot file (up to the modules needed for extraction).
+    snap = vsf.ViceSnapshotFile(fobj, modules=X64.MODULES, optional=X64.OPTIONAL_MODULES)
 
     if outdir is None:
         outdir = fobj.dirname
 
-    if snap.is_c64():
-        extract_c64(snap, outdir)
-    else:
-        print('VICE Snapshot,', snap.machine.decode(),
-              'machine, screenshots unsupported')
-        return False
+    if not snap.is_c64():
+        raise UnsupportedSnapshot(f'{snap.machine.decode(errors="replace")} machine,'
+                                  ' screenshots unsupported')
+
+    return load_c64(snap, outdir, options)
+
 
-    raise SystemExit
+def snapshot_info(fobj: BufferedReader) -> Report:
+    """Return report of VICE snapshot file metadata.
+
+    Only the file and module headers and the CIA2 and VIC-II payloads are
+    read, memory modules are skipped.
+    """
+    snap = vsf.ViceSnapshotFile(fobj, modules=(vsf.Module.CIA2, vsf.Module.VIC2),
+                                all_headers=True)
+    return describe_snapshot(snap)
+
+
+def extract_vice(fobj: BufferedReader, outdir: Optional[Path] = None,
+                 options: Optional[ExportOptions] = None) -> bool:
+    """Extract images from VICE snapshot file."""
+    shot = load_vice(fobj, outdir, options)
+    shot.write(shot.encode())
+    return True
 
 # vim: set sts=4 et sw=4:
@@ -4,15 +4,19 @@ from enum import Enum
 from io import BufferedReader
 from pathlib import Path
 from struct import unpack
+from typing import Iterable, Optional, Union
 
-from .generic import VSFError, VSFModule
+from .generic import VSFError, VSFModule, VSFModuleHeader
+from ... import instrument
+from ...utils import fileutils
 
 from .c64mem import C64Mem
+from .c64rom import C64Rom
 from .cia2 import CIA2
 from .vic2 import VIC2
 
 
-__all__ = ['ViceSnapshotFile', 'VSFError']
+__all__ = ['Module', 'ViceSnapshotFile', 'VSFError', 'VSFModule', 'VSFModuleHeader']
 
 
 VSF_MAGIC = b'VICE Snapshot File\x1a'
@@ -35,66 +39,114 @@ class Machine(Enum):
 class Module(Enum):
     """Module."""
     C64MEM = b'C64MEM'
+    C64ROM = b'C64ROM'
     CIA2 = b'CIA2'
     VIC2 = b'VIC-II'
 
 
-class ViceSnapshotFile:     # pylint: disable=too-many-instance-attributes
-    """VICE Snapshot."""
+ModuleName = Union[bytes, str, Module]
+
 
-    def __init__(self, fobj: BufferedReader):
+class ViceSnapshotFile:     # pylint: disable=too-many-instance-attributes
+    """VICE Snapshot.
+
+    When modules are given, the file is read only until all of them are found
+    (the remaining modules are neither read nor decompressed). Optional
+    modules are kept when found before that, the scan does not wait for them.
+    With all_headers the whole module table is read, payloads of modules not
+    given are skipped (seek, compressed streams are decompressed and
+    discarded).
+    """
+
+    def __init__(self, fobj: BufferedReader,
+                 modules: Optional[Iterable[ModuleName]] = None,
+                 optional: Iterable[ModuleName] = (), all_headers: bool = False):
         self.fobj = fobj
-        fobj.seek(0)
-
-        self.magic = fobj.read(len(VSF_MAGIC))
-        if self.magic != VSF_MAGIC:
-            raise VSFError('file is not a VSF snapshot - invalid magic')
-
-        self.major, self.minor, self.machine = unpack('<BB16s', fobj.read(18))
-        if len(self.machine) != 16:
-            raise VSFError('unexpected end of file')
-        self.machine = self.machine.rstrip(b'\x00')
-
-        version_magic = fobj.read(len(VICE_VERSION_MAGIC))
-        if version_magic == VICE_VERSION_MAGIC:
-            self.vice_version = unpack('<4B', fobj.read(4))
-            self.vice_revision = unpack('<L', fobj.read(4))[0]
-        else:
-            print('Pre VICE 2.4.30 snapshot')
-            fobj.seek(-len(VICE_VERSION_MAGIC), 1)
-            self.vice_version = (0, 0, 0, 0)
-            self.vice_revision = 0
-
-        machine = self.machine.decode()
-        print(f'VSF Snapshot version {self.version()}, machine {machine}', end='')
-        if self.major > 1:
-            print(', VICE version', '.'.join(str(_) for _ in self.vice_version),
-                  'rev.', self.vice_revision, end='')
-        print()
-
-        # Read all modules.
-        self.modules = []
-        try:
-            while True:
-                # Check for EOF.
-                pos = fobj.tell()
-                if fobj.read(1) == b'':
-                    break
-                fobj.seek(pos)
-
-                # Read next module.
-                mod = VSFModule.from_file(fobj)
-                self.modules.append(mod)
-        except EOFError:
-            pass        # XXX: fix it.
+        with instrument.stage('parse'):
+            if fobj.tell() != 0:
+                fobj.seek(0)
+
+            self.magic = fobj.read(len(VSF_MAGIC))
+            if self.magic != VSF_MAGIC:
+                raise VSFError('file is not a VSF snapshot - invalid magic')
+
+            self.major, self.minor, self.machine = unpack('<BB16s', fobj.read(18))
+            if len(self.machine) != 16:
+                raise VSFError('unexpected end of file')
+            self.machine = self.machine.rstrip(b'\x00')
+
+            version_magic = fileutils.peek(fobj, len(VICE_VERSION_MAGIC))
+            if version_magic == VICE_VERSION_MAGIC:
+                fobj.seek(len(VICE_VERSION_MAGIC), 1)
+                self.vice_version = unpack('<4B', fobj.read(4))
+                self.vice_revision = unpack('<L', fobj.read(4))[0]
+            else:
+                # Pre VICE 2.4.30 snapshot.
+                self.vice_version = (0, 0, 0, 0)
+                self.vice_revision = 0
+
+            # Uncompressed files are memory mapped, module payloads are views into
+            # the mapping. Compressed streams fall back to reading payloads.
+            mapping = fileutils.map_file(fobj)
+            self._buffer = memoryview(mapping) if mapping is not None else None
+
+            wanted = None if modules is None else {_module_magic(_) for _ in modules}
+
+            # Compressed streams cannot seek back without decompressing them again
+            # from the start, so payloads of wanted (or known) modules are kept
+            # while scanning.
+            keep: Iterable[bytes] = ()
+            compressed = self._buffer is None
+            if compressed:
+                keep = wanted | {_module_magic(_) for _ in optional} if wanted is not None \
+                    else tuple(_.value for _ in Module)
+
+            # Build module table (headers only, payloads are loaded on demand).
+            self.index: dict[bytes, VSFModuleHeader] = {}
+            self._loaded: dict[bytes, VSFModule] = {}
+            self.truncated = False      # Last module runs past the end of file (not indexed).
+            self.complete = False       # Module table covers the whole file.
+            try:
+                # Note: peek() does not move the file position (no rewind).
+                while fileutils.peek(fobj, 1) != b'':
+                    if wanted is not None and not all_headers and wanted.issubset(self.index):
+                        break
+                    self._scan_module(fobj, keep, compressed)
+                else:
+                    self.complete = True
+            except EOFError:
+                self.truncated = True
+
+    def _scan_module(self, fobj: BufferedReader, keep: Iterable[bytes], compressed: bool) -> None:
+        """Read module header, index the module and load or skip its payload.
+
+        Raises EOFError when the module runs past the end of file.
+        """
+        hdr = VSFModuleHeader.from_file(fobj)
+        end = hdr.start_pos + hdr.size
+        # Note: seek past the end of a plain file does not fail.
+        if self._buffer is not None and end > len(self._buffer):
+            raise EOFError(f'unexpected end of file in module {hdr.magic.decode()}')
+        # Note: payloads of compressed streams are decompressed, even skipped ones.
+        with instrument.stage('decompress', hdr.payload_size, compressed):
+            # Note: first module with given name wins.
+            if hdr.magic in keep and hdr.magic not in self.index:
+                try:
+                    self._loaded[hdr.magic] = VSFModule.from_header(fobj, hdr)
+                except VSFError as err:
+                    raise EOFError(str(err)) from err
+            else:
+                fobj.seek(hdr.payload_size, 1)
+                if fobj.tell() != end:
+                    raise EOFError(f'unexpected end of file in module {hdr.magic.decode()}')
+        self.index.setdefault(hdr.magic, hdr)
 
     def basename(self) -> str:
         """Return base file name (without an extension)."""
-        loname = self.fobj.name.lower()
-        name = self.fobj.name
-        # XXX: dirty hack.
-        if loname.endswith('.bz2') or loname.endswith('.gz'):
-            name = name.partition('.')[0]
+        name = Path(self.fobj.name).name
+        # Strip compression suffix.
+        if name.lower().endswith(('.bz2', '.gz', '.xz')):
+            name = name.rpartition('.')[0]
         return Path(name).stem
 
     def dirname(self) -> Path:
@@ -109,25 +161,58 @@ class ViceSnapshotFile:     # pylint: disable=too-many-instance-attributes
         """Version number."""
         return f'{self.major}.{self.minor}'
 
+    def has_module(self, name: ModuleName) -> bool:
+        """Return True if snapshot contains the module."""
+        return _module_magic(name) in self.index
+
+    def module(self, name: ModuleName) -> VSFModule:
+        """Return module (payload is read on first access)."""
+        magic = _module_magic(name)
+        mod = self._loaded.get(magic)
+        if mod is None:
+            hdr = self.index.get(magic)
+            if hdr is None:
+                if self.truncated:
+                    raise KeyError(f'{magic.decode()} module not found (truncated snapshot)')
+                scanned = '' if self.complete else ' (in scanned part of file)'
+                raise KeyError(f'{magic.decode()} module not found{scanned}')
+            if self._buffer is not None:
+                mod = VSFModule.from_buffer(self._buffer, hdr)
+            else:
+                mod = VSFModule.from_header(self.fobj, hdr)
+            self._loaded[magic] = mod
+        return mod
+
+    @property
+    def modules(self) -> list[VSFModuleHeader]:
+        """Module headers in file order."""
+        return sorted(self.index.values(), key=lambda _: _.start_pos)
+
     def cia2(self) -> CIA2:
         """CIA2."""
-        for mod in self.modules:
-            if mod.magic == Module.CIA2.value:
-                return CIA2(mod)
-        raise KeyError('CIA2 module not found')
+        return CIA2(self.module(Module.CIA2))
 
     def c64mem(self) -> C64Mem:
         """C64 memory."""
-        for mod in self.modules:
-            if mod.magic == Module.C64MEM.value:
-                return C64Mem(mod)
-        raise KeyError('C64MEM module not found')
+        return C64Mem(self.module(Module.C64MEM))
+
+    def c64rom(self) -> Optional[C64Rom]:
+        """C64 ROM (None if the snapshot has no ROM module)."""
+        if not self.has_module(Module.C64ROM):
+            return None
+        return C64Rom(self.module(Module.C64ROM))
 
     def vic2(self) -> VIC2:
         """VIC2."""
-        for mod in self.modules:
-            if mod.magic == Module.VIC2.value:
-                return VIC2(mod)
-        raise KeyError('VIC2 module not found')
+        return VIC2(self.module(Module.VIC2))
+
+
+def _module_magic(name: ModuleName) -> bytes:
+    """Return module magic for module name."""
+    if isinstance(name, Module):
+        return name.value
+    if isinstance(name, str):
+        return name.encode()
+    return name
 
 # vim: set sts=4 et sw=4:
@@ -5,35 +5,21 @@
 # https://www.c64-wiki.com/wiki/Page_208-211
 # https://sta.c64.org/cbm64mem.html
 
-from .generic import VSFModule
+from .generic import ModuleWrapper, VSFModule
 
-_C64MEM_MAGIC = b'C64MEM'
 
-
-class C64Mem:
+class C64Mem(ModuleWrapper):
     """C64 Memory module."""
 
+    MAGIC = b'C64MEM'
+
     def __init__(self, mod: VSFModule):
-        assert mod.magic == _C64MEM_MAGIC
-        self.mod = mod
-        self._memory = self.mod.payload[4:4 + 65536]
-        assert len(self._memory) == 65536
+        super().__init__(mod)
+        self._memory = self._view(self.payload, 4, 65536)
 
     def ram(self, start_addr: int, size: int) -> memoryview:
         """C64 RAM $0000 … $ffff."""
-        result = self._memory[start_addr:start_addr + size]
-        assert len(result) == size
-        return result
-
-    def version(self) -> str:
-        """Return version string."""
-        return self.mod.version()
-
-    def __str__(self) -> str:
-        return ', '.join([
-            f'{self.__class__.__name__}(start=0x{self.mod.start_pos:x}, size={self.mod.size:_}',
-            f'ver={self.mod.version()})'
-        ])
+        return self._view(self._memory, start_addr, size)
 
 
 # vim: set sts=4 et sw=4:
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""C64 ROM module."""
+
+# Saved by VICE with "save ROMs" snapshot option only.
+
+from .generic import ModuleWrapper, VSFModule
+
+# Payload: config byte, KERNAL, BASIC and character ROM.
+KERNAL_SIZE = 8192
+BASIC_SIZE = 8192
+CHARGEN_SIZE = 4096
+
+
+class C64Rom(ModuleWrapper):
+    """C64 ROM module."""
+
+    MAGIC = b'C64ROM'
+
+    def __init__(self, mod: VSFModule):
+        super().__init__(mod)
+        self._chargen = self._view(self.payload, 1 + KERNAL_SIZE + BASIC_SIZE, CHARGEN_SIZE)
+
+    def chargen(self, start_addr: int, size: int) -> memoryview:
+        """Character ROM $0000 … $0fff."""
+        return self._view(self._chargen, start_addr, size)
+
+
+# vim: set sts=4 et sw=4:
@@ -2,18 +2,58 @@
 
 from dataclasses import dataclass
 from io import BufferedReader
-from struct import unpack
+from struct import error as StructError, unpack
 
 
 class VSFError(Exception):
     """VSF Error."""
 
 
+HEADER_SIZE = 22
+
+
+@dataclass(frozen=True)
+class VSFModuleHeader:
+    """VSF Module header (module table entry)."""
+
+    start_pos: int
+    magic: bytes
+    major: int
+    minor: int
+    size: int
+
+    @staticmethod
+    def from_file(fobj: BufferedReader) -> 'VSFModuleHeader':
+        """Read module header (the file is left at the module payload)."""
+        start_pos = fobj.tell()
+        try:
+            magic, major, minor, mod_size = unpack('<16sBBL', fobj.read(HEADER_SIZE))
+        except StructError:
+            raise EOFError('unexpected end of file')    # pylint: disable=raise-missing-from
+        if mod_size < HEADER_SIZE:
+            raise VSFError('unexpected end of file')
+        return VSFModuleHeader(start_pos, magic.rstrip(b'\x00'), major, minor, mod_size)
+
+    @property
+    def payload_pos(self) -> int:
+        """Payload offset in the snapshot file."""
+        return self.start_pos + HEADER_SIZE
+
+    @property
+    def payload_size(self) -> int:
+        """Payload size."""
+        return self.size - HEADER_SIZE
+
+    def version(self) -> str:
+        """Module version."""
+        return f'{self.major}.{self.minor}'
+
+
 @dataclass
 class VSFModule:
     """VSF Module."""
 
-    HEADER_SIZE = 22
+    HEADER_SIZE = HEADER_SIZE
 
     start_pos: int
     magic: bytes
@@ -34,6 +74,26 @@ class VSFModule:
         payload = memoryview(fobj.read(mod_size - VSFModule.HEADER_SIZE))
         return VSFModule(start_pos, magic, major, minor, mod_size, payload)
 
+    @staticmethod
+    def from_header(fobj: BufferedReader, header: VSFModuleHeader) -> 'VSFModule':
+        """Load module payload described by the module header."""
+        if fobj.tell() != header.payload_pos:
+            fobj.seek(header.payload_pos)
+        payload = memoryview(fobj.read(header.payload_size))
+        if len(payload) != header.payload_size:
+            raise VSFError(f'unexpected end of file in module {header.magic.decode()}')
+        return VSFModule(header.start_pos, header.magic, header.major, header.minor,
+                         header.size, payload)
+
+    @staticmethod
+    def from_buffer(buf: memoryview, header: VSFModuleHeader) -> 'VSFModule':
+        """Create module with payload viewing into buffer (no copy)."""
+        payload = buf[header.payload_pos:header.payload_pos + header.payload_size]
+        if len(payload) != header.payload_size:
+            raise VSFError(f'unexpected end of file in module {header.magic.decode()}')
+        return VSFModule(header.start_pos, header.magic, header.major, header.minor,
+                         header.size, payload)
+
     def info(self) -> None:
         """Print module info."""
         magic = self.magic.rstrip(b'\x00').decode()
@@ -54,4 +114,33 @@ class VSFModule:
         ))
 
 
+class ModuleWrapper:
+    """Base of snapshot module wrappers (C64Mem, C64Rom, CIA2 and VIC2)."""
+
+    # Module magic (checked when set).
+    MAGIC = b''
+
+    def __init__(self, mod: VSFModule):
+        assert not self.MAGIC or mod.magic == self.MAGIC
+        self.mod = mod
+        self.payload = mod.payload
+
+    @staticmethod
+    def _view(data: memoryview, start: int, size: int) -> memoryview:
+        """Return size bytes of data at start."""
+        result = data[start:start + size]
+        assert len(result) == size
+        return result
+
+    def version(self) -> str:
+        """Return module version."""
+        return self.mod.version()
+
+    def __str__(self) -> str:
+        return ', '.join([
+            f'{self.__class__.__name__}(start=0x{self.mod.start_pos:x}, size={self.mod.size:_}',
+            f'ver={self.mod.version()})'
+        ])
+
+
 # vim: set sts=4 et sw=4:
@@ -5,10 +5,13 @@
 # https://www.c64-wiki.com/wiki/Page_208-211
 # https://sta.c64.org/cbm64mem.html
 
+from array import array
 from dataclasses import dataclass
 from enum import Enum
+from struct import unpack
+from typing import Optional, Union
 
-from .generic import VSFModule
+from .generic import ModuleWrapper, VSFError, VSFModule
 
 
 COLOR_NAME = (
@@ -19,7 +22,24 @@ COLOR_NAME = (
 )
 
 
-VIC_REG_OFFSET = 1119
+@dataclass(frozen=True)
+class Layout:
+    """VIC-II module payload layout (offsets)."""
+    color_ram: int      # Color RAM (1024 bytes).
+    ram_base: int       # VIC-II RAM base (dword).
+    registers: int      # Registers $d000-$d03f (64 bytes).
+
+
+# Payload layouts by the first module version (major, minor) using them. A module
+# uses the layout of the newest version up to its own with the same major version.
+# Note: x64 and x64sc modules have the same fields up to the registers, x64sc adds
+# its cycle exact state after them.
+LAYOUTS = {
+    (1, 0): Layout(color_ram=43, ram_base=1112, registers=1119),
+}
+
+# Registers $d000-$d03f.
+REGISTERS_FORMAT = '64B'
 
 
 class GraphicsMode(Enum):
@@ -45,6 +65,14 @@ class GraphicsMode(Enum):
         """Return True if graphics mode is multicolor bitmap."""
         return bool(self.value == GraphicsMode.MULTICOLOR.value)
 
+    def is_multicolor_character(self) -> bool:
+        """Return True if graphics mode is multicolor character."""
+        return bool(self.value == GraphicsMode.CHAR_MULTI.value)
+
+    def is_extended_background(self) -> bool:
+        """Return True if graphics mode is extended background color character."""
+        return bool(self.value == GraphicsMode.EXT_BGCOL.value)
+
     def __str__(self) -> str:
         if self.value == GraphicsMode.CHAR_STD.value:
             return 'standard character'
@@ -73,6 +101,7 @@ class Sprite:           # pylint: disable=too-many-instance-attributes
     color11: int
     xexp: bool
     yexp: bool
+    behind: bool = False    # Behind screen foreground ($d01b).
 
     @property
     def exp(self) -> str:
@@ -87,226 +116,165 @@ class Sprite:           # pylint: disable=too-many-instance-attributes
         return self.color10
 
 
-class VIC2:
-    """VIC-II snapshot module."""
+class SpriteTable:      # pylint: disable=too-many-instance-attributes
+    """Sprite registers of all 8 sprites (arrays indexed by sprite number)."""
 
-    def __init__(self, mod: VSFModule):
-        self.mod = mod
-        self.payload = mod.payload
-        print('RAM base:', list(self.payload[1112:1112+4]))
-
-    def __getattr__(self, name: str) -> int:
-        reg = -1
-        try:
-            reg = int(name, 16) - 0xd000
-        except ValueError:
-            pass
-        # if len(name) != 4 or not name.startswith('d'):
-        if reg < 0x00 or reg >= 0x3f:
-            raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'.")
-        return self.payload[1119 + reg]
+    __slots__ = ('posx', 'posy', 'color', 'enabled', 'multicolor', 'xexp', 'yexp', 'behind',
+                 'color01', 'color11')
 
-    def color_ram(self) -> memoryview:
-        """Return Color RAM."""
-        return self.payload[43:43 + 1000]
-
-    def getreg(self, num: int) -> int:
-        """Return register value."""
-        if num >= 0xd000:
-            num -= 0xd000
-        if num < 0 or num >= 0xff:      # FIXME TODO - max reg.
-            raise ValueError(f'Invalid VIC-II register {num}')
-        return self.payload[VIC_REG_OFFSET + num]
-
-    def graphics_mode(self) -> GraphicsMode:
-        """Return graphics mode."""
-        ecm = (self.getreg(0xd011) & 0b0100_0000) >> 4
-        bmm = (self.getreg(0xd011) & 0b0010_0000) >> 4
-        mcm = (self.getreg(0xd016) & 0b0001_0000) >> 4
-        num_mode = ecm | bmm | mcm
-        return GraphicsMode(num_mode)
+    def __init__(self, regs: tuple[int, ...]) -> None:
+        msb = regs[0x10]
+        self.posx = array('H', (regs[2 * _] | ((msb >> _) & 1) << 8 for _ in range(8)))
+        self.posy = array('B', regs[1:16:2])
+        self.color = array('B', (_ & 0x0f for _ in regs[0x27:0x2f]))
+        # Bit masks (bit n = sprite n).
+        self.enabled = regs[0x15]
+        self.multicolor = regs[0x1c]
+        self.xexp = regs[0x1d]
+        self.yexp = regs[0x17]
+        self.behind = regs[0x1b]
+        self.color01 = regs[0x25] & 0x0f
+        self.color11 = regs[0x26] & 0x0f
 
     def sprite(self, num: int) -> Sprite:
-        """@@@"""
+        """Return sprite attributes."""
         if not 0 <= num <= 7:
             raise ValueError(f'Invalid sprite number {num}')
-        status = (self.getreg(0xd015) & (1 << num)) != 0
-        highx = 0x100 if (self.getreg(0xd010) & (1 << num)) != 0 else 0
-        posx = highx + self.getreg(0xd000 + 2 * num + 0)
-        posy = self.getreg(0xd000 + 2 * num + 1)
-        multicolor = (self.getreg(0xd01c) & (1 << num)) != 0
-        color01 = self.getreg(0xd025)
-        color10 = self.getreg(0xd027 + num) & 0x0f
-        color11 = self.getreg(0xd026)
-        xexp = (self.getreg(0xd01d) & (1 << num)) != 0
-        yexp = (self.getreg(0xd017) & (1 << num)) != 0
-        return Sprite(num, status, posx, posy, multicolor, color01, color10, color11,
-                      xexp=xexp, yexp=yexp)
-
-    @property
-    def d011(self) -> int:
-        """Control Register 1 ($d011).
-
-        %xxxxxx11 -> bank0: $0000-$3fff
-        %xxxxxx11 -> bank1: $4000-$7fff
-        %xxxxxx11 -> bank2: $8000-$bfff
-        %xxxxxx11 -> bank3: $c000-$ffff
-        """
-        return self.getreg(0xd011)
-
-    @property
-    def d015(self) -> int:
-        """Sprite Enable Register ($d015)."""
-        return self.getreg(0xd015)
-
-    @property
-    def d016(self) -> int:
-        """Control Register 2 ($d016)."""
-        return self.getreg(0xd016)
-
-    @property
-    def d018(self) -> int:
-        """Memory Control Register ($d018)."""
-        return self.getreg(0xd018)
-
-    @property
-    def d020(self) -> int:
-        """Border Color Register ($d020)."""
-        return self.getreg(0xd020) & 0x0f
-
-    @property
-    def d021(self) -> int:
-        """Background Color Register ($d021)."""
-        return self.getreg(0xd021) & 0x0f
-
-    @property
-    def d025(self) -> int:
-        """Sprite extra color 1 0b01 ($d025)."""
-        return self.getreg(0xd025) & 0x0f
-
-    @property
-    def d026(self) -> int:
-        """Sprite extra color 2 0b11 ($d026)."""
-        return self.getreg(0xd026) & 0x0f
-
-    @property
-    def background_color(self) -> int:
-        """Background color ($d021)."""
-        return self.d021
-
-    @property
-    def border_color(self) -> int:
-        """Border color ($d020)."""
-        return self.d020
-
-    @property
-    def memory_setup_register(self) -> int:
-        """Memory setup register ($d018)."""
-        return self.d018
-
-    def has_active_sprites(self) -> bool:
-        """Return True if at least one sprite is active."""
-        return self.d015 != 0x00
-
-    def info(self, dd00: int) -> None:
-        """@@@"""
-        def reginfo(name: str, value: int, desc: str) -> None:
-            """Print register info."""
-            print(f'   ${name} = ${value:02x} (%{value:08b})  {desc}')
-
-        print('VIC-II Registers:')
-        reginfo('d011', self.d011, 'Screen Control Register 1')
-        reginfo('d012', self.d012, 'Current Raster Line')
+        bit = 1 << num
+        return Sprite(num, bool(self.enabled & bit), self.posx[num], self.posy[num],
+                      bool(self.multicolor & bit), self.color01, self.color[num], self.color11,
+                      xexp=bool(self.xexp & bit), yexp=bool(self.yexp & bit),
+                      behind=bool(self.behind & bit))
+
+    def active(self) -> list[int]:
+        """Return numbers of enabled sprites."""
+        return [_ for _ in range(8) if self.enabled & (1 << _)]
+
+
+class RegisterFile:     # pylint: disable=too-many-instance-attributes
+    """VIC-II registers $d000-$d03f, decoded once, with derived fields."""
+
+    __slots__ = ('values', 'mode', 'bank', 'bitmap_addr', 'screen_addr', 'font_addr',
+                 'border', 'background', 'extra_colors', 'sprites')
+
+    def __init__(self, data: Union[bytes, memoryview], bank: int) -> None:
+        self.values: tuple[int, ...] = unpack(REGISTERS_FORMAT, data)
+        d011, d016, d018 = self.values[0x11], self.values[0x16], self.values[0x18]
+        # ECM, BMM ($d011 bits 6, 5) and MCM ($d016 bit 4).
+        self.mode = GraphicsMode((d011 & 0b0110_0000) >> 4 | (d016 & 0b0001_0000) >> 4)
+        self.bank = bank
+        self.bitmap_addr = bank + 8192 * ((d018 >> 3) & 1)
+        self.screen_addr = bank + 1024 * (d018 >> 4)
+        self.font_addr = bank + 2048 * ((d018 >> 1) & 0b111)
+        self.border = self.values[0x20] & 0x0f
+        self.background = self.values[0x21] & 0x0f
+        # $d022, $d023, $d024.
+        self.extra_colors = tuple(_ & 0x0f for _ in self.values[0x22:0x25])
+        self.sprites = SpriteTable(self.values)
+
+    def __getitem__(self, num: int) -> int:
+        """Return register value (register $d000-$d03f or offset 0-63)."""
+        return self.values[num - 0xd000 if num >= 0xd000 else num]
+
+    def describe(self) -> list[str]:
+        """Return registers, sprites and graphics mode info lines."""
+        lines = ['VIC-II Registers:']
+
+        def reginfo(num: int, desc: str) -> None:
+            """Add register info."""
+            value = self[num]
+            lines.append(f'   ${num:04x} = ${value:02x} (%{value:08b})  {desc}')
+
+        reginfo(0xd011, 'Screen Control Register 1')
+        reginfo(0xd012, 'Current Raster Line')
         # d013, d014 - light pen x and y coord.
-        reginfo('d015', self.d015, 'Sprite Enable')
-        reginfo('d016', self.d016, 'Screen Control Register 2')
-        reginfo('d017', self.d017, 'Sprite Double Height')
-        reginfo('d018', self.d018, 'Memory Setup Register')
+        reginfo(0xd015, 'Sprite Enable')
+        reginfo(0xd016, 'Screen Control Register 2')
+        reginfo(0xd017, 'Sprite Double Height')
+        reginfo(0xd018, 'Memory Setup Register')
         # d019 - Interrupt status.
         # d01a - Interrupt control.
-        reginfo('d01b', self.d01b, 'Sprite Priority')
-        reginfo('d01c', self.d01c, 'Sprite Color Mode')
-        reginfo('d01d', self.d01d, 'Sprite Double Width')
-        reginfo('d01e', self.d01e, 'Sprite-Sprite Collision')
-        reginfo('d01f', self.d01f, 'Sprite-Background Collision')
-        reginfo('d020', self.d020,
-                f'Border Color -- {COLOR_NAME[self.d020 & 0x0f]}')
-        reginfo('d021', self.d021,
-                f'Background Color -- {COLOR_NAME[self.d021 & 0x0f]}')
-        reginfo('d022', self.d022,
-                f'Extra Background Color #1 -- {COLOR_NAME[self.d022 & 0x0f]}')
-        reginfo('d023', self.d023,
-                f'Extra Background Color #2 -- {COLOR_NAME[self.d023 & 0x0f]}')
-        reginfo('d024', self.d024,
-                f'Extra Background Color #3 -- {COLOR_NAME[self.d024 & 0x0f]}')
-        reginfo('d025', self.d025,
-                f'Sprite Extra Color #1 (%01) -- {COLOR_NAME[self.d025 & 0x0f]}')
-        reginfo('d026', self.d026,
-                f'Sprite Extra Color #2 (%11) -- {COLOR_NAME[self.d026 & 0x0f]}')
-
-        vic_bank_addr = 0xc000 - 0x4000 * (dd00 & 0b0000_0011)
-
-        print('Sprites:')
-        # XXX print('   Multicolor %01 :', self.getreg(0xd025))
-        # XXX print('   Multicolor %11 :', self.getreg(0xd026))
+        reginfo(0xd01b, 'Sprite Priority')
+        reginfo(0xd01c, 'Sprite Color Mode')
+        reginfo(0xd01d, 'Sprite Double Width')
+        reginfo(0xd01e, 'Sprite-Sprite Collision')
+        reginfo(0xd01f, 'Sprite-Background Collision')
+        reginfo(0xd020, f'Border Color -- {COLOR_NAME[self.border]}')
+        reginfo(0xd021, f'Background Color -- {COLOR_NAME[self.background]}')
+        for num, color in enumerate(self.extra_colors):
+            reginfo(0xd022 + num, f'Extra Background Color #{num + 1} -- {COLOR_NAME[color]}')
+        reginfo(0xd025, f'Sprite Extra Color #1 (%01) -- {COLOR_NAME[self.sprites.color01]}')
+        reginfo(0xd026, f'Sprite Extra Color #2 (%11) -- {COLOR_NAME[self.sprites.color11]}')
+
+        lines.append('Sprites:')
         for num in range(8):
-            sprite = self.sprite(num)
+            sprite = self.sprites.sprite(num)
             status = 'on' if sprite.status else 'off'
             multi = 'yes' if sprite.multicolor else 'no'
             if sprite.multicolor:
                 colorstr = f'%01={sprite.color01:2} %10={sprite.color10:2} %11={sprite.color11:2}'
             else:
                 colorstr = f'fg={sprite.fgcolor}'
-            print((
+            lines.append((
                 f'   Sprite {sprite.num} : {status:3}  ({sprite.posx:>3},{sprite.posy:>3})'
                 f'  {sprite.exp}'
                 f'  multi={multi:3}  {colorstr}'
             ))
 
-        gfx_mode = self.graphics_mode()
-
-        print('Graphics:')
-        print('   Mode . . . . . . :', gfx_mode)
-        print(f'   VIC bank address : ${vic_bank_addr:04x} ({vic_bank_addr})')
-        if gfx_mode in (GraphicsMode.BITMAP, GraphicsMode.MULTICOLOR):
-            bitmap_addr = vic_bank_addr + 8192 * ((self.d018 >> 3) & 1)
-            screen_addr = vic_bank_addr + 1024 * (self.d018 >> 4)
-            print(f'   Bitmap address . : ${bitmap_addr:04x} ({bitmap_addr})')
-            print(f'   Screen address . : ${screen_addr:04x} ({screen_addr})')
+        lines.append('Graphics:')
+        lines.append(f'   Mode . . . . . . : {self.mode}')
+        lines.append(f'   VIC bank address : ${self.bank:04x} ({self.bank})')
+        if self.mode in (GraphicsMode.BITMAP, GraphicsMode.MULTICOLOR):
+            lines.append(f'   Bitmap address . : ${self.bitmap_addr:04x} ({self.bitmap_addr})')
+            lines.append(f'   Screen address . : ${self.screen_addr:04x} ({self.screen_addr})')
         else:
-            font_addr = vic_bank_addr + 2048 * ((self.d018 >> 1) & 0b111)
-            screen_addr = vic_bank_addr + 1024 * (self.d018 >> 4)
-            print(f'   Font address . . : ${font_addr:04x} ({font_addr})')
-            print(f'   Screen address . : ${screen_addr:04x} ({screen_addr})')
-
-            # https://www.c64-wiki.com/wiki/VIC_bank
-            rom_font = font_addr in (0x1000, 0x1800, 0x9000, 0x9800)
-            # rom_font = True
-            # if vic_bank_addr in (0x4000, 0xc000):
-            #    rom_font = False
-            print('   ROM font . . . . :', rom_font)
-
-            # 47c81fcda8e30feb67b7b3a04beaa5fa2baee126
-            # 410b520d7938790602dce07bb9ce8ef4412dcff7
-            # adc7c31e18c7c7413d54802ef2f4193da14711aa
-
-            # XXX:
-            # font_sum = new('sha1', self.mem.ram(font_addr, 4096)).hexdigest(); print(font_sum)
-            # font_sum = new('sha1', self.mem.ram(font_addr, 2048)).hexdigest(); print(font_sum)
-            # font_sum = new('sha1', self.mem.ram(font_addr + 2048, 2048)).hexdigest()
-            # print(font_sum)
-            # font_sum = blake2b(self.mem.ram(font_addr, 4096)).hexdigest(); print(font_sum)
-            # font_sum = blake2s(self.mem.ram(font_addr, 4096)).hexdigest(); print(font_sum)
-
-    def version(self) -> str:
-        """Return module version."""
-        return self.mod.version()
+            lines.append(f'   Font address . . : ${self.font_addr:04x} ({self.font_addr})')
+            lines.append(f'   Screen address . : ${self.screen_addr:04x} ({self.screen_addr})')
+            lines.append(f'   ROM font . . . . : {self.is_rom_font()}')
+            # Note: font hash is added by X64 (font is in C64MEM or C64ROM).
+        return lines
 
-    def __str__(self) -> str:
-        return ', '.join([
-            f'{self.__class__.__name__}(start=0x{self.mod.start_pos:x}, size={self.mod.size:_}',
-            f'ver={self.mod.version()})'
-        ])
+    def is_rom_font(self) -> bool:
+        """Return True if VIC-II reads the character set from character ROM."""
+        # https://www.c64-wiki.com/wiki/VIC_bank
+        return self.font_addr in (0x1000, 0x1800, 0x9000, 0x9800)
+
+
+def find_layout(major: int, minor: int) -> Optional[Layout]:
+    """Return payload layout of module version (None if the major version is unknown)."""
+    versions = [_ for _ in LAYOUTS if _[0] == major and _ <= (major, minor)]
+    return LAYOUTS[max(versions)] if versions else None
+
+
+class VIC2(ModuleWrapper):
+    """VIC-II snapshot module."""
+
+    def __init__(self, mod: VSFModule):
+        super().__init__(mod)
+        layout = find_layout(mod.major, mod.minor)
+        self.warnings: list[str] = []
+        if layout is None:
+            newest = max(LAYOUTS)
+            layout = LAYOUTS[newest]
+            self.warnings.append(f'unknown VIC-II module version {mod.version()},'
+                                 f' using version {newest[0]}.{newest[1]} layout')
+        self.layout = layout
+
+    def color_ram(self) -> memoryview:
+        """Return Color RAM."""
+        return self.payload[self.layout.color_ram:self.layout.color_ram + 1000]
+
+    def ram_base(self) -> int:
+        """Return VIC-II RAM base."""
+        return int.from_bytes(self.payload[self.layout.ram_base:self.layout.ram_base + 4],
+                              'little')
+
+    def registers(self, bank: int) -> RegisterFile:
+        """Return registers of VIC-II reading VIC bank at address bank."""
+        data = self.payload[self.layout.registers:self.layout.registers + 64]
+        if len(data) != 64:
+            raise VSFError(f'VIC-II module too short ({len(self.payload)} bytes)')
+        return RegisterFile(data, bank)
 
 
 # vim: set sts=4 et sw=4:
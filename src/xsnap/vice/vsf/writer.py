@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""VSF snapshot writer.
+
+Serializes the snapshot header, the optional VICE Version block and modules
+(C64MEM, CIA2, VIC-II and modules of any other name, e.g. fillers). Only the
+parts of module payloads read by xsnap are meaningful, the rest is zeroed.
+"""
+
+from struct import pack
+from typing import Iterable, Optional
+
+from . import VICE_VERSION_MAGIC, VSF_MAGIC, Machine, Module, ModuleName, _module_magic
+from .generic import HEADER_SIZE, VSFError
+from .vic2 import LAYOUTS, Layout
+
+# Snapshot format version.
+VSF_VERSION = (2, 0)
+
+# VICE version of the VICE Version block.
+VICE_VERSION = (3, 7, 1, 0)
+
+# Module versions (major, minor) as saved by VICE 3.7.
+C64MEM_VERSION = (0, 1)
+CIA2_VERSION = (2, 2)
+VIC2_VERSION = (1, 3)
+
+# CIA2 payload size (registers, timers, TOD and interrupt state).
+CIA2_SIZE = 32
+
+
+def pack_header(machine: bytes = Machine.C64.value,
+                vice_version: Optional[tuple[int, int, int, int]] = VICE_VERSION,
+                revision: int = 0, version: tuple[int, int] = VSF_VERSION) -> bytes:
+    """Return snapshot header (without the VICE Version block if vice_version is None)."""
+    if len(machine) > 16:
+        raise VSFError(f'machine name too long: {machine!r}')
+    header = VSF_MAGIC + pack('<BB16s', *version, machine)
+    if vice_version is not None:
+        header += VICE_VERSION_MAGIC + pack('<4BL', *vice_version, revision)
+    return header
+
+
+def pack_module(name: ModuleName, payload: bytes, major: int = 1, minor: int = 0) -> bytes:
+    """Return module (header and payload)."""
+    magic = _module_magic(name)
+    if len(magic) > 16:
+        raise VSFError(f'module name too long: {magic!r}')
+    return pack('<16sBBL', magic, major, minor, HEADER_SIZE + len(payload)) + payload
+
+
+def c64mem_module(ram: bytes, port_data: int = 0x37, port_dir: int = 0x2f,
+                  exrom: int = 0, game: int = 0) -> bytes:
+    """Return C64MEM module (CPU port, cartridge lines and 64 kB RAM)."""
+    if len(ram) != 65536:
+        raise ValueError(f'RAM size must be 65536 bytes, not {len(ram)}')
+    payload = bytes((port_data, port_dir, exrom, game)) + ram
+    return pack_module(Module.C64MEM, payload, *C64MEM_VERSION)
+
+
+def cia2_module(bank: int) -> bytes:
+    """Return CIA2 module selecting VIC bank at address bank ($dd00 bits 0-1)."""
+    if bank not in (0x0000, 0x4000, 0x8000, 0xc000):
+        raise ValueError(f'invalid VIC bank address: ${bank:04x}')
+    payload = bytearray(CIA2_SIZE)
+    payload[0] = 0b1001_0100 | (3 - bank // 0x4000)     # $dd00 (serial lines high).
+    payload[2] = 0b0011_1111                            # $dd02 (data direction).
+    return pack_module(Module.CIA2, bytes(payload), *CIA2_VERSION)
+
+
+def vic2_module(registers: bytes, color_ram: bytes, layout: Layout = LAYOUTS[(1, 0)]) -> bytes:
+    """Return VIC-II module (registers $d000-$d03f and color RAM, up to 1024 bytes)."""
+    if len(registers) != 64:
+        raise ValueError(f'VIC-II registers must be 64 bytes, not {len(registers)}')
+    if len(color_ram) > 1024:
+        raise ValueError(f'color RAM too long ({len(color_ram)} bytes)')
+    payload = bytearray(layout.registers + 64)
+    payload[layout.color_ram:layout.color_ram + len(color_ram)] = color_ram
+    payload[layout.registers:layout.registers + 64] = registers
+    return pack_module(Module.VIC2, bytes(payload), *VIC2_VERSION)
+
+
+def pack_snapshot(modules: Iterable[bytes], machine: bytes = Machine.C64.value,
+                  vice_version: Optional[tuple[int, int, int, int]] = VICE_VERSION,
+                  revision: int = 0) -> bytes:
+    """Return snapshot of packed modules (in given order)."""
+    return b''.join([pack_header(machine, vice_version, revision), *modules])
+
+
+# vim: set sts=4 et sw=4:
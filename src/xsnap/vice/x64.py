@@ -2,48 +2,59 @@
 
 # from pathlib import Path
 
-from .vsf import ViceSnapshotFile
-# from .vsf.vic2 import GraphicsMode
+from .vsf import Module, ViceSnapshotFile
+from .vsf.vic2 import GraphicsMode
+from ..imageformats.c64.render import Sprite, charset_id
 # from ..utils import log
 
 
 class X64:
     """X64."""
 
+    # Snapshot modules required for screenshot extraction.
+    MODULES = (Module.C64MEM, Module.CIA2, Module.VIC2)
+    # Used when present (VICE saves it before CIA2 and VIC-II modules).
+    OPTIONAL_MODULES = (Module.C64ROM,)
+
     def __init__(self, snap: ViceSnapshotFile):
         self.mem = snap.c64mem()
         self.cia2 = snap.cia2()
         self.vic2 = snap.vic2()
+        self.rom = snap.c64rom()
+        # Note: VIC-II registers are decoded once.
+        self.regs = self.vic2.registers(self.cia2.vic_bank_addr)
 
-    # XXX:
-    # def graphics_mode(self) -> GraphicsMode:
-    #     """Return active screen graphics mode."""
-    #     return self.vic2.graphics_mode()
+    def graphics_mode(self) -> GraphicsMode:
+        """Return active screen graphics mode."""
+        return self.regs.mode
 
     def has_active_sprites(self) -> bool:
         """Return True is the snapshot has active sprite(s)."""
-        return self.vic2.has_active_sprites()
+        return self.regs.sprites.enabled != 0x00
 
     def is_screen_hires(self) -> bool:
         """Return True if active screen is in hires mode."""
-        # return self.vic2.graphics_mode() == GraphicsMode.MULTICOLOR
-        return self.vic2.graphics_mode().is_hires_bitmap()
+        return self.regs.mode.is_hires_bitmap()
 
     def is_screen_multicolor(self) -> bool:
         """Return True if active screen is in multicolor mode."""
-        # return self.vic2.graphics_mode() == GraphicsMode.MULTICOLOR
-        return self.vic2.graphics_mode().is_multicolor_bitmap()
+        return self.regs.mode.is_multicolor_bitmap()
 
     def is_screen_text(self) -> bool:
         """Return True if active screen is in text mode."""
-        # return self.vic2.graphics_mode() == GraphicsMode.MULTICOLOR
-        return self.vic2.graphics_mode().is_standard_character()
+        return self.regs.mode.is_standard_character()
+
+    def is_screen_multitext(self) -> bool:
+        """Return True if active screen is in multicolor text mode."""
+        return self.regs.mode.is_multicolor_character()
+
+    def is_screen_ecmtext(self) -> bool:
+        """Return True if active screen is in extended background color text mode."""
+        return self.regs.mode.is_extended_background()
 
     def bitmap_ram(self) -> memoryview:
         """Return Bitmap RAM."""
-        bitmap_addr = self.cia2.vic_bank_addr + \
-            8192 * ((self.vic2.d018 >> 3) & 1)
-        return self.mem.ram(bitmap_addr, 8000)
+        return self.mem.ram(self.regs.bitmap_addr, 8000)
 
     def color_ram(self) -> memoryview:
         """Return Color RAM."""
@@ -51,35 +62,83 @@ class X64:
 
     def screen_ram(self) -> memoryview:
         """Return Screen RAM."""
-        screen_addr = self.cia2.vic_bank_addr + \
-            1024 * (self.vic2.d018 >> 4)
-        return self.mem.ram(screen_addr, 1000)
+        return self.mem.ram(self.regs.screen_addr, 1000)
+
+    def font_addr(self) -> int:
+        """Return character set address."""
+        return self.regs.font_addr
+
+    def is_rom_font(self) -> bool:
+        """Return True if VIC-II reads the character set from character ROM."""
+        return self.regs.is_rom_font()
+
+    def charset_ram(self) -> memoryview:
+        """Return character set RAM."""
+        return self.mem.ram(self.font_addr(), 2048)
+
+    def charset(self) -> bytes:
+        """Return active character set (empty if in ROM missing from snapshot)."""
+        if not self.is_rom_font():
+            return bytes(self.charset_ram())
+        if self.rom is None:
+            return b''
+        # $1000 / $9000 upper case, $1800 / $9800 lower case half of the ROM.
+        return bytes(self.rom.chargen(self.font_addr() & 0x0800, 2048))
+
+    def sprites(self) -> list[Sprite]:
+        """Return active sprites (sprite 0 first)."""
+        table = self.regs.sprites
+        # Sprite pointers are the last 8 bytes of screen RAM (+$3f8).
+        pointers = self.mem.ram(self.regs.screen_addr + 0x3f8, 8)
+        sprites = []
+        for num in table.active():
+            bit = 1 << num
+            sprites.append(Sprite(
+                data=bytes(self.mem.ram(self.regs.bank + 64 * pointers[num], 63)),
+                posx=table.posx[num],
+                posy=table.posy[num],
+                color=table.color[num],
+                multicolor=bool(table.multicolor & bit),
+                color01=table.color01,
+                color11=table.color11,
+                xexp=bool(table.xexp & bit),
+                yexp=bool(table.yexp & bit),
+                behind=bool(table.behind & bit)
+            ))
+        return sprites
 
     def background_color(self) -> bytes:
         """Return background color."""
-        return self.vic2.background_color.to_bytes(1)
+        return self.regs.background.to_bytes(1)
+
+    def extra_background_colors(self) -> list[bytes]:
+        """Return extra background colors ($d022, $d023, $d024)."""
+        return [_.to_bytes(1) for _ in self.regs.extra_colors]
 
     def border_color(self) -> bytes:
         """Return border color."""
-        return self.vic2.border_color.to_bytes(1)
+        return self.regs.border.to_bytes(1)
 
     def memory_setup_register(self) -> bytes:
         """Return memory setup register value ($d018)."""
-        return self.vic2.memory_setup_register.to_bytes(1)
-
-    def show_info(self) -> None:
-        """Show snapshot information."""
-        print('X64 snapshot modules:')
-        print('   Module C64MEM version', self.mem.version())
-        print('   Module CIA2   version', self.cia2.version())
-        print('   Module VIC2   version', self.vic2.version())
-        self.vic2.info(self.cia2.dd00)
-        # return
-        # print('CIA2 Registers:')
-        # print(f'   CIA2  : $dd00 = ${self.cia2.dd00:02x} (%{self.cia2.dd00:08b})')
-
-    #     else:
-    #         print('\033[93mW: No export formats defined for', mode, 'graphics mode\033[0m')
+        return self.regs[0xd018].to_bytes(1)
+
+    def describe(self) -> list[str]:
+        """Return snapshot information lines."""
+        lines = [
+            'X64 snapshot modules:',
+            f'   Module C64MEM version {self.mem.version()}',
+            f'   Module CIA2   version {self.cia2.version()}',
+            f'   Module VIC2   version {self.vic2.version()}'
+        ]
+        if self.rom is not None:
+            lines.append(f'   Module C64ROM version {self.rom.version()}')
+        lines += self.regs.describe()
+        if self.is_screen_text() or self.is_screen_multitext() or self.is_screen_ecmtext():
+            charset = self.charset()
+            lines.append('   Font hash  . . . : '
+                         + (charset_id(charset) if charset else 'not available'))
+        return lines
 
 
 # vim: set sts=4 et sw=4:
@@ -0,0 +1,56 @@
+"""Tests of batch processing in worker processes."""
+
+import os
+from pathlib import Path
+from typing import Optional
+
+from xsnap import batch
+
+
+def _extract(file: Path, _outdir: Optional[Path]) -> list[Path]:
+    """Return the file as written, fail on files named fail, exit on files named crash."""
+    if file.name == 'crash':
+        os._exit(1)         # pylint: disable=protected-access
+    if file.name == 'fail':
+        raise EOFError('truncated')
+    return [file]
+
+
+def make_files(tmp_path: Path, names: list[str]) -> list[Path]:
+    """Return files of increasing size."""
+    files = []
+    for num, name in enumerate(names):
+        file = tmp_path / f'{num:02}' / name
+        file.parent.mkdir()
+        file.write_bytes(bytes(100 * num))
+        files.append(file)
+    return files
+
+
+def test_parallel_input_order(tmp_path: Path) -> None:
+    """Results are returned in input order (largest files are scheduled first)."""
+    files = make_files(tmp_path, [f'snap{_}' for _ in range(12)])
+    results = list(batch.run_parallel(_extract, files, None, jobs=2, window=3))
+    assert [_.file for _ in results] == files
+    assert all(_.ok and _.outputs == [_.file] for _ in results)
+
+
+def test_parallel_error(tmp_path: Path) -> None:
+    """Error in a file is reported in its result only."""
+    files = make_files(tmp_path, ['a', 'fail', 'b'])
+    results = list(batch.run_parallel(_extract, files, None, jobs=2))
+    assert [_.ok for _ in results] == [True, False, True]
+    assert results[1].error == 'EOFError: truncated'
+
+
+def test_streamed_worker_crash(tmp_path: Path) -> None:
+    """Files in progress when a worker dies fail, the rest are processed by a new pool."""
+    files = make_files(tmp_path, ['a', 'b', 'crash'] + [f'snap{_}' for _ in range(8)])
+    results = list(batch.run_streamed(_extract, files, None, jobs=1, window=2))
+    assert [_.file for _ in results] == files
+    assert not results[2].ok
+    assert 'worker process failed' in results[2].error
+    assert all(_.ok for _ in results[4:])
+
+
+# vim: set sts=4 et sw=4:
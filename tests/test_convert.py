@@ -0,0 +1,39 @@
+"""Tests of image file conversion."""
+
+import random
+from pathlib import Path
+
+import pytest
+
+from xsnap import convert
+from xsnap.imageformats.c64 import multicolor
+
+
+@pytest.fixture(name='image')
+def fixture_image(tmp_path: Path) -> Path:
+    """Random multicolor image in Koala format."""
+    screen = multicolor.RandomMultiC64(random.Random(64)).data
+    path = tmp_path / 'image.koa'
+    path.write_bytes(convert.encode(screen, 'koa'))
+    return path
+
+
+def test_convert_file(image: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Written image is returned in the report, nothing is printed."""
+    report = convert.convert_file(image, None, 'drp')
+    dest = image.with_suffix('.drp')
+    assert report.paths() == [dest]
+    assert report.outputs[0].size == dest.stat().st_size
+    assert report.screen == 'multicolor' and not report.warnings
+    assert convert.decode(dest.read_bytes(), 'drp') == convert.decode(image.read_bytes(), 'koa')
+    assert capsys.readouterr().out == ''
+
+
+def test_same_format(image: Path) -> None:
+    """Image is not converted to its own format in place."""
+    report = convert.convert_file(image, None, 'koa')
+    assert not report.outputs
+    assert report.warnings == ['already in koa format']
+
+
+# vim: set sts=4 et sw=4:
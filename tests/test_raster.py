@@ -0,0 +1,80 @@
+"""Tests of PNG and PPM output of rendered frames."""
+
+import random
+import struct
+import zlib
+
+import pytest
+
+from xsnap.imageformats import raster
+from xsnap.imageformats.c64 import palettes, render
+from xsnap.imageformats.c64.scrtypes import HiresScreen
+from xsnap.imageformats.raster import Frame
+
+
+def decode_png(data: bytes) -> tuple[int, int, bytes, bytes]:
+    """Return width, height, palette and pixels of palette PNG (filter type 0 only)."""
+    assert data.startswith(raster.PNG_MAGIC)
+    pos = len(raster.PNG_MAGIC)
+    chunks: dict[bytes, bytes] = {}
+    while pos < len(data):
+        size, kind = struct.unpack('>L4s', data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + size]
+        assert struct.unpack('>L', data[pos + 8 + size:pos + 12 + size])[0] \
+            == zlib.crc32(kind + body)
+        chunks[kind] = chunks.get(kind, b'') + body
+        pos += 12 + size
+    assert list(chunks) == [b'IHDR', b'PLTE', b'IDAT', b'IEND']
+    width, height, depth, color_type, *_ = struct.unpack('>LLBBBBB', chunks[b'IHDR'])
+    assert (depth, color_type) == (8, 3)
+    raw = zlib.decompress(chunks[b'IDAT'])
+    assert len(raw) == (width + 1) * height
+    assert set(raw[::width + 1]) == {0}
+    pixels = b''.join(raw[_ + 1:_ + 1 + width] for _ in range(0, len(raw), width + 1))
+    return width, height, chunks[b'PLTE'], pixels
+
+
+def scaled(frame: Frame, scale: int) -> bytes:
+    """Return frame pixels scaled by integer factor (reference)."""
+    rows = [frame.pixels[_:_ + frame.width] for _ in range(0, len(frame.pixels), frame.width)]
+    return b''.join(bytes(pixel for pixel in row for _ in range(scale))
+                    for row in rows for _ in range(scale))
+
+
+@pytest.fixture(name='frame')
+def fixture_frame() -> Frame:
+    """Rendered random hires screen with border."""
+    rnd = random.Random(64)
+    return render.hires(HiresScreen(rnd.randbytes(8000), rnd.randbytes(1000), b'\x0e'),
+                        with_border=True)
+
+
+@pytest.mark.parametrize('level', (0, 9))
+@pytest.mark.parametrize('scale', (1, 2))
+def test_png(frame: Frame, scale: int, level: int) -> None:
+    """PNG decodes to the frame pixels and palette."""
+    width, height, palette, pixels = decode_png(raster.png(frame, palettes.PEPTO, level, scale))
+    assert (width, height) == (frame.width * scale, frame.height * scale)
+    assert palette == b''.join(bytes(_) for _ in palettes.PEPTO)
+    assert pixels == scaled(frame, scale)
+
+
+@pytest.mark.parametrize('scale', (1, 2))
+def test_ppm(frame: Frame, scale: int) -> None:
+    """PPM holds RGB colors of the frame pixels."""
+    data = raster.ppm(frame, palettes.COLODORE, scale)
+    header = f'P6\n{frame.width * scale} {frame.height * scale}\n255\n'.encode()
+    assert data.startswith(header)
+    assert data[len(header):] == b''.join(bytes(palettes.COLODORE[_])
+                                          for _ in scaled(frame, scale))
+
+
+def test_rows() -> None:
+    """Frame rows are scaled in both directions."""
+    frame = Frame(3, 2, bytes(range(6)))
+    assert list(frame.rows()) == [b'\x00\x01\x02', b'\x03\x04\x05']
+    assert list(frame.rows(2)) == [b'\x00\x00\x01\x01\x02\x02'] * 2 \
+        + [b'\x03\x03\x04\x04\x05\x05'] * 2
+
+
+# vim: set sts=4 et sw=4:
@@ -0,0 +1,322 @@
+"""Tests of screen rendering against per-pixel reference renderers."""
+
+import random
+from typing import Sequence
+
+import pytest
+
+from xsnap.imageformats.c64 import render
+from xsnap.imageformats.c64.render import HEIGHT, SPRITE_X, SPRITE_Y, WIDTH, Sprite
+from xsnap.imageformats.c64.scrtypes import (EcmTextScreen, HiresScreen, MultiColorScreen,
+                                             MultiTextScreen, TextScreen)
+
+
+def cell(x: int, y: int) -> int:
+    """Return number of character cell of pixel."""
+    return y // 8 * 40 + x // 8
+
+
+def bit(byte: int, x: int) -> int:
+    """Return hires pixel x (0-7) of byte."""
+    return byte >> (7 - x % 8) & 1
+
+
+def pair(byte: int, x: int) -> int:
+    """Return multicolor pixel pair value of pixel x (0-7) of byte."""
+    return byte >> (6 - x % 8 // 2 * 2) & 3
+
+
+def ref_hires(scr: HiresScreen) -> tuple[list[int], list[int]]:
+    """Reference hires bitmap renderer."""
+    pixels, fg = [], []
+    for y in range(HEIGHT):
+        for x in range(WIDTH):
+            num = cell(x, y)
+            val = bit(scr.bitmap[num * 8 + y % 8], x)
+            pixels.append(scr.screen[num] >> 4 if val else scr.screen[num] & 0x0f)
+            fg.append(val)
+    return pixels, fg
+
+
+def ref_multicolor(scr: MultiColorScreen) -> tuple[list[int], list[int]]:
+    """Reference multicolor bitmap renderer."""
+    pixels, fg = [], []
+    for y in range(HEIGHT):
+        for x in range(WIDTH):
+            num = cell(x, y)
+            val = pair(scr.bitmap[num * 8 + y % 8], x)
+            colors = (ord(scr.bgcolor), scr.screen[num] >> 4, scr.screen[num] & 0x0f,
+                      scr.colors[num] & 0x0f)
+            pixels.append(colors[val])
+            fg.append(val >> 1)
+    return pixels, fg
+
+
+def sprite_color(sprite: Sprite, x: int, y: int) -> int:
+    """Return color of sprite pixel at screen pixel (-1 = transparent)."""
+    posx, posy = x + SPRITE_X - sprite.posx, y + SPRITE_Y - sprite.posy
+    if not (0 <= posx < sprite.width() and 0 <= posy < sprite.height()):
+        return -1
+    posx //= 2 if sprite.xexp else 1
+    posy //= 2 if sprite.yexp else 1
+    byte = sprite.data[posy * 3 + posx // 8]
+    if sprite.multicolor:
+        colors = (-1, sprite.color01, sprite.color, sprite.color11)
+        return colors[pair(byte, posx)]
+    return sprite.color if bit(byte, posx) else -1
+
+
+def ref_sprites(pixels: list[int], fg: list[int], sprites: Sequence[Sprite]) -> list[int]:
+    """Reference sprite compositing.
+
+    The first sprite with a pixel set wins, it is hidden by the foreground
+    when it is behind the screen (hiding other sprites too, like VIC-II).
+    """
+    out = list(pixels)
+    covered = {(x, y) for _ in sprites
+               for y in range(max(_.posy - SPRITE_Y, 0), min(_.posy - SPRITE_Y + 42, HEIGHT))
+               for x in range(max(_.posx - SPRITE_X, 0), min(_.posx - SPRITE_X + 48, WIDTH))}
+    for x, y in covered:
+        for sprite in sprites:
+            color = sprite_color(sprite, x, y)
+            if color >= 0:
+                if not (sprite.behind and fg[y * WIDTH + x]):
+                    out[y * WIDTH + x] = color & 0x0f
+                break
+    return out
+
+
+def ref_text(scr: TextScreen) -> tuple[list[int], list[int]]:
+    """Reference standard character screen renderer."""
+    pixels, fg = [], []
+    for y in range(HEIGHT):
+        for x in range(WIDTH):
+            num = cell(x, y)
+            val = bit(scr.charset[scr.screen[num] * 8 + y % 8], x)
+            pixels.append(scr.colors[num] & 0x0f if val else ord(scr.bgcolor))
+            fg.append(val)
+    return pixels, fg
+
+
+def ref_multitext(scr: MultiTextScreen) -> tuple[list[int], list[int]]:
+    """Reference multicolor character screen renderer."""
+    pixels, fg = [], []
+    for y in range(HEIGHT):
+        for x in range(WIDTH):
+            num = cell(x, y)
+            color = scr.colors[num] & 0x0f
+            byte = scr.charset[scr.screen[num] * 8 + y % 8]
+            if color < 8:
+                val = bit(byte, x)
+                pixels.append(color if val else ord(scr.bgcolor))
+                fg.append(val)
+            else:
+                val = pair(byte, x)
+                colors = (ord(scr.bgcolor), ord(scr.bgcolor1), ord(scr.bgcolor2), color & 0x07)
+                pixels.append(colors[val])
+                fg.append(val >> 1)
+    return pixels, fg
+
+
+def ref_ecmtext(scr: EcmTextScreen) -> tuple[list[int], list[int]]:
+    """Reference extended background color character screen renderer."""
+    backgrounds = scr.bgcolor + scr.bgcolor1 + scr.bgcolor2 + scr.bgcolor3
+    pixels, fg = [], []
+    for y in range(HEIGHT):
+        for x in range(WIDTH):
+            num = cell(x, y)
+            code = scr.screen[num]
+            val = bit(scr.charset[(code & 0x3f) * 8 + y % 8], x)
+            pixels.append(scr.colors[num] & 0x0f if val else backgrounds[code >> 6])
+            fg.append(val)
+    return pixels, fg
+
+
+def random_bitmap(rnd: random.Random) -> tuple[bytes, bytes, bytes]:
+    """Return random bitmap, screen and color RAM."""
+    return rnd.randbytes(8000), rnd.randbytes(1000), rnd.randbytes(1000)
+
+
+def random_sprites(rnd: random.Random, count: int = 8) -> list[Sprite]:
+    """Return random sprites partly on screen (clipped by all edges)."""
+    return [Sprite(rnd.randbytes(63), rnd.randrange(0, 360), rnd.randrange(20, 260),
+                   rnd.randrange(16), multicolor=rnd.random() < 0.5,
+                   color01=rnd.randrange(16), color11=rnd.randrange(16),
+                   xexp=rnd.random() < 0.5, yexp=rnd.random() < 0.5,
+                   behind=rnd.random() < 0.5) for _ in range(count)]
+
+
+def render_bitmap(kind: str, rnd: random.Random,
+                  sprites: Sequence[Sprite]) -> tuple[bytes, list[int], list[int]]:
+    """Return rendered pixels, reference pixels and foreground of random bitmap screen."""
+    bitmap, screen, colors = random_bitmap(rnd)
+    if kind == 'hires':
+        scr = HiresScreen(bitmap, screen, b'\x0e')
+        pixels, fg = ref_hires(scr)
+        return render.hires(scr, sprites=sprites).pixels, pixels, fg
+    mscr = MultiColorScreen(bitmap, screen, colors, b'\x06', b'\x0e')
+    pixels, fg = ref_multicolor(mscr)
+    return render.multicolor(mscr, sprites=sprites).pixels, pixels, fg
+
+
+@pytest.mark.parametrize('kind', ('hires', 'multicolor'))
+def test_bitmap(kind: str) -> None:
+    """Bitmap screens render like the reference."""
+    rendered, pixels, _ = render_bitmap(kind, random.Random(64), ())
+    assert list(rendered) == pixels
+
+
+def test_border() -> None:
+    """Full frame surrounds the screen with the border color."""
+    scr = HiresScreen(*random_bitmap(random.Random(64))[:2], b'\x0e')
+    frame = render.hires(scr, with_border=True)
+    assert (frame.width, frame.height) == (render.FRAME_WIDTH, render.FRAME_HEIGHT)
+    rows = [frame.pixels[_:_ + frame.width] for _ in range(0, len(frame.pixels), frame.width)]
+    screen_rows = rows[render.BORDER_TOP:render.BORDER_TOP + HEIGHT]
+    assert b''.join(_[render.BORDER_LEFT:render.BORDER_LEFT + WIDTH] for _ in screen_rows) \
+        == render.hires(scr).pixels
+    border = b''.join(rows[:render.BORDER_TOP] + rows[render.BORDER_TOP + HEIGHT:]
+                      + [_[:render.BORDER_LEFT] + _[render.BORDER_LEFT + WIDTH:]
+                         for _ in screen_rows])
+    assert set(border) == {0x0e}
+
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('kind', ('hires', 'multicolor'))
+def test_sprites(kind: str, seed: int) -> None:
+    """Random sprites (clipped, expanded, behind the screen) render like the reference."""
+    rnd = random.Random(seed)
+    sprites = random_sprites(rnd)
+    rendered, pixels, fg = render_bitmap(kind, rnd, sprites)
+    assert list(rendered) == ref_sprites(pixels, fg, sprites)
+
+
+@pytest.mark.parametrize('posx,posy', ((0, 100), (10, 100), (330, 100), (100, 35), (100, 240),
+                                       (344, 100), (100, 250), (0, 0)))
+@pytest.mark.parametrize('xexp,yexp', ((False, False), (True, True)))
+def test_sprite_clipping(posx: int, posy: int, xexp: bool, yexp: bool) -> None:
+    """Sprites are clipped by the screen edges (the border covers them)."""
+    sprite = Sprite(b'\xff' * 63, posx, posy, 1, xexp=xexp, yexp=yexp)
+    rendered, pixels, fg = render_bitmap('hires', random.Random(64), [sprite])
+    assert list(rendered) == ref_sprites(pixels, fg, [sprite])
+
+
+def test_sprite_priority() -> None:
+    """Sprite 0 is on top, a sprite behind the screen hides sprites under it on foreground."""
+    rnd = random.Random(64)
+    front = Sprite(b'\xff' * 63, 100, 100, 1)
+    behind = Sprite(b'\xf0' * 63, 100, 100, 2, behind=True)
+    for sprites in ([front, behind], [behind, front]):
+        rendered, pixels, fg = render_bitmap('hires', rnd, sprites)
+        assert list(rendered) == ref_sprites(pixels, fg, sprites)
+
+
+def random_text(rnd: random.Random, charset: bytes = b'', bgcolor: int = 6) -> TextScreen:
+    """Return random standard character screen."""
+    return TextScreen(rnd.randbytes(1000), rnd.randbytes(1000), bytes([bgcolor]), b'\x0e',
+                      charset=charset or rnd.randbytes(2048))
+
+
+def test_text() -> None:
+    """Standard character screens render like the reference."""
+    scr = random_text(random.Random(64))
+    assert list(render.text(scr).pixels) == ref_text(scr)[0]
+
+
+def test_text_sprites() -> None:
+    """Sprites behind character screens are hidden by set character pixels."""
+    rnd = random.Random(64)
+    scr = random_text(rnd)
+    sprites = random_sprites(rnd)
+    pixels, fg = ref_text(scr)
+    assert list(render.text(scr, sprites=sprites).pixels) == ref_sprites(pixels, fg, sprites)
+
+
+def test_text_without_charset() -> None:
+    """Character screens are not rendered without the character set."""
+    scr = TextScreen(bytes(1000), bytes(1000), b'\x06', b'\x0e')
+    with pytest.raises(ValueError):
+        render.text(scr)
+
+
+def test_glyph_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Cached glyphs of other character sets and colors are not reused, the cache is bounded."""
+    monkeypatch.setattr(render, '_glyphs', {})
+    monkeypatch.setattr(render, 'GLYPH_CACHE_SIZE', 24)
+    rnd = random.Random(64)
+    charsets = [rnd.randbytes(2048) for _ in range(3)]
+    for charset in charsets:
+        for bgcolor in (0, 6):
+            scr = random_text(rnd, charset, bgcolor)
+            assert list(render.text(scr).pixels) == ref_text(scr)[0]
+            # Note: screens of the same character set and colors hit the cache.
+            again = random_text(rnd, charset, bgcolor)
+            assert list(render.text(again).pixels) == ref_text(again)[0]
+    assert len(render._glyphs) == 24    # pylint: disable=protected-access
+
+
+def test_charset_id() -> None:
+    """Character sets are identified by content."""
+    charset = random.Random(64).randbytes(2048)
+    assert render.charset_id(charset) == render.charset_id(bytes(bytearray(charset)))
+    assert render.charset_id(charset) != render.charset_id(charset[:-1] + b'\x00')
+
+
+def random_multitext(rnd: random.Random) -> MultiTextScreen:
+    """Return random multicolor character screen."""
+    return MultiTextScreen(rnd.randbytes(1000), rnd.randbytes(1000), b'\x06', b'\x02',
+                           b'\x05', b'\x0e', charset=rnd.randbytes(2048))
+
+
+def random_ecmtext(rnd: random.Random) -> EcmTextScreen:
+    """Return random extended background color character screen."""
+    return EcmTextScreen(rnd.randbytes(1000), rnd.randbytes(1000), b'\x06', b'\x02',
+                         b'\x05', b'\x07', b'\x0e', charset=rnd.randbytes(2048))
+
+
+@pytest.mark.parametrize('with_sprites', (False, True))
+def test_multitext(with_sprites: bool) -> None:
+    """Multicolor character screens render like the reference."""
+    rnd = random.Random(64)
+    scr = random_multitext(rnd)
+    sprites = random_sprites(rnd) if with_sprites else []
+    pixels, fg = ref_multitext(scr)
+    assert list(render.multitext(scr, sprites=sprites).pixels) \
+        == ref_sprites(pixels, fg, sprites)
+
+
+@pytest.mark.parametrize('with_sprites', (False, True))
+def test_ecmtext(with_sprites: bool) -> None:
+    """Extended background color character screens render like the reference."""
+    rnd = random.Random(64)
+    scr = random_ecmtext(rnd)
+    sprites = random_sprites(rnd) if with_sprites else []
+    pixels, fg = ref_ecmtext(scr)
+    assert list(render.ecmtext(scr, sprites=sprites).pixels) == ref_sprites(pixels, fg, sprites)
+
+
+def test_shared_glyph_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Character modes sharing a character set do not get each other's glyphs."""
+    monkeypatch.setattr(render, '_glyphs', {})
+    rnd = random.Random(64)
+    charset = rnd.randbytes(2048)
+    screens = [random_text(rnd, charset), random_multitext(rnd), random_ecmtext(rnd)]
+    screens[1].charset = screens[2].charset = charset
+    for _ in range(2):
+        assert list(render.text(screens[0]).pixels) == ref_text(screens[0])[0]
+        assert list(render.multitext(screens[1]).pixels) == ref_multitext(screens[1])[0]
+        assert list(render.ecmtext(screens[2]).pixels) == ref_ecmtext(screens[2])[0]
+
+
+def test_sprite_values() -> None:
+    """Expanded sprites double pixels, multicolor pixels are double wide."""
+    data = bytes([0b1000_0001, 0, 0b1110_0100]) + bytes(60)
+    assert Sprite(data, 0, 0, 1).values()[:24] == bytes([1, 0, 0, 0, 0, 0, 0, 1]) + bytes(8) \
+        + bytes([1, 1, 1, 0, 0, 1, 0, 0])
+    multi = Sprite(data, 0, 0, 1, multicolor=True, xexp=True, yexp=True)
+    assert multi.values()[:48] == multi.values()[48:96]
+    assert multi.values()[:16] == bytes([2] * 4 + [0] * 8 + [1] * 4)
+    assert multi.values()[32:48] == bytes([3] * 4 + [2] * 4 + [1] * 4 + [0] * 4)
+
+
+# vim: set sts=4 et sw=4:
@@ -0,0 +1,97 @@
+"""Tests of the VIC-II snapshot module (payload layouts and register file)."""
+
+import random
+from struct import pack
+
+import pytest
+
+from xsnap.vice.vsf import VSFError, VSFModule
+from xsnap.vice.vsf import vic2
+from xsnap.vice.vsf.vic2 import VIC2, GraphicsMode, Layout
+
+RND = random.Random(64)
+COLOR_RAM = RND.randbytes(1024)
+REGISTERS = bytearray(RND.randbytes(64))
+REGISTERS[0x11] = 0x3b          # Bitmap mode.
+REGISTERS[0x16] = 0x18          # Multicolor mode.
+REGISTERS[0x18] = 0x38          # Screen $0c00, bitmap $2000.
+RAM_BASE = 0x4000
+
+# Fields up to the registers, in order of the VICE VIC-II module.
+PREFIX = b''.join((
+    b'\x01\x00\x00',            # AllowBadLines, BadLine, Blank.
+    RND.randbytes(40),          # ColorBuf.
+    COLOR_RAM,                  # ColorRam.
+    b'\x00\x00\x00\x00',        # IdleState, LPTrigger, LPX, LPY.
+    RND.randbytes(40),          # MatrixBuf.
+    b'\x00',                    # NewSpriteDmaMask.
+    pack('<L', RAM_BASE),       # RamBase.
+    b'\x10',                    # RasterCycle.
+    pack('<H', 0x0123),         # RasterLine.
+    REGISTERS,                  # Registers.
+))
+
+# x64 module (fast VIC-II), raster and sprite state follow the registers (not read).
+X64_PAYLOAD = PREFIX + RND.randbytes(90)
+
+# x64sc module (cycle exact VIC-II) adds more state after them (not read).
+X64SC_PAYLOAD = PREFIX + RND.randbytes(90) + RND.randbytes(140)
+
+
+def module(payload: bytes, major: int = 1, minor: int = 3) -> VSFModule:
+    """Return VIC-II module of given version."""
+    return VSFModule(0, b'VIC-II', major, minor, VSFModule.HEADER_SIZE + len(payload),
+                     memoryview(payload))
+
+
+@pytest.mark.parametrize('payload,minor', ((X64_PAYLOAD, 1), (X64SC_PAYLOAD, 3)),
+                         ids=('x64', 'x64sc'))
+def test_layout(payload: bytes, minor: int) -> None:
+    """x64 and x64sc modules are read with the same layout."""
+    mod = VIC2(module(payload, minor=minor))
+    assert not mod.warnings
+    assert bytes(mod.color_ram()) == COLOR_RAM[:1000]
+    assert mod.ram_base() == RAM_BASE
+    assert mod.registers(0x4000).values == tuple(REGISTERS)
+
+
+def test_layout_by_minor_version(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Layout is chosen by major and minor module version."""
+    layout = Layout(color_ram=44, ram_base=1113, registers=1120)
+    monkeypatch.setitem(vic2.LAYOUTS, (1, 4), layout)
+    assert vic2.find_layout(1, 3) == vic2.LAYOUTS[(1, 0)]
+    assert vic2.find_layout(1, 4) is layout
+    assert vic2.find_layout(1, 9) is layout
+    assert vic2.find_layout(2, 0) is None
+
+
+def test_unknown_version() -> None:
+    """Unknown major version is read with the newest layout and a warning."""
+    mod = VIC2(module(X64SC_PAYLOAD, major=2, minor=0))
+    assert mod.warnings == ['unknown VIC-II module version 2.0, using version 1.0 layout']
+    assert mod.registers(0x0000).values == tuple(REGISTERS)
+
+
+def test_short_module() -> None:
+    """Module without the whole register block is rejected."""
+    with pytest.raises(VSFError):
+        VIC2(module(PREFIX[:-1])).registers(0x0000)
+
+
+def test_register_file() -> None:
+    """Graphics mode, addresses, colors and sprites are decoded from registers."""
+    regs = VIC2(module(X64SC_PAYLOAD)).registers(0x4000)
+    assert regs.mode is GraphicsMode.MULTICOLOR
+    assert (regs.bank, regs.bitmap_addr, regs.screen_addr) == (0x4000, 0x6000, 0x4c00)
+    assert regs.border == REGISTERS[0x20] & 0x0f
+    assert regs[0xd020] == regs[0x20] == REGISTERS[0x20]
+    for num in range(8):
+        sprite = regs.sprites.sprite(num)
+        assert sprite.posx == REGISTERS[2 * num] | (REGISTERS[0x10] >> num & 1) << 8
+        assert sprite.posy == REGISTERS[2 * num + 1]
+        assert sprite.status == bool(REGISTERS[0x15] >> num & 1)
+        assert sprite.behind == bool(REGISTERS[0x1b] >> num & 1)
+        assert sprite.fgcolor == REGISTERS[0x27 + num] & 0x0f
+
+
+# vim: set sts=4 et sw=4:
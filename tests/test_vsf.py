@@ -0,0 +1,123 @@
+"""Tests of the VSF snapshot reader (module table, payloads and truncated files)."""
+
+import bz2
+import gzip
+import lzma
+import random
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from xsnap import catalog, vice
+from xsnap.utils import fileutils
+from xsnap.vice.vsf import Module, ViceSnapshotFile, writer
+
+COMPRESSIONS: dict[str, Callable[[bytes], bytes]] = {
+    'vsf': lambda _: _,
+    'vsf.gz': gzip.compress,
+    'vsf.bz2': bz2.compress,
+    'vsf.xz': lzma.compress,
+}
+
+RND = random.Random(64)
+RAM = RND.randbytes(65536)
+REGISTERS = bytes(0x11 * [0]) + b'\x3b' + bytes(4) + b'\x18' + bytes(64 - 0x17)
+COLOR_RAM = RND.randbytes(1000)
+MODULES = [
+    writer.pack_module(b'MAINCPU', bytes(40)),
+    writer.c64mem_module(RAM),
+    writer.cia2_module(0x4000),
+    writer.vic2_module(REGISTERS, COLOR_RAM),
+    writer.pack_module(b'DRIVE8', bytes(1000)),
+]
+SNAPSHOT = writer.pack_snapshot(MODULES)
+HEADER_SIZE = len(writer.pack_header())
+
+
+def write(tmp_path: Path, data: bytes, ext: str) -> Path:
+    """Return path of snapshot file written with compression of ext."""
+    path = tmp_path / f'snap.{ext}'
+    path.write_bytes(COMPRESSIONS[ext](data))
+    return path
+
+
+def module_end(num: int) -> int:
+    """Return offset of the end of module num."""
+    return HEADER_SIZE + sum(len(_) for _ in MODULES[:num + 1])
+
+
+@pytest.mark.parametrize('ext', COMPRESSIONS)
+def test_modules(tmp_path: Path, ext: str) -> None:
+    """Module table is complete, payloads are read by name."""
+    with fileutils.open_file(write(tmp_path, SNAPSHOT, ext)) as fobj:
+        snap = ViceSnapshotFile(fobj)
+        assert [_.magic for _ in snap.modules] == [b'MAINCPU', b'C64MEM', b'CIA2', b'VIC-II',
+                                                   b'DRIVE8']
+        assert snap.complete and not snap.truncated
+        assert snap.version() == '2.0' and snap.is_c64()
+        assert bytes(snap.c64mem().ram(0x0000, 65536)) == RAM
+        assert snap.cia2().vic_bank_addr == 0x4000
+        assert bytes(snap.module('DRIVE8').payload) == bytes(1000)
+        with pytest.raises(KeyError):
+            snap.module('SID')
+
+
+def test_mapped_payload(tmp_path: Path) -> None:
+    """Payloads of plain files are views into the file mapping."""
+    with fileutils.open_file(write(tmp_path, SNAPSHOT, 'vsf')) as fobj:
+        snap = ViceSnapshotFile(fobj)
+        assert not snap._loaded         # pylint: disable=protected-access
+        payload = snap.module(Module.C64MEM).payload
+        assert payload.obj is snap._buffer.obj  # pylint: disable=protected-access
+        assert snap.module(Module.C64MEM) is snap.module(Module.C64MEM)
+
+
+@pytest.mark.parametrize('ext', COMPRESSIONS)
+def test_early_exit(tmp_path: Path, ext: str) -> None:
+    """Scan stops when the wanted modules are found."""
+    with fileutils.open_file(write(tmp_path, SNAPSHOT, ext)) as fobj:
+        snap = ViceSnapshotFile(fobj, modules=(Module.C64MEM, Module.CIA2))
+        assert list(snap.index) == [b'MAINCPU', b'C64MEM', b'CIA2']
+        assert not snap.complete and not snap.truncated
+        with pytest.raises(KeyError, match='scanned part'):
+            snap.vic2()
+
+
+@pytest.mark.parametrize('ext', COMPRESSIONS)
+@pytest.mark.parametrize('cut', (module_end(0) + 10, module_end(1) - 1, module_end(3) + 30))
+def test_truncated(tmp_path: Path, ext: str, cut: int) -> None:
+    """Module cut by the end of file is not indexed, the snapshot is truncated."""
+    with fileutils.open_file(write(tmp_path, SNAPSHOT[:cut], ext)) as fobj:
+        snap = ViceSnapshotFile(fobj, all_headers=True)
+        assert snap.truncated and not snap.complete
+        assert all(_.start_pos + _.size <= cut for _ in snap.modules)
+        assert len(snap.modules) == sum(module_end(_) <= cut for _ in range(len(MODULES)))
+
+
+@pytest.mark.parametrize('ext', COMPRESSIONS)
+def test_truncated_info(tmp_path: Path, ext: str) -> None:
+    """Snapshot cut inside C64MEM is reported as truncated, C64MEM is not listed."""
+    with fileutils.open_file(write(tmp_path, SNAPSHOT[:module_end(0) + 30000], ext)) as fobj:
+        report = vice.snapshot_info(fobj)
+    assert report.truncated
+    assert report.modules == {'MAINCPU': '1.0'}
+    assert report.mode is None
+
+
+@pytest.mark.parametrize('ext', COMPRESSIONS)
+def test_truncated_extract(tmp_path: Path, ext: str) -> None:
+    """Extraction of a truncated snapshot fails."""
+    with fileutils.open_file(write(tmp_path, SNAPSHOT[:module_end(0) + 30000], ext)) as fobj:
+        with pytest.raises(KeyError, match='truncated snapshot'):
+            vice.extract_vice(fobj, tmp_path)
+
+
+@pytest.mark.parametrize('ext', COMPRESSIONS)
+def test_truncated_catalog(tmp_path: Path, ext: str) -> None:
+    """Catalog records truncated snapshots as truncated (not as missing modules)."""
+    record = catalog.describe(write(tmp_path, SNAPSHOT[:module_end(0) + 30000], ext))
+    assert record['error'] == 'truncated snapshot'
+
+
+# vim: set sts=4 et sw=4: